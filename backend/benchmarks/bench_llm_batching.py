@@ -0,0 +1,74 @@
+# Бенчмарк micro-batching вызовов LLM: пакетные запросы против одиночных
+# Stub LLM API отвечает с фиксированной задержкой, имитируя сетевой round-trip.
+# Запуск из папки backend:
+#   python -m benchmarks.bench_llm_batching --calls 64 --concurrency 16
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from praisonai_core.llm_batcher import BATCH_MAX_SIZE, LLMBatcher  # noqa: E402
+from praisonai_core.llm_client import LLMClient  # noqa: E402
+from tests.llm_stub import LLMStubServer  # noqa: E402
+
+
+def bench_mode(window: float, calls: int, concurrency: int, delay: float, max_batch: int) -> dict:
+    with LLMStubServer(delay=delay) as stub:
+        client = LLMClient(url=stub.url, pool_size=concurrency, max_in_flight={'gemini-flash': concurrency})
+        batcher = LLMBatcher(client, window=window, max_batch=max_batch)
+        latencies = []
+        lock = threading.Lock()
+
+        def call(i: int) -> None:
+            start = time.perf_counter()
+            batcher.generate('gemini-flash', 'Ты — Lead QA.', f'Проверь задачу {i}')
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(call, range(calls)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    stats = batcher.stats()
+    return {
+        'window_seconds': window,
+        'elapsed_seconds': round(elapsed, 4),
+        'calls_per_second': round(calls / elapsed, 2),
+        'http_requests': len(stub.requests),
+        'calls_per_request': stats['calls_per_request'],
+        'fallbacks': stats['fallbacks'],
+        'latency_p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'latency_p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пропускная способность LLM-вызовов с batching и без")
+    parser.add_argument('--calls', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--delay', type=float, default=0.2, help="задержка ответа stub API (сек)")
+    parser.add_argument('--window', type=float, default=0.05, help="окно сбора пакета (сек)")
+    parser.add_argument('--max-batch', type=int, default=BATCH_MAX_SIZE)
+    parser.add_argument('--output', help="путь для сохранения результатов в JSON")
+    args = parser.parse_args()
+    results = {
+        mode: bench_mode(window, args.calls, args.concurrency, args.delay, args.max_batch)
+        for mode, window in (('single', 0.0), ('batched', args.window))
+    }
+    text = json.dumps({"calls": args.calls, "concurrency": args.concurrency, "delay": args.delay,
+                       "results": results}, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
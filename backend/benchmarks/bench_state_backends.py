@@ -0,0 +1,126 @@
+# Бенчмарк хранилищ Live Project Context: json / events / sqlite
+# Запуск из папки backend:
+#   python -m benchmarks.bench_state_backends --reports 10000
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from praisonai_core.tools import context_manager  # noqa: E402
+
+BACKENDS = ('json', 'events', 'sqlite')
+SEVERITIES = ('low', 'medium', 'high')
+REPORT_TYPES = ('qa_functional', 'security_audit', 'user_feedback')
+
+
+def _seed_state(reports: int, tasks: int) -> dict:
+    return {
+        "status": "in_progress",
+        "iteration_count": 0,
+        "current_llm_cost": 0.0,
+        "tasks": [
+            {"id": f"task-{i}", "agent": "backend-dev", "description": f"Задача {i}",
+             "status": "done" if i % 3 else "pending", "assigned_to": f"agent-{i % 5}",
+             "priority": i % 3, "dependencies": [], "artifacts_produced": [], "subtasks": []}
+            for i in range(tasks)
+        ],
+        "reports": [
+            {"type": REPORT_TYPES[i % 3], "severity": SEVERITIES[i % 3],
+             "content": f"Отчёт {i}: " + "x" * 200, "created_at": "2025-08-06T12:00:00Z", "related_task": None}
+            for i in range(reports)
+        ],
+    }
+
+
+def _timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def bench_backend(backend: str, reports: int, tasks: int, repeat: int) -> dict:
+    temp_dir = tempfile.mkdtemp()
+    project_id = "bench_project"
+    old_base, old_backend = context_manager.BASE_PROJECTS_PATH, context_manager.STATE_BACKEND
+    context_manager.BASE_PROJECTS_PATH = temp_dir
+    context_manager.STATE_BACKEND = backend
+    context_manager.invalidate_state_cache()
+    try:
+        start = time.perf_counter()
+        context_manager.write_state(project_id, _seed_state(reports, tasks))
+        seed_ms = (time.perf_counter() - start) * 1000
+
+        def cold_read():
+            context_manager.invalidate_state_cache()
+            context_manager.read_state(project_id)
+
+        def add_report():
+            context_manager.add_report(project_id, {"type": "qa_functional", "severity": "high",
+                                                    "content": "y" * 200, "related_task": None})
+
+        def filtered_status():
+            context_manager.query_reports(project_id, report_type="security_audit", severity="high", limit=50)
+            context_manager.query_tasks(project_id, status="pending", limit=50)
+
+        def filtered_status_cold():
+            context_manager.invalidate_state_cache()
+            filtered_status()
+
+        result = {
+            "seed_ms": round(seed_ms, 3),
+            "read_state_cold": _timed(cold_read, repeat),
+            "read_state_warm": _timed(lambda: context_manager.read_state(project_id), repeat),
+            "add_report": _timed(add_report, repeat),
+            "status_query_warm": _timed(filtered_status, repeat),
+            "status_query_cold": _timed(filtered_status_cold, repeat),
+        }
+        disk = 0
+        for root, _, files in os.walk(temp_dir):
+            disk += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        result["disk_bytes"] = disk
+        return result
+    finally:
+        if backend == 'sqlite':
+            from praisonai_core.tools import sqlite_store
+            sqlite_store.close_connections()
+        context_manager.BASE_PROJECTS_PATH = old_base
+        context_manager.STATE_BACKEND = old_backend
+        context_manager.invalidate_state_cache()
+        shutil.rmtree(temp_dir)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение хранилищ состояния проекта")
+    parser.add_argument('--reports', type=int, default=10000)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--backends', default=','.join(BACKENDS))
+    parser.add_argument('--output', help="путь для сохранения результатов в JSON")
+    args = parser.parse_args()
+    results = {
+        backend: bench_backend(backend, args.reports, args.tasks, args.repeat)
+        for backend in args.backends.split(',')
+    }
+    text = json.dumps({"reports": args.reports, "tasks": args.tasks, "results": results},
+                      ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
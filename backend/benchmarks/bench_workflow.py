@@ -0,0 +1,146 @@
+# Сквозной бенчмарк workflow: /projects/init -> /run -> /feedback для N проектов параллельно
+# Вместо внешнего LLM API — локальный детерминированный stub (tests.llm_stub) с заданной
+# задержкой и стоимостью ответа; Dispatcher направляется на него через APPBUILDER_LLM_URL.
+# API вызывается в процессе через TestClient, фоновые задания — общей очередью jobs.
+# Запуск из папки backend:
+#   python -m benchmarks.bench_workflow --projects 8 --latency 0.05 --output bench_workflow.json
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.llm_stub import LLMStubServer  # noqa: E402
+
+BACKENDS = ('json', 'events', 'sqlite')
+
+
+def _percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _summary(values: list) -> dict:
+    return {
+        'count': len(values),
+        'p50_ms': round(_percentile(values, 0.5) * 1000, 2),
+        'p99_ms': round(_percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def bench(args) -> dict:
+    temp_dir = tempfile.mkdtemp(prefix='bench_workflow_')
+    answer = {"result": "Готово.", "usage": {"cost": args.cost, "total_tokens": args.tokens}}
+    with LLMStubServer(script=[(200, answer, {})], delay=args.latency) as stub:
+        # Конфигурация читается при импорте модулей — задаём её до импорта main
+        os.environ['APPBUILDER_LLM_URL'] = stub.url
+        os.environ['APPBUILDER_PLANE_API_TOKEN'] = ''
+        os.environ['APPBUILDER_STATE_BACKEND'] = args.backend
+        os.environ['APPBUILDER_JOB_WORKERS'] = str(args.projects)
+        from fastapi.testclient import TestClient
+        from praisonai_core import tracing
+        from praisonai_core.tools import context_manager
+        import main
+
+        main.PROJECTS_PATH = context_manager.BASE_PROJECTS_PATH = temp_dir
+        client = TestClient(main.app)
+        latencies = {}
+        job_seconds = {}
+        statuses = []
+        lock = threading.Lock()
+
+        def call(name: str, method: str, url: str, **kwargs):
+            start = time.perf_counter()
+            response = client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - start
+            response.raise_for_status()
+            with lock:
+                latencies.setdefault(name, []).append(elapsed)
+            return response.json()
+
+        def wait_job(kind: str, job_id: str) -> dict:
+            start = time.perf_counter()
+            while True:
+                job = call('GET /jobs/{id}', 'GET', f'/jobs/{job_id}')
+                if job['status'] in ('done', 'failed'):
+                    break
+                time.sleep(args.poll_interval)
+            with lock:
+                job_seconds.setdefault(kind, []).append(time.perf_counter() - start)
+            return job
+
+        def project_flow(index: int) -> None:
+            project_id = call('POST /projects/init', 'POST', '/projects/init',
+                              json={"core_mandate": f"Блог на Rails #{index}"})['project_id']
+            if not args.llm_cache:
+                call('PUT /projects/{id}/llm_cache', 'PUT', f'/projects/{project_id}/llm_cache',
+                     json={"enabled": False})
+            job = call('POST /projects/{id}/run', 'POST', f'/projects/{project_id}/run')
+            wait_job('run', job['job_id'])
+            job = call('POST /projects/{id}/feedback', 'POST', f'/projects/{project_id}/feedback',
+                       json={"feedback": "Добавьте поиск по постам"})
+            wait_job('feedback', job['job_id'])
+            status = call('GET /projects/{id}/status', 'GET', f'/projects/{project_id}/status')
+            with lock:
+                statuses.append(status.get('status'))
+
+        context_manager.write_stats(reset=True)
+        tracing.reset()
+        output = io.StringIO()
+        start = time.perf_counter()
+        # Логи агентов ([Dispatcher] ...) не смешиваются с результатами
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+            with ThreadPoolExecutor(max_workers=args.projects) as pool:
+                list(pool.map(project_flow, range(args.projects)))
+        wall = time.perf_counter() - start
+        writes = context_manager.write_stats()
+        llm_requests = len(stub.requests)
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    return {
+        'wall_seconds': round(wall, 4),
+        'projects_completed': statuses.count('completed'),
+        'endpoints': {name: _summary(values) for name, values in sorted(latencies.items())},
+        'jobs': {kind: _summary(values) for kind, values in sorted(job_seconds.items())},
+        'llm_requests': llm_requests,
+        'state_writes': writes['writes'],
+        'state_bytes_written': writes['bytes'],
+        'state_writes_per_project': round(writes['writes'] / args.projects, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк workflow с локальным stub LLM API")
+    parser.add_argument('--projects', type=int, default=4, help="число одновременно обрабатываемых проектов")
+    parser.add_argument('--latency', type=float, default=0.05, help="задержка ответа stub LLM API (сек)")
+    parser.add_argument('--cost', type=float, default=0.01, help="стоимость одного вызова LLM ($)")
+    parser.add_argument('--tokens', type=int, default=1500, help="токенов в одном ответе LLM")
+    parser.add_argument('--backend', choices=BACKENDS, default='json', help="хранилище состояния")
+    parser.add_argument('--llm-cache', action='store_true', help="не отключать кэш ответов LLM")
+    parser.add_argument('--poll-interval', type=float, default=0.02, help="интервал опроса GET /jobs/{id} (сек)")
+    parser.add_argument('--verbose', action='store_true', help="выводить логи агентов")
+    parser.add_argument('--output', help="путь для сохранения результатов в JSON")
+    args = parser.parse_args()
+    results = bench(args)
+    text = json.dumps({"projects": args.projects, "latency": args.latency, "cost": args.cost,
+                       "backend": args.backend, "llm_cache": args.llm_cache, "results": results},
+                      ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
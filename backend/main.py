@@ -55,13 +55,24 @@ def export_to_notion(project_id: str, req: NotionExportRequest):
                 results.setdefault("reports", []).append(str(e))
     return {"status": "notion_export_complete", "results": results}
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from datetime import datetime
+import hashlib
 import uuid
 import os
+import threading
 from praisonai_core.dispatcher import Dispatcher
+from praisonai_core import agent_registry, jobs, tracing
+
+# agents.yaml проверяется при старте: неизвестные модели и инструменты — ошибка запуска, а не сбой посреди workflow
+agent_registry.get_registry()
 
 app = FastAPI(title="AppBuilder AI Backend")
+# Ответы больше порога сжимаются gzip (если клиент его принимает)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 PROJECTS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'projects'))
 
@@ -84,23 +95,102 @@ def init_project(req: ProjectInitRequest):
             else:
                 f.write(f"# {fname}\n")
     os.makedirs(os.path.join(project_path, 'vector_store'), exist_ok=True)
+    from praisonai_core.tools import context_manager, project_registry
+    project_registry.record_project(context_manager.BASE_PROJECTS_PATH, project_id,
+                                    context_manager.read_state(project_id),
+                                    created_at=datetime.utcnow().isoformat() + "Z")
     return {"project_id": project_id}
 
 
+# --- Список проектов из реестра (без сканирования папок) ---
+@app.get("/projects")
+def list_projects(
+    status: str = Query(None, description="Фильтр по статусу проекта"),
+    sort: str = Query("updated_at", description="Поле сортировки: updated_at, created_at, current_llm_cost, iteration_count, status, id"),
+    order: str = Query("desc", description="asc или desc"),
+    limit: int = Query(50, ge=1, le=500, description="Размер страницы"),
+    cursor: str = Query(None, description="Курсор следующей страницы (next_cursor)")
+):
+    from praisonai_core.tools import context_manager, project_registry
+    try:
+        projects, next_cursor = project_registry.list_projects(
+            context_manager.BASE_PROJECTS_PATH, status=status, sort=sort, order=order, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"projects": projects, "next_cursor": next_cursor}
+
+
+def _submit_job(kind: str, func, project_id: str, profile: bool = False) -> dict:
+    # Задание — спан 'job' (вложенные спаны попадают в таймлайн проекта);
+    # profile=true дополнительно снимает профиль cProfile в <project>/.profiles
+    def run():
+        try:
+            with tracing.span("job", project_id, kind=kind):
+                if not profile:
+                    return func(project_id)
+                with tracing.profiled(context_manager.get_project_path(project_id), kind) as capture:
+                    result = func(project_id)
+                return dict(result, profile=capture)
+        finally:
+            context_manager.flush_timeline(project_id)
+    return jobs.get_queue().submit(kind, run, project_id=project_id)
+
+def _run_workflow(project_id: str):
+    Dispatcher(project_id).run_workflow()
+    return {"status": context_manager.read_status(project_id)}
+
+# Задания workflow: одновременно у проекта выполняется не больше одного
+WORKFLOW_JOB_KINDS = ("run", "resume")
+_workflow_submit_lock = threading.Lock()
+
+def _submit_workflow(kind: str, func, project_id: str, profile: bool) -> dict:
+    # Второй запуск увидел бы задачи первого (in_progress) как завершённые и пропустил бы их зависимые
+    with _workflow_submit_lock:
+        active = jobs.get_queue().active(project_id, WORKFLOW_JOB_KINDS)
+        if active is not None:
+            raise HTTPException(status_code=409, detail=f"Workflow already running (job {active['id']})")
+        return _submit_job(kind, func, project_id, profile)
+
 @app.post("/projects/{project_id}/run")
-def run_project_workflow(project_id: str):
-    dispatcher = Dispatcher(project_id)
-    dispatcher.run_workflow()
-    return {"status": "workflow_started"}
+def run_project_workflow(project_id: str, profile: bool = Query(False)):
+    # Workflow выполняется в фоне; прогресс — GET /jobs/{job_id} и /projects/{id}/events
+    if not os.path.isdir(context_manager.get_project_path(project_id)):
+        raise HTTPException(status_code=404, detail="Project not found")
+    job = _submit_workflow("run", _run_workflow, project_id, profile)
+    return {"status": "workflow_started", "job_id": job["id"]}
+
+def _resume_workflow(project_id: str):
+    checkpoint = Dispatcher(project_id).resume_workflow()
+    return {"status": context_manager.read_status(project_id), "checkpoint": checkpoint}
+
+@app.post("/projects/{project_id}/resume")
+def resume_project_workflow(project_id: str, profile: bool = Query(False)):
+    # Продолжение с первого незавершённого этапа: выполненные задачи не перезапускаются,
+    # задачи упавшего воркера (истёкшая аренда) возвращаются в очередь
+    if not os.path.isdir(context_manager.get_project_path(project_id)):
+        raise HTTPException(status_code=404, detail="Project not found")
+    job = _submit_workflow("resume", _resume_workflow, project_id, profile)
+    return {"status": "workflow_resumed", "job_id": job["id"]}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 # --- Генерация документации ---
 from praisonai_core.tools.doc_generator import generate_docs
 from praisonai_core.tools.mcp_plane_exporter import export_docs_to_plane
-from praisonai_core.tools.testing_runner import run_all_tests
+from praisonai_core.tools import report_parsers, testing_runner
 from praisonai_core.tools.code_analyzer import run_brakeman
 from praisonai_core.tools.test_generator import generate_tests
 from praisonai_core.tools import context_manager
+from praisonai_core.tools import blob_store
+from praisonai_core.tools import pubsub
 from fastapi import Body
+import asyncio
+import json
 
 @app.post("/projects/{project_id}/docs")
 def generate_project_docs(project_id: str):
@@ -122,49 +212,59 @@ def export_project_docs(project_id: str, plane_api_token: str = Body(...), page_
     url = export_docs_to_plane(project_id, docs, plane_api_token, page_id)
     return {"status": "exported", "url": url}
 
-@app.post("/projects/{project_id}/run_tests")
-def run_project_tests(project_id: str):
+def _tool_report(report_type: str, output: str, record: dict) -> dict:
+    # Отчёт по компактной записи report_parsers: severity — по реальным итогам,
+    # content — итоги и первые ошибки вместо полного stdout (он остаётся только если не разобран)
     from datetime import datetime
-    project_path = os.path.join(PROJECTS_PATH, project_id)
-    result = run_all_tests(project_path)
-    # Определяем severity по наличию "failure"/"error" в выводе
-    severity = "low"
-    if result and ("failure" in result or "error" in result or "failed" in result):
-        severity = "high"
     report = {
-        "type": "qa_functional",
-        "severity": severity,
-        "content": result or "No output",
+        "type": report_type,
+        "severity": report_parsers.severity(record),
+        "content": report_parsers.describe(record) if record is not None else (output or "No output"),
         "created_at": datetime.utcnow().isoformat() + "Z",
-        "related_task": None
+        "related_task": None,
     }
+    if record is not None:
+        report["summary"] = report_parsers.summary_line(record)
+        report["details"] = record
+    return report
+
+def _run_tests(project_id: str, full: bool = False):
+    project_path = os.path.join(PROJECTS_PATH, project_id)
+    # Только спеки, затронутые изменениями с прошлого прогона (full=True — весь набор)
+    run = testing_runner.run_changed_tests(project_path, context_manager.read_state(project_id).get("tasks", []), full)
+    selection = {"mode": run["mode"], "reason": run["reason"],
+                 "specs": len(run["specs"]) if run["specs"] is not None else None}
+    if run["mode"] == "skipped":
+        # rspec не запускался — отчёта о результатах нет (полный прогон: ?full=true)
+        return {"status": "tests_skipped", "result": None, "report": None, "test_selection": selection}
+    report = _tool_report("qa_functional", run["output"], report_parsers.parse_rspec(run["output"]))
+    report["test_selection"] = selection
     context_manager.add_report(project_id, report)
-    return {"status": "tests_run", "result": result, "report": report}
+    return {"status": "tests_run", "result": report.get("details"), "report": report}
 
-@app.post("/projects/{project_id}/security_audit")
-def run_project_security_audit(project_id: str):
-    from datetime import datetime
+@app.post("/projects/{project_id}/run_tests")
+def run_project_tests(project_id: str, full: bool = Query(False), profile: bool = Query(False)):
+    # Docker bundle install + rspec занимают минуты — выполняем в фоне
+    job = _submit_job("run_tests", lambda pid: _run_tests(pid, full), project_id, profile)
+    return {"status": "tests_queued", "job_id": job["id"]}
+
+def _run_security_audit(project_id: str):
     project_path = os.path.join(PROJECTS_PATH, project_id)
-    result = run_brakeman(project_path)
-    # Определяем severity по наличию "warning"/"error"/"high" в выводе
-    severity = "low"
-    if result and ("high" in result or "error" in result or "warning" in result):
-        severity = "high"
-    report = {
-        "type": "security_audit",
-        "severity": severity,
-        "content": result or "No output",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "related_task": None
-    }
+    output = run_brakeman(project_path)
+    report = _tool_report("security_audit", output, report_parsers.parse_brakeman(output))
     context_manager.add_report(project_id, report)
-    return {"status": "audit_run", "result": result, "report": report}
+    return {"status": "audit_run", "result": report.get("details"), "report": report}
+
+@app.post("/projects/{project_id}/security_audit")
+def run_project_security_audit(project_id: str, profile: bool = Query(False)):
+    job = _submit_job("security_audit", _run_security_audit, project_id, profile)
+    return {"status": "audit_queued", "job_id": job["id"]}
 
 class FeedbackRequest(BaseModel):
     feedback: str
 
 @app.post("/projects/{project_id}/feedback")
-def submit_feedback(project_id: str, req: FeedbackRequest):
+def submit_feedback(project_id: str, req: FeedbackRequest, profile: bool = Query(False)):
     # Создаём отчёт типа user_feedback и инициируем цикл доработки
     from datetime import datetime
     report = {
@@ -175,37 +275,185 @@ def submit_feedback(project_id: str, req: FeedbackRequest):
         "related_task": None
     }
     context_manager.add_report(project_id, report)
-    # Инициируем correction cycle через Dispatcher
-    dispatcher = Dispatcher(project_id)
-    dispatcher.handle_correction_cycle()
-    return {"status": "feedback_accepted", "report": report}
+    # Correction cycle через Dispatcher выполняется в фоне
+    job = _submit_job("feedback", _run_correction_cycle, project_id, profile)
+    return {"status": "feedback_accepted", "report": report, "job_id": job["id"]}
+
+def _run_correction_cycle(project_id: str):
+    cycle = Dispatcher(project_id).handle_correction_cycle()
+    return {"status": context_manager.read_status(project_id), "correction": cycle}
+
+# --- Условные GET и проекция полей для поллинга фронтендом ---
+def _parse_fields(fields: str) -> dict:
+    # "status,tasks.status" -> {"status": {}, "tasks": {"status": {}}}
+    tree: dict = {}
+    for path in fields.split(","):
+        node = tree
+        for part in filter(None, path.strip().split(".")):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def _project_fields(value, tree: dict):
+    # Оставляет только запрошенные поля; списки проецируются поэлементно
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: _project_fields(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    return bool(if_none_match) and (if_none_match.strip() == "*"
+                                    or etag in [t.strip() for t in if_none_match.split(",")])
+
+
+def _conditional_json(request: Request, project_id: str, build, fields: str = None):
+    """
+    Отдаёт JSON с ETag по версии состояния. При совпадении If-None-Match — 304 без сериализации.
+    """
+    variant = f"{request.url.path}?{request.url.query}"
+    version = context_manager.get_state_version(project_id)
+    etag = f'W/"{version}-{hashlib.sha1(variant.encode("utf-8")).hexdigest()[:8]}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    body = build()
+    if fields:
+        body = _project_fields(body, _parse_fields(fields))
+    return JSONResponse(body, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
 
 # --- Новый эндпоинт: статус и фильтрация задач/отчётов ---
 @app.get("/projects/{project_id}/status")
 def get_project_status(
     project_id: str,
+    request: Request,
     task_status: str = Query(None, description="Фильтр по статусу задачи"),
     report_type: str = Query(None, description="Фильтр по типу отчёта"),
     severity: str = Query(None, description="Фильтр по severity отчёта"),
-    assigned_to: str = Query(None, description="Фильтр по исполнителю задачи")
+    assigned_to: str = Query(None, description="Фильтр по исполнителю задачи"),
+    limit: int = Query(None, ge=1, description="Максимум задач и отчётов на странице"),
+    tasks_cursor: int = Query(None, ge=0, description="Курсор страницы задач (tasks_next_cursor)"),
+    reports_cursor: int = Query(None, ge=0, description="Курсор страницы отчётов (reports_next_cursor)"),
+    fields: str = Query(None, description="Проекция полей, например status,tasks.status")
 ):
-    state = context_manager.read_state(project_id)
-    tasks = state.get("tasks", [])
-    reports = state.get("reports", [])
-    # Фильтрация задач
-    if task_status:
-        tasks = [t for t in tasks if t.get("status") == task_status]
-    if assigned_to:
-        tasks = [t for t in tasks if t.get("assigned_to") == assigned_to]
-    # Фильтрация отчётов
-    if report_type:
-        reports = [r for r in reports if r.get("type") == report_type]
-    if severity:
-        reports = [r for r in reports if r.get("severity") == severity]
-    return {"status": state.get("status"), "tasks": tasks, "reports": reports}
+    def build():
+        # Фильтрация выполняется хранилищем (в режиме sqlite — индексными запросами)
+        tasks, tasks_next_cursor = context_manager.query_tasks(
+            project_id, status=task_status, assigned_to=assigned_to, limit=limit, cursor=tasks_cursor)
+        reports, reports_next_cursor = context_manager.query_reports(
+            project_id, report_type=report_type, severity=severity, limit=limit, cursor=reports_cursor)
+        return {
+            "status": context_manager.read_status(project_id),
+            "tasks": tasks,
+            "reports": reports,
+            "tasks_next_cursor": tasks_next_cursor,
+            "reports_next_cursor": reports_next_cursor,
+        }
+    return _conditional_json(request, project_id, build, fields)
 
 # --- Новый эндпоинт: Live Project Context (весь state.json) ---
 @app.get("/projects/{project_id}/context")
-def get_project_context(project_id: str):
+def get_project_context(
+    project_id: str,
+    request: Request,
+    fields: str = Query(None, description="Проекция полей, например status,tasks.status")
+):
+    return _conditional_json(request, project_id, lambda: context_manager.read_state(project_id), fields)
+
+# --- Стоимость LLM по журналу costs.jsonl: итог, резервы, разбивка по агентам и моделям ---
+@app.get("/projects/{project_id}/costs")
+def get_project_costs(project_id: str):
+    from praisonai_core.tools import cost_ledger
+    if not os.path.isdir(context_manager.get_project_path(project_id)):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return cost_ledger.summary(project_id, limit=context_manager.read_state(project_id).get("llm_cost_limit"))
+
+# --- Кэш ответов LLM: отключение для проекта и статистика ---
+@app.put("/projects/{project_id}/llm_cache")
+def set_project_llm_cache(project_id: str, enabled: bool = Body(..., embed=True)):
+    if not os.path.isdir(context_manager.get_project_path(project_id)):
+        raise HTTPException(status_code=404, detail="Project not found")
+    with context_manager.state_transaction(project_id) as state:
+        state["llm_cache_enabled"] = enabled
+        stats = state.get("llm_cache", {})
+    return {"llm_cache_enabled": enabled, "stats": stats}
+
+@app.get("/llm_cache/stats")
+def get_llm_cache_stats():
+    from praisonai_core import llm_cache
+    return llm_cache.get_cache().stats()
+
+# --- Метрики процесса: гистограммы длительности спанов (агенты, LLM, запись состояния, Docker) ---
+@app.get("/metrics")
+def get_metrics():
+    return Response(content=tracing.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# --- Полное содержимое отчёта (большие отчёты хранятся в blob-хранилище) ---
+@app.get("/projects/{project_id}/reports/{report_index}/content")
+def get_report_content(project_id: str, report_index: int, request: Request):
     state = context_manager.read_state(project_id)
-    return state
+    reports = state.get("reports", [])
+    if report_index < 0 or report_index >= len(reports):
+        raise HTTPException(status_code=404, detail="Report not found")
+    report = reports[report_index]
+    ref = report.get("content_ref")
+    if not ref:
+        return StreamingResponse(iter([(report.get("content") or "").encode("utf-8")]),
+                                 media_type="text/plain; charset=utf-8")
+    if not blob_store.has_blob(project_id, ref["sha256"]):
+        raise HTTPException(status_code=404, detail="Report content blob not found")
+    headers = {"ETag": f'"{ref["sha256"]}"'}
+    # Blob неизменяем (адрес — хэш содержимого): клиенту с той же версией — 304 без тела
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    # Клиенту, принимающему gzip, отдаём сжатый blob без распаковки
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(blob_store.iter_blob(project_id, ref["sha256"], compressed=True),
+                                 media_type="text/plain; charset=utf-8", headers=headers)
+    return StreamingResponse(blob_store.iter_blob(project_id, ref["sha256"]),
+                             media_type="text/plain; charset=utf-8", headers=headers)
+
+# --- Поток изменений состояния (Server-Sent Events) ---
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _sse(event: str, data: dict, event_id=None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False))
+    return "\n".join(lines) + "\n\n"
+
+
+@app.get("/projects/{project_id}/events")
+async def stream_project_events(project_id: str, request: Request):
+    """
+    Пушит дельты состояния (статусы задач, новые отчёты, стоимость, last_agent) по мере записи.
+    Клиент берёт снимок через /context и применяет операции set/del/append из событий state_changed.
+    Событие resync означает, что очередь подписчика переполнилась и снимок нужно перечитать.
+    """
+    subscription = pubsub.subscribe(project_id)
+
+    async def event_stream():
+        dropped = 0
+        try:
+            yield _sse("hello", {"version": context_manager.get_state_version(project_id)})
+            while not await request.is_disconnected():
+                event = await subscription.get_async(timeout=SSE_KEEPALIVE_SECONDS)
+                if subscription.dropped != dropped:
+                    dropped = subscription.dropped
+                    yield _sse("resync", {"dropped": dropped})
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event["type"], event, event.get("seq"))
+        finally:
+            subscription.close()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,174 @@
+# Реестр агентов: agents.yaml разбирается и проверяется один раз
+# Конфиги агентов — неизменяемые объекты AgentConfig; файл перечитывается только при
+# изменении mtime, поэтому поиск конфига в горячем пути — обращение к словарю.
+
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+AGENTS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'agents.yaml'))
+
+# Модели, которые обслуживает LLM API
+KNOWN_MODELS = frozenset({'gemini-pro', 'gemini-flash'})
+# Инструменты, которые агенты могут объявлять в agents.yaml
+KNOWN_TOOLS = frozenset({
+    'auto_fixer.auto_fix_code',
+    'code_analyzer.run_brakeman',
+    'context_manager.append_to_adr',
+    'context_manager.read_all_artifacts',
+    'context_manager.read_context',
+    'context_manager.read_specification',
+    'context_manager.update_state',
+    'context_manager.write_code',
+    'context_manager.write_deployment_files',
+    'context_manager.write_design',
+    'context_manager.write_final_docs',
+    'context_manager.write_migration',
+    'context_manager.write_specification',
+    'doc_generator.generate_docs',
+    'test_generator.generate_tests',
+    'testing_runner.run_all_tests',
+})
+# Как часто (сек) проверять mtime agents.yaml
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+class AgentConfigError(ValueError):
+    """
+    agents.yaml не проходит проверку схемы.
+    """
+
+    def __init__(self, problems: List[str], path: str = AGENTS_PATH) -> None:
+        super().__init__(f"Некорректный {os.path.basename(path)}: " + '; '.join(problems))
+        self.problems = problems
+
+
+@dataclass(frozen=True, slots=True)
+class AgentConfig:
+    """
+    Конфиг агента из agents.yaml.
+    """
+    name: str
+    role: str
+    model: str
+    tools: Tuple[str, ...]
+
+
+def parse_agents(data: object, path: str = AGENTS_PATH) -> Dict[str, AgentConfig]:
+    """
+    Проверяет содержимое agents.yaml и строит конфиги.
+    :param data: результат yaml.safe_load
+    :param path: путь к файлу (для сообщений)
+    :return: имя агента -> AgentConfig
+    :raises AgentConfigError: со списком всех найденных проблем
+    """
+    agents = data.get('agents') if isinstance(data, dict) else None
+    if not isinstance(agents, dict):
+        raise AgentConfigError(["нет раздела 'agents'"], path)
+    problems: List[str] = []
+    configs: Dict[str, AgentConfig] = {}
+    for name, raw in agents.items():
+        if not isinstance(raw, dict):
+            problems.append(f"{name}: ожидается словарь")
+            continue
+        role, model, tools = raw.get('role'), raw.get('model'), raw.get('tools') or []
+        if not isinstance(role, str) or not role.strip():
+            problems.append(f"{name}: пустой role")
+        if model not in KNOWN_MODELS:
+            problems.append(f"{name}: неизвестная модель {model!r}")
+        if not isinstance(tools, list):
+            problems.append(f"{name}: tools должен быть списком")
+            tools = []
+        for tool in tools:
+            if tool not in KNOWN_TOOLS:
+                problems.append(f"{name}: неизвестный инструмент {tool!r}")
+        configs[name] = AgentConfig(name=name, role=(role or '').strip(), model=model or '', tools=tuple(tools))
+    if problems:
+        raise AgentConfigError(problems, path)
+    return configs
+
+
+class AgentRegistry:
+    """
+    Разобранный agents.yaml с перечитыванием по mtime.
+    При ошибке в изменённом файле остаётся последняя корректная версия.
+    """
+
+    def __init__(self, path: str = AGENTS_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._agents: Dict[str, AgentConfig] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.reload()
+
+    def reload(self) -> None:
+        """
+        Перечитывает файл.
+        :raises AgentConfigError: если файл некорректен
+        """
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, 'r', encoding='utf-8') as f:
+            agents = parse_agents(yaml.safe_load(f), self.path)
+        with self._lock:
+            self._agents, self._mtime = agents, mtime
+            self._checked_at = time.monotonic()
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            self.reload()
+            print(f"[AgentRegistry] {os.path.basename(self.path)} перечитан: {len(self._agents)} агентов")
+        except (AgentConfigError, yaml.YAMLError) as e:
+            # Не роняем workflow: остаётся предыдущая версия, ошибка видна в логе
+            self._mtime = mtime
+            print(f"[AgentRegistry] Изменения не применены: {e}")
+
+    def get(self, name: str) -> Optional[AgentConfig]:
+        """
+        :param name: имя агента
+        :return: конфиг или None
+        """
+        self._maybe_reload()
+        return self._agents.get(name)
+
+    def names(self) -> List[str]:
+        self._maybe_reload()
+        return list(self._agents)
+
+
+_registry: Optional[AgentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> AgentRegistry:
+    """
+    Общий реестр процесса (agents.yaml рядом с модулем).
+    :raises AgentConfigError: при первой загрузке некорректного файла
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = AgentRegistry()
+        return _registry
+
+
+def get_agent(name: str) -> Optional[AgentConfig]:
+    """
+    :param name: имя агента
+    :return: конфиг агента или None
+    """
+    return get_registry().get(name)
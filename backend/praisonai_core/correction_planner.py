@@ -0,0 +1,210 @@
+# Планировщик цикла исправлений
+# Группирует открытые отчёты QA и аудита по затронутым файлам и упавшим спекам,
+# находит агентов-владельцев файлов по tasks[*].artifacts_produced и определяет,
+# какие спеки перепроверить. Отчёт закрывается только после успешной перепроверки.
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from praisonai_core.tools import report_parsers
+
+# Типы отчётов, которые обрабатывает цикл исправлений
+CORRECTABLE_REPORT_TYPES = ('qa_functional', 'security_audit')
+# Статусы закрытых отчётов ('fixed' — отчёты старых циклов)
+CLOSED_REPORT_STATUSES = ('resolved', 'fixed')
+
+# Владелец файла, если он не указан ни в одном artifacts_produced
+OWNER_BY_PREFIX = (
+    ('app/views/', 'frontend-dev'),
+    ('app/javascript/', 'frontend-dev'),
+    ('app/assets/', 'frontend-dev'),
+    ('db/', 'database-architect'),
+    ('Dockerfile', 'senior-devops'),
+    ('docker-compose', 'senior-devops'),
+)
+DEFAULT_OWNER = 'backend-dev'
+# Сколько упавших примеров / предупреждений отчёта перечислять в задаче на исправление
+SUMMARY_ITEMS = 5
+
+
+@dataclass
+class CorrectionGroup:
+    """
+    Исправление, поручаемое одному агенту.
+    """
+    agent: str
+    files: Set[str] = field(default_factory=set)
+    specs: Set[str] = field(default_factory=set)
+    report_refs: List[int] = field(default_factory=list)
+    # Перепроверить аудитом безопасности
+    audit: bool = False
+    # Спеки определить не удалось — нужен полный прогон rspec
+    full_run: bool = False
+    summaries: List[str] = field(default_factory=list)
+
+
+def spec_for_source(path: str) -> Optional[str]:
+    """
+    app/models/post.rb -> spec/models/post_spec.rb, lib/x.rb -> spec/lib/x_spec.rb
+    """
+    if not path.endswith('.rb') or path.startswith('spec/'):
+        return None
+    if path.startswith('app/'):
+        return 'spec/' + path[len('app/'):-3] + '_spec.rb'
+    if path.startswith('lib/'):
+        return 'spec/' + path[:-3] + '_spec.rb'
+    return None
+
+
+def source_for_spec(path: str) -> Optional[str]:
+    """
+    spec/models/post_spec.rb -> app/models/post.rb, spec/lib/x_spec.rb -> lib/x.rb
+    """
+    if not (path.startswith('spec/') and path.endswith('_spec.rb')):
+        return None
+    rest = path[len('spec/'):-len('_spec.rb')] + '.rb'
+    return rest if rest.startswith('lib/') else 'app/' + rest
+
+
+def report_targets(report: dict, content: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Файлы и спеки, затронутые отчётом.
+    Берутся из полей files/specs отчёта, его компактной записи details (report_parsers)
+    или JSON-вывода rspec/Brakeman в тексте, иначе — из путей в тексте.
+    :param report: отчёт из state
+    :param content: полный текст отчёта
+    :return: (исходные файлы, спеки)
+    """
+    files = {report_parsers.strip_path(p) for p in report.get('files') or []}
+    specs = {report_parsers.strip_path(p) for p in report.get('specs') or []}
+    if files or specs:
+        return files, specs
+    record = report.get('details') or report_parsers.parse_report(content)
+    if record is not None:
+        return set(record.get('files') or []), set(record.get('failed_specs') or [])
+    for match in report_parsers.SOURCE_PATH_RE.finditer(content or ''):
+        path = report_parsers.strip_path(match.group(1))
+        (specs if path.startswith('spec/') else files).add(path)
+    return files, specs
+
+
+def owner_for_file(path: str, tasks: List[dict]) -> str:
+    """
+    Агент-владелец файла: последняя задача, чей artifacts_produced содержит файл,
+    иначе — по расположению файла (OWNER_BY_PREFIX, DEFAULT_OWNER).
+    """
+    for task in reversed(tasks):
+        if path in (task.get('artifacts_produced') or []):
+            return task.get('assigned_to') or task.get('agent') or DEFAULT_OWNER
+    for prefix, agent in OWNER_BY_PREFIX:
+        if path.startswith(prefix):
+            return agent
+    return DEFAULT_OWNER
+
+
+def open_reports(reports: List[dict]) -> List[Tuple[int, dict]]:
+    """
+    :return: (индекс, отчёт) для незакрытых отчётов QA и аудита
+    """
+    return [(i, r) for i, r in enumerate(reports)
+            if r.get('type') in CORRECTABLE_REPORT_TYPES and r.get('status') not in CLOSED_REPORT_STATUSES]
+
+
+def plan_corrections(reports: Iterable[Tuple[int, dict]], tasks: List[dict],
+                     content_of: Callable[[dict], str],
+                     exists: Callable[[str], bool] = lambda path: True) -> List[CorrectionGroup]:
+    """
+    Строит план исправлений: дубликаты отчётов сливаются, файлы группируются по агентам-владельцам.
+    :param reports: (индекс, отчёт) открытых отчётов
+    :param tasks: задачи проекта (для artifacts_produced)
+    :param content_of: полный текст отчёта (с учётом blob-хранилища)
+    :param exists: проверка существования спека в проекте
+    :return: группы исправлений, по одной на агента
+    """
+    groups: Dict[str, CorrectionGroup] = {}
+    planned: Dict[tuple, List[CorrectionGroup]] = {}
+    for index, report in reports:
+        content = content_of(report) or ''
+        files, specs = report_targets(report, content)
+        key = (report.get('type'), frozenset(files), frozenset(specs)) if files or specs else \
+            (report.get('type'), hashlib.sha1(content.encode('utf-8')).hexdigest())
+        if key in planned:
+            # Повтор уже запланированного отчёта закрывается вместе с ним
+            for group in planned[key]:
+                group.report_refs.append(index)
+            continue
+        audit = report.get('type') == 'security_audit'
+        # Упавший спек поручается владельцу исходника, который он проверяет
+        spec_owner = {spec: owner_for_file(source_for_spec(spec) or '', tasks) for spec in specs}
+        owned: Dict[str, Set[str]] = {agent: set() for agent in spec_owner.values()}
+        for path in files | {source for source in map(source_for_spec, specs) if source}:
+            owned.setdefault(owner_for_file(path, tasks), set()).add(path)
+        if not owned:
+            owned[DEFAULT_OWNER] = set()
+        details = report.get('details')
+        summary = report_parsers.describe(details, SUMMARY_ITEMS) if details else \
+            report.get('summary') or content[:200]
+        planned[key] = []
+        for agent, paths in owned.items():
+            group = groups.setdefault(agent, CorrectionGroup(agent=agent))
+            group_specs = {spec for spec, owner in spec_owner.items() if owner == agent}
+            group_specs |= {spec for spec in map(spec_for_source, paths) if spec and exists(spec)}
+            group.files |= paths
+            group.specs |= group_specs
+            if audit:
+                group.audit = True
+            elif not group_specs:
+                group.full_run = True
+            group.report_refs.append(index)
+            group.summaries.append(summary)
+            planned[key].append(group)
+    return list(groups.values())
+
+
+def failed_specs(output: Optional[str]) -> Optional[Set[str]]:
+    """
+    Упавшие спек-файлы по JSON-выводу rspec.
+    Ошибки вне примеров (спеки не загрузились: синтаксическая ошибка, неизвестная константа)
+    означают, что результат неизвестен, даже если упавших примеров нет.
+    :return: множество файлов или None, если вывод не разобран или прогон не удался
+    """
+    record = report_parsers.parse_rspec(output)
+    if record is None or record['totals']['errors_outside_of_examples']:
+        return None
+    return set(record['failed_specs'])
+
+
+def warning_files(output: Optional[str]) -> Optional[Set[str]]:
+    """
+    Файлы с предупреждениями Brakeman ('' — предупреждения без файла).
+    :return: множество файлов или None, если вывод не разобран
+    """
+    record = report_parsers.parse_brakeman(output)
+    if record is None:
+        return None
+    files = set(record['files'])
+    if record['totals']['warnings'] and not files:
+        files.add('')
+    return files
+
+
+def group_verified(group: CorrectionGroup, failed: Optional[Set[str]], warnings: Optional[Set[str]]) -> bool:
+    """
+    Прошла ли группа перепроверку.
+    :param failed: упавшие спеки (None — rspec не удалось запустить или разобрать)
+    :param warnings: файлы с предупреждениями Brakeman (None — аудит не удался)
+    """
+    if group.specs or group.full_run:
+        if failed is None:
+            return False
+        if group.full_run and failed:
+            return False
+        if group.specs & failed:
+            return False
+    if group.audit:
+        if warnings is None:
+            return False
+        if group.files & warnings or (not group.files and warnings):
+            return False
+    return True
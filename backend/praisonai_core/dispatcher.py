@@ -1,23 +1,80 @@
 # PraisonAI Dispatcher Core
 # Управляет последовательностью агентов, циклами контроля и эскалацией
 
-from typing import Any, Dict
+import os
+import time
+import socket
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from praisonai_core import agent_registry, correction_planner, llm_batcher, llm_cache, tracing
+from praisonai_core.jobs import pid_alive
+from praisonai_core.llm_client import LLMError, get_client
+from praisonai_core.scheduler import AgentScheduler, CycleError
+from praisonai_core.tools import blob_store, code_analyzer, context_manager, cost_ledger, pubsub, testing_runner
+
+# Хост воркера для аренды задач (владелец аренды — "хост:pid")
+WORKER_HOST = socket.gethostname()
+# Токен Plane.so для выгрузки документации по завершении workflow; пустой — выгрузка отключена
+PLANE_API_TOKEN = os.environ.get('APPBUILDER_PLANE_API_TOKEN', '')
+
+
+def _worker_id() -> str:
+    return f"{WORKER_HOST}:{os.getpid()}"
 
 
 class Dispatcher:
     """
     Ядро управления жизненным циклом проекта:
-    - Запускает агентов в нужной последовательности
+    - Запускает агентов по графу зависимостей задач (независимые — параллельно)
     - Следит за статусом и блокировками (state.json)
     - Управляет циклами исправлений и эскалацией
     """
 
+    # Максимум агентов, работающих одновременно
+    MAX_PARALLEL_AGENTS = 4
+    # Лимит одновременных вызовов на модель (остальные модели — DEFAULT_MODEL_CONCURRENCY)
+    MODEL_CONCURRENCY = {'gemini-pro': 2, 'gemini-flash': 4}
+    DEFAULT_MODEL_CONCURRENCY = 2
+    # Аренда задачи in_progress: без heartbeat дольше TASK_LEASE_SECONDS задача считается брошенной
+    TASK_LEASE_SECONDS = 120.0
+    HEARTBEAT_INTERVAL = 30.0
+    # Агенты, пишущие артефакт: агент -> (инструмент, файл). Их вывод стримится в <файл>.partial
+    STREAMED_ARTIFACTS = {
+        'uiux': ('context_manager.write_design', 'DESIGN.md'),
+        'project-manager': ('context_manager.write_specification', 'specification.md'),
+        'solution-architect': ('context_manager.append_to_adr', 'adr_log.md'),
+    }
+    STREAM_ARTIFACTS = True
+    # Не чаще, чем раз в столько секунд, публикуется прогресс генерации артефакта
+    STREAM_PROGRESS_INTERVAL = 0.5
+
     def __init__(self, project_id: str) -> None:
         """
         :param project_id: идентификатор проекта
         """
         self.project_id: str = project_id
-        self.state: dict = self.load_state()
+        # Состояние и потоковый вывод (для переименования .partial) — свои у каждого потока-агента
+        self._local = threading.local()
+        self.state = self.load_state()
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """
+        Состояние проекта текущего потока: словарь последней транзакции этого потока
+        (в новом потоке — прочитанный state.json). Потоки планировщика не видят
+        незавершённых транзакций друг друга.
+        """
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            state = self._local.state = self.load_state()
+        return state
+
+    @state.setter
+    def state(self, value: Dict[str, Any]) -> None:
+        self._local.state = value
 
 
 
@@ -27,7 +84,6 @@ class Dispatcher:
         :return: состояние проекта
         """
         try:
-            from praisonai_core.tools import context_manager
             return context_manager.read_state(self.project_id)
         except Exception as e:
             print(f"[Dispatcher] Ошибка чтения state.json: {e}")
@@ -37,184 +93,412 @@ class Dispatcher:
 
     def save_state(self) -> None:
         """
-        Сохраняет state.json через context_manager.
+        Сохраняет state.json через транзакцию context_manager (одна атомарная запись под блокировкой проекта).
         """
         try:
-            from praisonai_core.tools import context_manager
-            context_manager.write_state(self.project_id, self.state)
+            with tracing.span('save_state', self.project_id), \
+                    context_manager.state_transaction(self.project_id) as state:
+                if state is not self.state:
+                    state.clear()
+                    state.update(self.state)
         except Exception as e:
             print(f"[Dispatcher] Ошибка сохранения state.json: {e}")
 
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, Any]]:
+        """
+        Перечитывает состояние под блокировкой проекта, даёт изменить self.state
+        и фиксирует все изменения одной записью. Изменения, сделанные другими
+        запросами (отчёты, стоимость), при этом не теряются. self.state меняется
+        только у текущего потока.
+        :return: изменяемое состояние (то же, что self.state)
+        """
+        with context_manager.state_transaction(self.project_id) as state:
+            self.state = state
+            yield state
+
+
+    def run_workflow(self) -> Dict[str, Any]:
+        """
+        Главная точка входа: запускает (или продолжает) workflow проекта.
+        Добавляет недостающие задачи агентов, не трогая существующие (fix-задачи, история),
+        переводит проект в статус in_progress и выполняет незавершённые задачи по графу
+        зависимостей: независимые этапы (например, backend-dev и frontend-dev) идут параллельно.
+        Задачи 'done' не перезапускаются, поэтому повторный запуск после сбоя платит
+        только за оставшиеся этапы.
+        :return: сводка подготовки (см. _prepare_tasks)
+        """
+        with tracing.span('workflow', self.project_id):
+            with self.transaction():
+                checkpoint = self._prepare_tasks()
+                self.state['status'] = 'in_progress'
+            print(f"[Dispatcher] Продолжение workflow: {checkpoint}")
+            self.run_scheduled_tasks()
+            self._finish_workflow()
+        return checkpoint
+
+    def resume_workflow(self) -> Dict[str, Any]:
+        """
+        Возобновляет workflow после сбоя или перезапуска (POST /projects/{id}/resume).
+        :return: сводка: сколько задач уже выполнено, восстановлено и перезапущено
+        """
+        return self.run_workflow()
 
-    def run_workflow(self) -> None:
+    def _prepare_tasks(self) -> Dict[str, Any]:
         """
-        Главная точка входа: запускает весь workflow проекта.
-        Генерирует задачи для агентов, переводит проект в статус in_progress.
+        Checkpoint: оставляет выполненные задачи, возвращает в pending задачи с истёкшей
+        арендой (упавший воркер), а также failed и skipped задачи, чтобы продолжить
+        с первого незавершённого этапа. Вызывается внутри транзакции.
+        :return: {'done', 'recovered', 'retried', 'pending'} — id задач
         """
         self._generate_initial_tasks()
-        self.state['status'] = 'in_progress'
-        self.save_state()
-        # Шаг 1: Анализ и проектирование
-        self.run_agent('uiux')
-        self.run_agent('project-manager')
-        self.run_agent('solution-architect')
-        # Шаг 2: Генерация кода
-        self.run_agent('database-architect')
-        self.run_agent('backend-dev')
-        self.run_agent('frontend-dev')
-        # Шаг 3: Контроль качества и безопасности
-        self.run_agent('lead-qa')
-        self.run_agent('security-auditor')
-        # Шаг 4: Финализация
-        self.run_agent('senior-devops')
-        self.run_agent('doc-agent')
+        now = time.time()
+        summary: Dict[str, Any] = {'done': [], 'recovered': [], 'retried': [], 'pending': []}
+        for task in self.state.get('tasks', []):
+            status = task.get('status')
+            if status == 'done':
+                summary['done'].append(task.get('id'))
+                continue
+            if status == 'in_progress':
+                if not self._lease_expired(task, now):
+                    continue
+                print(f"[Dispatcher] Задача {task.get('id')} брошена воркером {task.get('lease_owner')} — возвращаем в очередь")
+                summary['recovered'].append(task.get('id'))
+            elif status in ('failed', 'skipped'):
+                summary['retried'].append(task.get('id'))
+            elif status == 'pending':
+                summary['pending'].append(task.get('id'))
+                continue
+            else:
+                continue
+            task['status'] = 'pending'
+            task['attempts'] = task.get('attempts', 0) + 1
+            task.pop('lease_owner', None)
+            task.pop('heartbeat_at', None)
+        return summary
+
+    def _lease_expired(self, task: dict, now: float) -> bool:
+        # Аренда истекла (нет heartbeat TASK_LEASE_SECONDS) или владелец — завершившийся процесс этого хоста
+        owner = task.get('lease_owner') or ''
+        host, _, pid = owner.rpartition(':')
+        if host == WORKER_HOST and pid.isdigit() and int(pid) != os.getpid() and not pid_alive(int(pid)):
+            return True
+        return now - float(task.get('heartbeat_at') or 0) > self.TASK_LEASE_SECONDS
+
+    def _finish_workflow(self) -> None:
         # --- Интеграция MCP-агента Plane.so ---
         try:
-            from praisonai_core.tools import doc_generator, mcp_plane_exporter
-            # Собираем документацию (пример: Live Project Context)
-            context = "..."  # Здесь можно собрать спецификацию, ADR, отчёты и т.д.
-            docs = doc_generator.generate_docs(self.project_id, context)
-            plane_api_token = "<PLANE_SO_API_TOKEN>"  # Заменить на реальный токен
-            url = mcp_plane_exporter.export_docs_to_plane(self.project_id, docs, plane_api_token)
-            print(f"[Dispatcher] Документация выгружена в Plane.so: {url}")
+            if PLANE_API_TOKEN:
+                from praisonai_core.tools import doc_generator, mcp_plane_exporter
+                # Собираем документацию (пример: Live Project Context)
+                context = "..."  # Здесь можно собрать спецификацию, ADR, отчёты и т.д.
+                docs = doc_generator.generate_docs(self.project_id, context)
+                url = mcp_plane_exporter.export_docs_to_plane(self.project_id, docs, PLANE_API_TOKEN)
+                print(f"[Dispatcher] Документация выгружена в Plane.so: {url}")
         except Exception as e:
             print(f"[Dispatcher] Ошибка выгрузки документации в Plane.so: {e}")
-        self.state['status'] = 'completed'
-        self.save_state()
+        with self.transaction():
+            # Проект с незавершёнными задачами остаётся в своём статусе — его можно возобновить
+            if all(task.get('status') == 'done' for task in self.state.get('tasks', [])):
+                self.state['status'] = 'completed'
 
     def _generate_initial_tasks(self):
-        # Генерирует по одной задаче для каждого ключевого агента
+        # Генерирует по одной задаче для каждого ключевого агента.
+        # priority — номер этапа, dependencies — задачи, результаты которых нужны агенту.
         agents = [
-            ('uiux', 'Создать дизайн и UX-описание'),
-            ('project-manager', 'Сформировать техническую спецификацию'),
-            ('solution-architect', 'Принять архитектурные решения'),
-            ('database-architect', 'Сгенерировать миграции БД'),
-            ('backend-dev', 'Реализовать backend-логику'),
-            ('frontend-dev', 'Реализовать frontend-логику'),
-            ('lead-qa', 'Запустить тесты'),
-            ('security-auditor', 'Провести аудит безопасности'),
-            ('senior-devops', 'Подготовить Dockerfile и docker-compose'),
-            ('doc-agent', 'Сгенерировать документацию и LICENSE'),
+            ('uiux', 'Создать дизайн и UX-описание', 1, []),
+            ('project-manager', 'Сформировать техническую спецификацию', 1, ['uiux']),
+            ('solution-architect', 'Принять архитектурные решения', 1, ['project-manager']),
+            ('database-architect', 'Сгенерировать миграции БД', 2, ['solution-architect']),
+            ('backend-dev', 'Реализовать backend-логику', 2, ['database-architect']),
+            ('frontend-dev', 'Реализовать frontend-логику', 2, ['uiux', 'solution-architect']),
+            ('lead-qa', 'Запустить тесты', 3, ['backend-dev', 'frontend-dev']),
+            ('security-auditor', 'Провести аудит безопасности', 3, ['backend-dev', 'frontend-dev']),
+            ('senior-devops', 'Подготовить Dockerfile и docker-compose', 4, ['backend-dev', 'frontend-dev']),
+            ('doc-agent', 'Сгенерировать документацию и LICENSE', 4, ['lead-qa', 'security-auditor', 'senior-devops']),
         ]
-        self.state['tasks'] = [
+        # Существующие задачи (в т.ч. выполненные и fix-задачи) сохраняются, добавляются только недостающие
+        tasks = self.state.setdefault('tasks', [])
+        existing = {task.get('id') for task in tasks}
+        # Задачи старых проектов без id: планировщик их не видит, поэтому им
+        # назначается id task-<agent> (с зависимостями этапа) или task-<agent>-<n>
+        stages = {agent: (priority, deps) for agent, _, priority, deps in agents}
+        for index, task in enumerate(tasks):
+            if task.get('id'):
+                continue
+            agent = task.get('agent') or 'task'
+            task_id = f"task-{agent}" if f"task-{agent}" not in existing else f"task-{agent}-{index}"
+            task['id'] = task_id
+            existing.add(task_id)
+            if task_id == f"task-{agent}" and agent in stages:
+                task.setdefault('priority', stages[agent][0])
+                task.setdefault('dependencies', [f"task-{dep}" for dep in stages[agent][1]])
+        tasks.extend(
             {
+                'id': f"task-{agent}",
                 'agent': agent,
                 'description': desc,
-                'status': 'pending'
-            } for agent, desc in agents
-        ]
+                'status': 'pending',
+                'priority': priority,
+                'dependencies': [f"task-{dep}" for dep in deps]
+            } for agent, desc, priority, deps in agents if f"task-{agent}" not in existing
+        )
 
+    def run_scheduled_tasks(self) -> Dict[str, str]:
+        """
+        Выполняет pending-задачи проекта через AgentScheduler: DAG по dependencies,
+        приоритеты, пул потоков и лимит параллельных вызовов на модель.
+        Состояние фиксируется транзакциями context_manager, поэтому параллельные
+        агенты не затирают изменения друг друга.
+        :return: id задачи -> итоговый статус
+        """
+        with self.transaction():
+            tasks = [dict(task) for task in self.state.get('tasks', []) if task.get('id')]
 
-    def run_agent(self, agent_name: str):
-        # Реальный вызов LLM/агента на основе agents.yaml
+        def model_of(task: dict) -> str:
+            config = self._get_agent_config(task.get('agent', ''))
+            return config.model if config else ''
+
+        scheduler = AgentScheduler(
+            run_task=lambda task: self.run_agent(task['agent'], task_id=task['id']),
+            model_of=model_of,
+            max_workers=self.MAX_PARALLEL_AGENTS,
+            model_limits=self.MODEL_CONCURRENCY,
+            default_model_limit=self.DEFAULT_MODEL_CONCURRENCY,
+        )
+        try:
+            results = scheduler.run(tasks)
+        except CycleError as e:
+            print(f"[Dispatcher] {e}")
+            with self.transaction():
+                self.state['status'] = 'failed'
+                self.state.setdefault('blockers', []).append(str(e))
+            return {}
+        skipped = [task_id for task_id, status in results.items() if status == 'skipped']
+        if skipped:
+            with self.transaction():
+                for task in self.state.get('tasks', []):
+                    if task.get('id') in skipped and task.get('status') == 'pending':
+                        task['status'] = 'skipped'
+        return results
+
+    def run_agent(self, agent_name: str, task_id: Optional[str] = None) -> str:
+        # Реальный вызов LLM/агента на основе agents.yaml.
+        # task_id — конкретная задача (планировщик), иначе первая pending-задача агента.
+        # Возвращает итоговый статус задачи: 'done' | 'failed' | 'skipped'
+        with tracing.span('run_agent', self.project_id, agent=agent_name) as span:
+            result = self._run_agent(agent_name, task_id)
+            span['labels']['result'] = result
+            return result
+
+    def _run_agent(self, agent_name: str, task_id: Optional[str]) -> str:
         print(f"[Dispatcher] Запуск агента: {agent_name}")
-        task = self._get_next_task_for_agent(agent_name)
-        if not task:
-            print(f"[Dispatcher] Нет задач для агента '{agent_name}', задача пропущена.")
-            self._mark_agent_status(agent_name, 'skipped')
-            self.save_state()
-            return
-        print(f"[Dispatcher] Агенту '{agent_name}' назначена задача: {task}")
-        self._mark_task_in_progress(task)
-        self.state['last_agent'] = agent_name
-        self.save_state()
+        with self.transaction():
+            task = self._get_next_task_for_agent(agent_name, task_id)
+            if not task:
+                print(f"[Dispatcher] Нет задач для агента '{agent_name}', задача пропущена.")
+                self._mark_agent_status(agent_name, 'skipped')
+                return 'skipped'
+            print(f"[Dispatcher] Агенту '{agent_name}' назначена задача: {task}")
+            task_ref = self._task_ref(task)
+            self._mark_task_in_progress(task)
+            self.state['last_agent'] = agent_name
 
         # --- Интеграция с agents.yaml ---
         agent_config = self._get_agent_config(agent_name)
         if not agent_config:
             print(f"[Dispatcher] Не найден конфиг агента '{agent_name}' в agents.yaml")
-            self._mark_task_failed(task)
-            self.save_state()
-            return
-        prompt = agent_config.get('role', '')
-        model = agent_config.get('model', '')
-        tools = agent_config.get('tools', [])
+            with self.transaction():
+                self._mark_task_failed(self._find_task(task_ref) or task)
+            return 'failed'
+        prompt = agent_config.role
+        model = agent_config.model
+        tools = list(agent_config.tools)
         print(f"[Dispatcher] PROMPT для агента '{agent_name}':\n{prompt}")
         print(f"[Dispatcher] Модель: {model}")
         print(f"[Dispatcher] Инструменты: {tools}")
-        # Реальный вызов LLM (API)
-        agent_result, agent_output = self._call_llm_agent(prompt, model, tools, task)
+        # Реальный вызов LLM (API); пока он идёт, аренда задачи продлевается
+        with self._task_heartbeat(task_ref), \
+                tracing.span('llm_call', agent=agent_name, model=model, task=task.get('id')) as span:
+            agent_result, agent_output = self._call_llm_agent(prompt, model, tools, task)
+            span['labels']['result'] = agent_result
+        with self.transaction():
+            task = self._find_task(task_ref) or task
+            if agent_result == 'done':
+                self._mark_task_done(task)
+            elif agent_result == 'failed':
+                self._mark_task_failed(task)
+                if self.state.get('status') != 'llm_cost_limit_exceeded':
+                    self.state['status'] = 'failed'
+            else:
+                self._mark_task_skipped(task)
         if agent_result == 'done':
-            self._mark_task_done(task)
             # Если агент должен записать результат — делаем это через context_manager
             self._handle_agent_output(agent_name, tools, agent_output)
-        elif agent_result == 'failed':
-            self._mark_task_failed(task)
-            self.state['status'] = 'failed'
-        else:
-            self._mark_task_skipped(task)
-        self.save_state()
+        return agent_result if agent_result in ('done', 'failed') else 'skipped'
 
     def _call_llm_agent(self, prompt, model, tools, task):
         """
         Универсальный вызов LLM через API с учётом стоимости. Возвращает ('done'|'failed'|'skipped', output)
         """
-        import requests
-        from praisonai_core.tools import context_manager
-        # Проверка лимита стоимости
-        llm_limit = 10.0  # Установить лимит (например, $10)
-        current_cost = self.state.get('current_llm_cost', 0.0)
-        if current_cost >= llm_limit:
-            print(f"[Dispatcher] LLM cost limit reached: {current_cost} >= {llm_limit}")
-            self.state['status'] = 'llm_cost_limit_exceeded'
-            self.save_state()
+        # Кэш ответов: повтор того же вызова (цикл исправлений, перезапуск) не тратит токены
+        cache = llm_cache.get_cache() if self.state.get('llm_cache_enabled', True) else None
+        cache_key = None
+        if cache is not None:
+            cache_key = llm_cache.make_key(model, prompt, task['description'], self._context_digest())
+            data = cache.get(cache_key)
+            if data is not None:
+                print(f"[Dispatcher] Ответ LLM взят из кэша ({model})")
+                self._record_cache_lookup(hit=True, saved_cost=float(data.get('usage', {}).get('cost', 0.01)))
+                return 'done', data.get('result', '')
+        agent_name = task.get('agent', '')
+        # Резерв оценки стоимости до вызова: лимит не превышается и при параллельных агентах
+        try:
+            reservation = cost_ledger.reserve(self.project_id, agent_name, model,
+                                              limit=self.state.get('llm_cost_limit'))
+        except cost_ledger.BudgetExceeded as e:
+            print(f"[Dispatcher] {e}")
+            with self.transaction():
+                self.state['status'] = 'llm_cost_limit_exceeded'
             return 'failed', ''
-        url = "https://api.example-llm.com/v1/generate"
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "task": task['description']
-        }
+        artifact = self._artifact_for(agent_name, tools)
         try:
-            response = requests.post(url, json=payload, timeout=60)
-            if response.status_code == 200:
-                data = response.json()
-                output = data.get('result', '')
-                # Учёт стоимости (пример: data['usage']['cost'])
-                cost = float(data.get('usage', {}).get('cost', 0.01))
-                context_manager.add_llm_cost(self.project_id, cost)
-                self.state['current_llm_cost'] = self.state.get('current_llm_cost', 0.0) + cost
-                return 'done', output
+            # Пул соединений, таймауты по моделям и повторы на 429/5xx — в LLMClient
+            if artifact:
+                data = self._stream_artifact(model, prompt, task, artifact)
             else:
-                print(f"[Dispatcher] LLM API error: {response.status_code} {response.text}")
-                return 'failed', ''
+                # Короткие вызовы одной модели объединяются в пакет (llm_batcher)
+                data = llm_batcher.get_batcher().generate(model, prompt, task['description'])
+        except LLMError as e:
+            print(f"[Dispatcher] {e}")
+            cost_ledger.release(self.project_id, reservation)
+            return 'failed', ''
         except Exception as e:
             print(f"[Dispatcher] Ошибка вызова LLM API: {e}")
+            cost_ledger.release(self.project_id, reservation)
             return 'failed', ''
+        # Учёт стоимости (пример: data['usage']['cost']) — в журнале costs.jsonl, сразу после ответа;
+        # current_llm_cost в state — копия итога журнала, а не отдельный счётчик
+        usage = data.get('usage', {})
+        cost_ledger.commit(self.project_id, reservation, float(usage.get('cost', 0.01)),
+                           tokens=usage.get('total_tokens', 0))
+        with self.transaction():
+            self.state['current_llm_cost'] = cost_ledger.total_cost(self.project_id)
+        if cache is not None:
+            cache.put(cache_key, data, model=model)
+            self._record_cache_lookup(hit=False)
+        return 'done', data.get('result', '')
+
+    def _artifact_for(self, agent_name: str, tools) -> Optional[str]:
+        # Файл-артефакт, который пишет агент (вывод стримится), или None
+        tool, artifact = self.STREAMED_ARTIFACTS.get(agent_name, (None, None))
+        return artifact if self.STREAM_ARTIFACTS and tool in tools else None
+
+    def _stream_artifact(self, model: str, prompt: str, task: dict, artifact: str) -> Dict[str, Any]:
+        """
+        Потоковый вызов LLM: фрагменты сразу дописываются в <artifact>.partial,
+        прогресс публикуется в топик проекта (SSE /events, событие artifact_progress).
+        Переименование в итоговый файл — в _handle_agent_output после завершения задачи.
+        При обрыве .partial остаётся для разбора.
+        :return: ответ в формате generate ({'result': ..., 'usage': ...})
+        :raises LLMError: ошибка API или поток без завершающего события
+        """
+        partial_path = os.path.join(context_manager.get_project_path(self.project_id), artifact + '.partial')
+        chunks, usage, done = [], {}, False
+        written, last_progress = 0, 0.0
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            for event in get_client().stream(model, prompt, task['description']):
+                delta = event.get('delta') or ''
+                if delta:
+                    f.write(delta)
+                    f.flush()
+                    chunks.append(delta)
+                    written += len(delta)
+                    now = time.monotonic()
+                    if now - last_progress >= self.STREAM_PROGRESS_INTERVAL:
+                        last_progress = now
+                        pubsub.publish(self.project_id, {'type': 'artifact_progress', 'agent': task.get('agent'),
+                                                         'artifact': artifact, 'chars': written})
+                usage = event.get('usage') or usage
+                done = done or bool(event.get('done'))
+        if not done:
+            print(f"[Dispatcher] Поток LLM оборвался, частичный вывод: {partial_path}")
+            raise LLMError(f"Поток LLM API оборвался после {written} символов")
+        self._local.streamed = partial_path
+        return {'result': ''.join(chunks), 'usage': usage}
+
+    def _commit_artifact(self, artifact: str, output: str, append: bool = False) -> None:
+        """
+        Фиксирует артефакт: переименовывает .partial (или пишет вывод атомарно, если потока не было).
+        :param artifact: имя файла в папке проекта
+        :param output: вывод агента
+        :param append: дописать вывод в журнал (adr_log.md) вместо замены файла
+        """
+        path = os.path.join(context_manager.get_project_path(self.project_id), artifact)
+        partial_path = path + '.partial'
+        streamed = getattr(self._local, 'streamed', None) == partial_path
+        self._local.streamed = None
+        if append:
+            context_manager.append_to_adr(self.project_id, output)
+            if streamed:
+                os.remove(partial_path)
+        else:
+            if not streamed:
+                with open(partial_path, 'w', encoding='utf-8') as f:
+                    f.write(output)
+            os.replace(partial_path, path)
+        pubsub.publish(self.project_id, {'type': 'artifact_completed', 'artifact': artifact, 'chars': len(output)})
+
+    # Артефакты проекта, от которых зависит ответ агента (входят в ключ кэша LLM)
+    CONTEXT_ARTIFACTS = ('specification.md', 'DESIGN.md', 'adr_log.md')
+
+    def _context_digest(self) -> str:
+        """
+        Дайджест артефактов проекта: после их изменения закэшированные ответы не используются.
+        :return: sha256 содержимого CONTEXT_ARTIFACTS
+        """
+        digest = hashlib.sha256()
+        project_path = context_manager.get_project_path(self.project_id)
+        for name in self.CONTEXT_ARTIFACTS:
+            digest.update(name.encode('utf-8') + b'\0')
+            try:
+                with open(os.path.join(project_path, name), 'rb') as f:
+                    digest.update(f.read())
+            except FileNotFoundError:
+                pass
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _record_cache_lookup(self, hit: bool, saved_cost: float = 0.0) -> None:
+        # Статистика кэша LLM в state: попадания идут с нулевой стоимостью, saved_cost — сэкономлено
+        with self.transaction():
+            stats = self.state.setdefault('llm_cache', {'hits': 0, 'misses': 0, 'saved_cost': 0.0})
+            if hit:
+                stats['hits'] = stats.get('hits', 0) + 1
+                stats['saved_cost'] = round(stats.get('saved_cost', 0.0) + saved_cost, 6)
+            else:
+                stats['misses'] = stats.get('misses', 0) + 1
+            lookups = stats.get('hits', 0) + stats.get('misses', 0)
+            stats['hit_rate'] = round(stats.get('hits', 0) / lookups, 4) if lookups else 0.0
 
     def _handle_agent_output(self, agent_name, tools, output):
         """
         Обработка вывода агента: если инструмент write_... есть — записываем результат в нужный файл через context_manager
         """
-        from praisonai_core.tools import context_manager
-        import os
         try:
             if not output:
                 return
-            # Пример: если агент может писать DESIGN.md
-            if 'context_manager.write_design' in tools and agent_name == 'uiux':
-                context_manager_path = context_manager.get_project_path(self.project_id)
-                with open(os.path.join(context_manager_path, 'DESIGN.md'), 'w', encoding='utf-8') as f:
-                    f.write(output)
-            # Аналогично для других write_... инструментов (write_specification, append_to_adr и т.д.)
-            if 'context_manager.write_specification' in tools and agent_name == 'project-manager':
-                context_manager_path = context_manager.get_project_path(self.project_id)
-                with open(os.path.join(context_manager_path, 'specification.md'), 'w', encoding='utf-8') as f:
-                    f.write(output)
-            if 'context_manager.append_to_adr' in tools and agent_name == 'solution-architect':
-                context_manager.append_to_adr(self.project_id, output)
+            # DESIGN.md, specification.md — атомарная замена; ADR дописывается только целиком
+            tool, artifact = self.STREAMED_ARTIFACTS.get(agent_name, (None, None))
+            if tool in tools:
+                self._commit_artifact(artifact, output, append=tool == 'context_manager.append_to_adr')
             # ...добавить обработку других инструментов по аналогии...
         except Exception as e:
             print(f"[Dispatcher] Ошибка обработки вывода агента: {e}")
 
-    def _get_agent_config(self, agent_name: str):
-        # Чтение agents.yaml и возврат конфига для агента
-        import yaml
-        import os
-        agents_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'agents.yaml'))
-        with open(agents_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-        return data.get('agents', {}).get(agent_name)
+    def _get_agent_config(self, agent_name: str) -> Optional[agent_registry.AgentConfig]:
+        # Конфиг агента из реестра (agents.yaml разобран и проверен заранее, перечитывается по mtime)
+        return agent_registry.get_agent(agent_name)
 
     def _simulate_agent_execution(self, agent_name, task):
         # Здесь будет реальный вызов LLM/агента. Сейчас — всегда успех.
@@ -229,53 +513,179 @@ class Dispatcher:
 
     def _mark_task_failed(self, task):
         task['status'] = 'failed'
+        task.pop('lease_owner', None)
+        task.pop('heartbeat_at', None)
 
     def _mark_task_skipped(self, task):
         task['status'] = 'skipped'
+        task.pop('lease_owner', None)
+        task.pop('heartbeat_at', None)
 
-    def _get_next_task_for_agent(self, agent_name: str):
-        # Возвращает первую задачу для агента из state.json
+    def _task_ref(self, task: dict) -> tuple:
+        # Ссылка на задачу, переживающая перечитывание состояния: (id, позиция в списке)
+        tasks = self.state.get('tasks', [])
+        index = next((i for i, t in enumerate(tasks) if t is task), -1)
+        return task.get('id'), index
+
+    def _find_task(self, task_ref: tuple) -> Optional[dict]:
+        # Находит задачу в текущем self.state по ссылке из _task_ref
+        return self._find_in(self.state, task_ref)
+
+    @staticmethod
+    def _find_in(state: dict, task_ref: tuple) -> Optional[dict]:
+        task_id, index = task_ref
+        tasks = state.get('tasks', [])
+        if task_id is not None:
+            for task in tasks:
+                if task.get('id') == task_id:
+                    return task
+        if 0 <= index < len(tasks):
+            return tasks[index]
+        return None
+
+    def _get_next_task_for_agent(self, agent_name: str, task_id: Optional[str] = None):
+        # Возвращает первую pending-задачу для агента из state.json (или задачу task_id)
         tasks = self.state.get('tasks', [])
         for task in tasks:
             if task.get('agent') == agent_name and task.get('status') == 'pending':
-                return task
+                if task_id is None or task.get('id') == task_id:
+                    return task
         return None
 
     def _mark_task_in_progress(self, task):
+        # Аренда задачи: владелец и heartbeat, по которым resume находит задачи упавших воркеров
         task['status'] = 'in_progress'
+        task['lease_owner'] = _worker_id()
+        task['heartbeat_at'] = time.time()
 
     def _mark_task_done(self, task):
         task['status'] = 'done'
+        task.pop('lease_owner', None)
+        task.pop('heartbeat_at', None)
+
+    @contextmanager
+    def _task_heartbeat(self, task_ref: tuple) -> Iterator[None]:
+        """
+        Фоновый поток продлевает аренду задачи каждые HEARTBEAT_INTERVAL секунд.
+        :param task_ref: ссылка на задачу из _task_ref
+        """
+        stop = threading.Event()
 
+        def beat() -> None:
+            while not stop.wait(self.HEARTBEAT_INTERVAL):
+                try:
+                    with context_manager.state_transaction(self.project_id) as state:
+                        task = self._find_in(state, task_ref)
+                        if task and task.get('status') == 'in_progress' and task.get('lease_owner') == _worker_id():
+                            task['heartbeat_at'] = time.time()
+                except Exception as e:
+                    print(f"[Dispatcher] Ошибка продления аренды задачи {task_ref[0]}: {e}")
 
-    def handle_correction_cycle(self):
-        # Автоматизация Self-Correction Cycle
-        if self.state.get('status') in ('tests_failed', 'vulnerabilities_found'):
+        thread = threading.Thread(target=beat, name=f"heartbeat-{task_ref[0]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+
+    def handle_correction_cycle(self) -> Dict[str, Any]:
+        """
+        Self-Correction Cycle: открытые отчёты QA и аудита группируются по затронутым
+        файлам и спекам (correction_planner), каждая группа поручается агенту-владельцу
+        файлов, затем перепроверяются только затронутые спеки (и аудит, если были
+        отчёты безопасности). Отчёт закрывается (status='resolved') только после
+        успешной перепроверки; непроверенные остаются открытыми до следующего цикла.
+        :return: {'groups': число групп, 'resolved': индексы закрытых отчётов, 'open': индексы открытых}
+        """
+        with self.transaction():
+            if self.state.get('status') not in ('tests_failed', 'vulnerabilities_found'):
+                return {'groups': 0, 'resolved': [], 'open': []}
             print("[Dispatcher] Обнаружены ошибки — инициируем цикл исправления.")
             self.state['correction_cycle'] = self.state.get('correction_cycle', 0) + 1
-            if self.state['correction_cycle'] > 3:
+            cycle = self.state['correction_cycle']
+            if cycle > 3:
                 self.state['status'] = 'human_intervention_required'
-                self.save_state()
-                return
-            # Генерация задач на исправление по отчётам
+                return {'groups': 0, 'resolved': [], 'open': []}
+            project_path = context_manager.get_project_path(self.project_id)
             reports = self.state.get('reports', [])
-            for report in reports:
-                if report.get('type') in ('qa_functional', 'security_audit') and report.get('status') != 'fixed':
-                    fix_task = {
-                        'id': f"fix-{report.get('related_task', 'unknown')}-{self.state['correction_cycle']}",
-                        'agent': 'auto-fixer',
-                        'description': f"Исправить: {report.get('content', '')}",
-                        'status': 'pending',
-                        'priority': 1,
-                        'dependencies': [report.get('related_task', '')],
-                        'assigned_to': 'auto-fixer',
-                        'artifacts_produced': [],
-                        'subtasks': []
-                    }
-                    self.state.setdefault('tasks', []).append(fix_task)
-                    report['status'] = 'fixed'  # помечаем отчёт как обработанный
-            self.save_state()
-            # Запуск auto-fixer и повторный цикл для developer/QA
-            self.run_agent('auto-fixer')
-            self.run_agent('backend-dev')
-            self.run_agent('lead-qa')
+            groups = correction_planner.plan_corrections(
+                correction_planner.open_reports(reports), self.state.get('tasks', []),
+                content_of=lambda report: blob_store.report_content(self.project_id, report) or '',
+                exists=lambda spec: os.path.exists(os.path.join(project_path, spec)))
+            # Одна задача на агента-владельца: файлы и отчёты, которые нужно исправить
+            for group in groups:
+                task = {
+                    'id': f"fix-{group.agent}-{cycle}",
+                    'agent': group.agent,
+                    'description': self._fix_description(group),
+                    'status': 'pending',
+                    'priority': 1,
+                    'dependencies': [],
+                    'assigned_to': group.agent,
+                    'artifacts_produced': sorted(group.files),
+                    'report_refs': list(group.report_refs),
+                    'subtasks': []
+                }
+                self.state.setdefault('tasks', []).append(task)
+                for index in group.report_refs:
+                    reports[index]['status'] = 'in_correction'
+                    reports[index]['correction_cycle'] = cycle
+        print(f"[Dispatcher] План исправлений: {[(g.agent, sorted(g.files)) for g in groups]}")
+        fixed = [group for group in groups
+                 if self.run_agent(group.agent, task_id=f"fix-{group.agent}-{cycle}") == 'done']
+        verified = self._verify_corrections(fixed)
+        resolved = sorted({i for group in fixed if verified.get(id(group)) for i in group.report_refs})
+        with self.transaction():
+            reports = self.state.get('reports', [])
+            still_open = []
+            for group in groups:
+                for index in group.report_refs:
+                    if index >= len(reports):
+                        continue
+                    if index in resolved:
+                        reports[index]['status'] = 'resolved'
+                    else:
+                        reports[index]['status'] = 'open'
+                        still_open.append(index)
+            if not correction_planner.open_reports(reports) and self.state.get('status') != 'llm_cost_limit_exceeded':
+                self.state['status'] = 'tests_passed'
+        return {'groups': len(groups), 'resolved': resolved, 'open': sorted(set(still_open))}
+
+    def _fix_description(self, group: "correction_planner.CorrectionGroup") -> str:
+        lines = ["Исправить ошибки из отчётов:"] + [f"- {summary}" for summary in group.summaries]
+        if group.files:
+            lines.append(f"Файлы: {', '.join(sorted(group.files))}")
+        if group.specs:
+            lines.append(f"Спеки: {', '.join(sorted(group.specs))}")
+        return "\n".join(lines)
+
+    def _verify_corrections(self, groups: list) -> Dict[int, bool]:
+        """
+        Перепроверка исправленных групп: один прогон rspec по объединению затронутых спеков
+        (если для какой-то группы спеки не определены — по спекам, затронутым изменениями
+        файлов, см. testing_runner.run_changed_tests) и Brakeman, если нужен.
+        :return: id(группы) -> прошла ли перепроверку
+        """
+        if not groups:
+            return {}
+        project_path = context_manager.get_project_path(self.project_id)
+        failed = warnings = None
+        if any(group.specs or group.full_run for group in groups):
+            full_run = any(group.full_run for group in groups)
+            specs = None if full_run else sorted(set().union(*(group.specs for group in groups)))
+            print(f"[Dispatcher] Перепроверка спеков: {'затронутые изменениями' if full_run else specs}")
+            if full_run:
+                # Спеки не определены: прогон по изменённым с прошлого прогона файлам (полный — при необходимости)
+                run = testing_runner.run_changed_tests(project_path, self.state.get('tasks', []))
+                if run['mode'] == 'skipped':
+                    # Отслеживаемые файлы не менялись — спеки не запускались, проверять нечем
+                    run = testing_runner.run_changed_tests(project_path, self.state.get('tasks', []), full=True)
+                output = run['output']
+            else:
+                output = testing_runner.run_specs(project_path, specs)
+            failed = correction_planner.failed_specs(output)
+        if any(group.audit for group in groups):
+            warnings = correction_planner.warning_files(code_analyzer.run_brakeman(project_path))
+        return {id(group): correction_planner.group_verified(group, failed, warnings) for group in groups}
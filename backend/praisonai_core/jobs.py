@@ -0,0 +1,219 @@
+# Фоновые задания (jobs) для долгих операций API
+# Ограниченный пул потоков внутри процесса, без внешнего брокера.
+# Записи заданий (статус, время, результат) сохраняются в projects/.jobs/<job_id>.json,
+# поэтому GET /jobs/{job_id} отвечает и после перезапуска сервера.
+
+import os
+import json
+import time
+import uuid
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Размер пула исполнителей
+JOB_WORKERS = int(os.environ.get('APPBUILDER_JOB_WORKERS', '4'))
+# Сколько завершённых заданий держать в памяти (остальные читаются с диска)
+MEMORY_MAX_FINISHED = 1000
+JOBS_DIR_NAME = '.jobs'
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+FINISHED_STATUSES = (DONE, FAILED)
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    """
+    :param pid: pid процесса этого хоста
+    :return: жив ли другой процесс с таким pid
+    """
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Очередь заданий с пулом из max_workers потоков.
+    Задания, оставшиеся queued/running после остановки создавшего их процесса,
+    при старте помечаются failed (задания живых воркеров uvicorn не трогаем).
+    """
+
+    def __init__(self, directory: str, max_workers: int = JOB_WORKERS) -> None:
+        """
+        :param directory: папка записей заданий
+        :param max_workers: число одновременно выполняемых заданий
+        """
+        self.directory = directory
+        self.max_workers = max_workers
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._finished: List[str] = []
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        # Атомарная запись: временный файл + os.replace
+        fd, tmp_path = tempfile.mkstemp(prefix='.job.', suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(job, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self._path(job['id']))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _save_logged(self, job: Dict[str, Any]) -> None:
+        # Запись из потока задания: ошибка диска не должна прерывать поток,
+        # запись в памяти остаётся актуальной (GET /jobs/{id} отдаёт её)
+        try:
+            self._save(job)
+        except Exception as e:
+            print(f"[Jobs] Не удалось сохранить задание {job.get('id')} ({job.get('status')}): {e}")
+
+    def _recover(self) -> None:
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job.get('status') not in FINISHED_STATUSES and not pid_alive(job.get('pid')):
+                job.update(status=FAILED, error='Задание прервано перезапуском сервера', finished_at=_now())
+                self._save(job)
+                print(f"[Jobs] Задание {job.get('id')} ({job.get('kind')}) прервано перезапуском")
+
+    def submit(self, kind: str, func: Callable[..., Any], *args: Any,
+               project_id: Optional[str] = None, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Ставит задание в очередь и сразу возвращает его запись.
+        :param kind: тип задания (run, resume, feedback, run_tests, security_audit)
+        :param func: выполняемая функция; её результат (JSON) сохраняется в result
+        :param project_id: проект задания
+        :return: запись задания (status=queued)
+        """
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'project_id': project_id,
+            'pid': os.getpid(),
+            'status': QUEUED,
+            'created_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'duration_seconds': None,
+            'result': None,
+            'error': None,
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+            self._save(job)
+            snapshot = dict(job)
+        self._pool.submit(self._run, job['id'], func, args, kwargs)
+        return snapshot
+
+    def _run(self, job_id: str, func: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(status=RUNNING, started_at=_now())
+            self._save_logged(job)
+        started = time.monotonic()
+        try:
+            result, error, status = func(*args, **kwargs), None, DONE
+        except Exception as e:
+            print(f"[Jobs] Ошибка задания {job_id} ({job['kind']}): {e}")
+            result, error, status = None, f"{e}\n{traceback.format_exc(limit=5)}", FAILED
+        with self._lock:
+            job.update(status=status, result=result, error=error, finished_at=_now(),
+                       duration_seconds=round(time.monotonic() - started, 3))
+            self._save_logged(job)
+            self._finished.append(job_id)
+            while len(self._finished) > MEMORY_MAX_FINISHED:
+                self._jobs.pop(self._finished.pop(0), None)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        :param job_id: идентификатор задания
+        :return: копия записи задания или None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        if not job_id or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def active(self, project_id: str, kinds: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        """
+        Незавершённое задание проекта одного из типов kinds (задания этого процесса).
+        :param project_id: проект
+        :param kinds: типы заданий
+        :return: копия записи задания или None
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job['project_id'] == project_id and job['kind'] in kinds \
+                        and job['status'] not in FINISHED_STATUSES:
+                    return dict(job)
+        return None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Ожидает завершения задания (тесты, CLI).
+        :return: запись задания или None, если его нет
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(0.01)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+_queues: Dict[str, JobQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue(base_path: Optional[str] = None) -> JobQueue:
+    """
+    Общая очередь заданий для папки проектов (projects/.jobs).
+    :param base_path: папка проектов (по умолчанию context_manager.BASE_PROJECTS_PATH)
+    """
+    if base_path is None:
+        from praisonai_core.tools import context_manager
+        base_path = context_manager.BASE_PROJECTS_PATH
+    directory = os.path.join(base_path, JOBS_DIR_NAME)
+    with _queues_lock:
+        queue = _queues.get(directory)
+        if queue is None:
+            queue = _queues[directory] = JobQueue(directory)
+        return queue
@@ -0,0 +1,149 @@
+# Micro-batching вызовов LLM
+# Независимые вызовы одной модели, пришедшие в течение короткого окна, отправляются
+# одним запросом {"model", "batch": [{"id", "prompt", "task"}, ...]}. Ответ
+# {"results": [{"id", "result", "usage"}, ...]} разбирается обратно по вызовам;
+# если batch-запрос не удался или ответ не разобран, недостающие вызовы идут по одному.
+
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from praisonai_core.llm_client import LLMClient, get_client
+
+# Модели с короткими структурированными ответами, вызовы которых объединяются
+BATCHED_MODELS = frozenset({'gemini-flash'})
+# Сколько ждать попутчиков после первого вызова (сек); 0 — batching выключен
+BATCH_WINDOW_SECONDS = float(os.environ.get('APPBUILDER_LLM_BATCH_WINDOW', '0.05'))
+BATCH_MAX_SIZE = 8
+
+
+class _Batch:
+    __slots__ = ('items', 'full')
+
+    def __init__(self) -> None:
+        # (prompt, task_description, future)
+        self.items: List[Tuple[str, str, Future]] = []
+        self.full = threading.Event()
+
+
+class LLMBatcher:
+    """
+    Объединяет одновременные вызовы generate одной модели.
+    Первый вызов окна (лидер) ждёт window секунд или заполнения пакета и отправляет
+    запрос за всех; остальные ждут свой результат. Отдельного потока нет.
+    """
+
+    def __init__(self, client: Optional[LLMClient] = None, window: float = BATCH_WINDOW_SECONDS,
+                 max_batch: int = BATCH_MAX_SIZE, models: frozenset = BATCHED_MODELS) -> None:
+        """
+        :param client: клиент LLM API (по умолчанию общий get_client())
+        :param window: окно сбора пакета (сек)
+        :param max_batch: максимальный размер пакета
+        :param models: модели, для которых включён batching
+        """
+        self._client = client
+        self.window = window
+        self.max_batch = max_batch
+        self.models = models
+        self._open: Dict[str, _Batch] = {}
+        self._lock = threading.Lock()
+        self.counters = {'calls': 0, 'requests': 0, 'batches': 0, 'fallbacks': 0}
+
+    @property
+    def client(self) -> LLMClient:
+        return self._client or get_client()
+
+    def generate(self, model: str, prompt: str, task_description: str) -> Dict[str, Any]:
+        """
+        То же, что LLMClient.generate, но с объединением вызовов.
+        :return: JSON-ответ ({'result': ..., 'usage': {...}})
+        :raises LLMError: ошибка вызова
+        """
+        with self._lock:
+            self.counters['calls'] += 1
+        if model not in self.models or self.window <= 0 or self.max_batch < 2:
+            return self._single(model, prompt, task_description)
+        future: Future = Future()
+        with self._lock:
+            batch = self._open.get(model)
+            leader = batch is None
+            if leader:
+                batch = self._open[model] = _Batch()
+            batch.items.append((prompt, task_description, future))
+            if len(batch.items) >= self.max_batch:
+                self._open.pop(model, None)
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(model) is batch:
+                    self._open.pop(model)
+            self._send(model, batch.items)
+        return future.result()
+
+    def _single(self, model: str, prompt: str, task_description: str) -> Dict[str, Any]:
+        with self._lock:
+            self.counters['requests'] += 1
+        return self.client.generate(model, prompt, task_description)
+
+    def _send(self, model: str, items: List[Tuple[str, str, Future]]) -> None:
+        pending = dict(enumerate(items))
+        if len(items) > 1:
+            with self._lock:
+                self.counters['requests'] += 1
+                self.counters['batches'] += 1
+            payload = {
+                'model': model,
+                'batch': [{'id': str(i), 'prompt': prompt, 'task': task} for i, (prompt, task, _) in pending.items()],
+            }
+            try:
+                results = self.client.post(model, payload).json().get('results')
+                for result in results if isinstance(results, list) else []:
+                    index = int(result.get('id', -1)) if str(result.get('id', '')).isdigit() else -1
+                    if index in pending and isinstance(result.get('result'), str):
+                        pending.pop(index)[2].set_result({'result': result['result'], 'usage': result.get('usage', {})})
+            except Exception as e:
+                print(f"[LLMBatcher] Пакетный запрос {model} ({len(items)}) не удался, вызываем по одному: {e}")
+        # Недостающие результаты — обычными вызовами
+        for prompt, task, future in pending.values():
+            if len(items) > 1:
+                with self._lock:
+                    self.counters['fallbacks'] += 1
+            try:
+                future.set_result(self._single(model, prompt, task))
+            except Exception as e:
+                future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: counters и среднее число вызовов на HTTP-запрос
+        """
+        with self._lock:
+            counters = dict(self.counters)
+        counters['calls_per_request'] = round(counters['calls'] / counters['requests'], 3) if counters['requests'] else 0.0
+        return counters
+
+
+_batcher: Optional[LLMBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> LLMBatcher:
+    """
+    Общий batcher процесса (поверх общего клиента get_client()).
+    """
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = LLMBatcher()
+        return _batcher
+
+
+def set_batcher(batcher: Optional[LLMBatcher]) -> None:
+    """
+    Подменяет общий batcher (тесты, бенчмарки; LLMBatcher(window=0) выключает batching).
+    """
+    global _batcher
+    with _batcher_lock:
+        _batcher = batcher
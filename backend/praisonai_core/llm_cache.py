@@ -0,0 +1,197 @@
+# Кэш ответов LLM
+# Ключ — хэш (модель, промпт, описание задачи, дайджест контекста).
+# Два уровня: LRU в памяти и файлы на диске с TTL и ограничением общего размера.
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Размер LRU в памяти (записей)
+MEMORY_MAX_ENTRIES = 256
+# Время жизни записи на диске (сек)
+DISK_TTL_SECONDS = int(os.environ.get('APPBUILDER_LLM_CACHE_TTL', str(7 * 24 * 3600)))
+# Ограничение суммарного размера дискового кэша (байт)
+DISK_MAX_BYTES = int(os.environ.get('APPBUILDER_LLM_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+CACHE_DIR_NAME = '.llm_cache'
+
+
+def make_key(model: str, prompt: str, task_description: str, context_digest: str = '') -> str:
+    """
+    :return: sha256-ключ кэша для вызова
+    """
+    raw = json.dumps([model, prompt, task_description, context_digest], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Двухуровневый кэш ответов LLM (память + диск). Потокобезопасен.
+    """
+
+    def __init__(self, directory: str, memory_max_entries: int = MEMORY_MAX_ENTRIES,
+                 ttl_seconds: int = DISK_TTL_SECONDS, max_bytes: int = DISK_MAX_BYTES) -> None:
+        self.directory = directory
+        self.memory_max_entries = memory_max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        :param key: ключ make_key
+        :return: закэшированный ответ API или None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry['created_at'] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return entry['response']
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.counters['disk_hits'] += 1
+            self._remember(key, entry)
+        return entry['response']
+
+    def put(self, key: str, response: Dict[str, Any], model: str = '') -> None:
+        """
+        Сохраняет ответ в оба уровня. Ошибка записи на диск (нет места, прав)
+        не прерывает вызов: ответ остаётся только в памяти.
+        :param key: ключ make_key
+        :param response: JSON-ответ API
+        :param model: модель (для диагностики)
+        """
+        entry = {'created_at': time.time(), 'model': model, 'response': response}
+        with self._lock:
+            self._remember(key, entry)
+            self.counters['stores'] += 1
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        path = self._path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            fd, tmp_path = tempfile.mkstemp(prefix='.entry.', suffix='.tmp', dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[LLMCache] Не удалось записать ответ в кэш ({model}): {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_size()
+            else:
+                self._disk_bytes += len(data) - previous_size
+            over_limit = self._disk_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if now - entry.get('created_at', 0) > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        return entry
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        # Удаляем просроченные и самые старые записи, пока не уложимся в 90% лимита
+        now = time.time()
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for mtime, size, path in entries:
+            if total <= target and now - mtime <= self.ttl_seconds:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.counters['evictions'] += evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: счётчики попаданий/промахов и hit_rate
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            memory_entries = len(self._memory)
+        lookups = counters['memory_hits'] + counters['disk_hits'] + counters['misses']
+        hits = counters['memory_hits'] + counters['disk_hits']
+        counters['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        counters['memory_entries'] = memory_entries
+        return counters
+
+
+_caches: Dict[str, LLMResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(base_path: Optional[str] = None) -> LLMResponseCache:
+    """
+    Общий кэш для папки проектов (projects/.llm_cache).
+    :param base_path: папка проектов (по умолчанию context_manager.BASE_PROJECTS_PATH)
+    """
+    if base_path is None:
+        from praisonai_core.tools import context_manager
+        base_path = context_manager.BASE_PROJECTS_PATH
+    directory = os.path.join(base_path, CACHE_DIR_NAME)
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = _caches[directory] = LLMResponseCache(directory)
+        return cache
@@ -0,0 +1,225 @@
+# HTTP-клиент LLM API для Dispatcher
+# Пул соединений (keep-alive), таймауты по моделям, повторы с экспоненциальной
+# задержкой и jitter на 429/5xx с учётом Retry-After, лимит одновременных запросов на модель.
+
+import os
+import json
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_LLM_URL = os.environ.get('APPBUILDER_LLM_URL', 'https://api.example-llm.com/v1/generate')
+
+# Таймаут запроса (сек) по моделям; длинная генерация кода у pro-модели
+MODEL_TIMEOUTS = {'gemini-pro': 120.0, 'gemini-flash': 45.0}
+DEFAULT_TIMEOUT = 60.0
+# Максимум одновременных запросов к одной модели
+MODEL_MAX_IN_FLIGHT = {'gemini-pro': 4, 'gemini-flash': 8}
+DEFAULT_MAX_IN_FLIGHT = 4
+# Коды ответа, после которых запрос повторяется
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class LLMError(Exception):
+    """
+    Ошибка вызова LLM API после исчерпания повторов.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: str = '') -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class LLMClient:
+    """
+    Переиспользуемый клиент LLM API. Потокобезопасен: один экземпляр обслуживает
+    всех агентов процесса.
+    """
+
+    def __init__(self, url: Optional[str] = None, max_retries: int = 4, backoff_base: float = 0.5,
+                 backoff_max: float = 20.0, timeouts: Optional[Dict[str, float]] = None,
+                 max_in_flight: Optional[Dict[str, int]] = None, pool_size: int = 16,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        """
+        :param url: адрес endpoint генерации (по умолчанию APPBUILDER_LLM_URL)
+        :param max_retries: число повторов после первой попытки
+        :param backoff_base: базовая задержка экспоненциального backoff (сек)
+        :param backoff_max: верхняя граница задержки (сек)
+        :param timeouts: таймауты по моделям (дополняют MODEL_TIMEOUTS)
+        :param max_in_flight: лимиты одновременных запросов по моделям (дополняют MODEL_MAX_IN_FLIGHT)
+        :param pool_size: размер пула соединений
+        :param sleep: функция ожидания (подменяется в тестах)
+        """
+        self.url = url or DEFAULT_LLM_URL
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeouts = dict(MODEL_TIMEOUTS, **(timeouts or {}))
+        self.max_in_flight = dict(MODEL_MAX_IN_FLIGHT, **(max_in_flight or {}))
+        self.sleep = sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+
+    def timeout_for(self, model: str) -> float:
+        return self.timeouts.get(model, DEFAULT_TIMEOUT)
+
+    def _slot(self, model: str) -> threading.BoundedSemaphore:
+        # Ограничение одновременных запросов к модели
+        with self._slots_lock:
+            slot = self._slots.get(model)
+            if slot is None:
+                slot = self._slots[model] = threading.BoundedSemaphore(
+                    self.max_in_flight.get(model, DEFAULT_MAX_IN_FLIGHT))
+        return slot
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: случайная задержка в [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return min(self.backoff_max, max(0.0, float(value)))
+        except ValueError:
+            pass
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return min(self.backoff_max, max(0.0, (moment - datetime.now(timezone.utc)).total_seconds()))
+
+    def post(self, model: str, payload: Dict[str, Any], stream: bool = False,
+             url: Optional[str] = None) -> requests.Response:
+        """
+        POST с повторами на 429/5xx и сетевых ошибках.
+        Слот модели занят только на время запроса: паузы между повторами его не держат.
+        При stream=True слот освобождается до чтения тела — для потоков с учётом лимита используйте stream().
+        :param model: модель (для таймаута и лимита параллельности)
+        :param payload: тело запроса
+        :param stream: не читать тело ответа сразу
+        :param url: адрес (по умолчанию self.url)
+        :return: успешный ответ (200)
+        :raises LLMError: если все попытки неуспешны
+        """
+        response, slot = self._request(model, payload, stream, url)
+        slot.release()
+        return response
+
+    def _request(self, model: str, payload: Dict[str, Any], stream: bool,
+                 url: Optional[str]) -> Tuple[requests.Response, threading.BoundedSemaphore]:
+        # Успешный ответ возвращается вместе с занятым слотом: освобождает вызывающий
+        slot = self._slot(model)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            slot.acquire()
+            try:
+                response = self.session.post(url or self.url, json=payload, timeout=self.timeout_for(model),
+                                             stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                slot.release()
+                if last_attempt:
+                    raise LLMError(f"LLM API недоступен: {e}") from e
+                self.sleep(self._backoff(attempt))
+                continue
+            except BaseException:
+                slot.release()
+                raise
+            if response.status_code == 200:
+                return response, slot
+            try:
+                body = response.text
+            finally:
+                response.close()
+                slot.release()
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                delay = self._retry_after(response)
+                self.sleep(delay if delay is not None else self._backoff(attempt))
+                continue
+            raise LLMError(f"LLM API error: {response.status_code} {body}", response.status_code, body)
+        raise LLMError("LLM API: попытки исчерпаны")
+
+    def generate(self, model: str, prompt: str, task_description: str, **extra: Any) -> Dict[str, Any]:
+        """
+        Вызов генерации.
+        :param model: модель
+        :param prompt: роль агента
+        :param task_description: описание задачи
+        :return: JSON-ответ API ({'result': ..., 'usage': {...}})
+        """
+        payload = {"model": model, "prompt": prompt, "task": task_description}
+        payload.update(extra)
+        return self.post(model, payload).json()
+
+    def stream(self, model: str, prompt: str, task_description: str, **extra: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Потоковая генерация. API отдаёт NDJSON: строки {"delta": "..."} и завершающую
+        {"done": true, "usage": {...}}. Если сервер ответил обычным JSON, он отдаётся
+        одним событием {"delta": result, "usage": ..., "done": true}.
+        Повторы возможны только до получения первого байта ответа.
+        :param model: модель
+        :param prompt: роль агента
+        :param task_description: описание задачи
+        :return: итератор событий
+        :raises LLMError: ошибка запроса или обрыв потока
+        """
+        payload = {"model": model, "prompt": prompt, "task": task_description, "stream": True}
+        payload.update(extra)
+        # Слот модели занят до конца чтения тела: потоки учитываются в лимите параллельности
+        response, slot = self._request(model, payload, True, None)
+        try:
+            if 'ndjson' not in response.headers.get('Content-Type', ''):
+                data = response.json()
+                yield {"delta": data.get('result', ''), "usage": data.get('usage', {}), "done": True}
+                return
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+        except (requests.RequestException, ValueError) as e:
+            raise LLMError(f"Обрыв потока LLM API: {e}") from e
+        finally:
+            response.close()
+            slot.release()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> LLMClient:
+    """
+    Общий клиент процесса (создаётся при первом обращении).
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+def set_client(client: Optional[LLMClient]) -> None:
+    """
+    Подменяет общий клиент (другой endpoint, тесты, бенчмарки).
+    """
+    global _client
+    with _client_lock:
+        if _client is not None and _client is not client:
+            _client.close()
+        _client = client
@@ -0,0 +1,154 @@
+# Планировщик агентов по графу зависимостей задач
+# Строит DAG из tasks[*].dependencies, запускает готовые задачи параллельно
+# на ограниченном пуле потоков с учётом priority и лимита параллелизма на модель.
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set
+
+
+class CycleError(ValueError):
+    """
+    В зависимостях задач обнаружен цикл.
+    """
+
+    def __init__(self, cycle: List[str]) -> None:
+        super().__init__(f"Цикл в зависимостях задач: {' -> '.join(cycle)}")
+        self.cycle = cycle
+
+
+def build_graph(tasks: List[dict]) -> Dict[str, Set[str]]:
+    """
+    Строит граф зависимостей: id задачи -> id задач, которые должны завершиться раньше.
+    Зависимости на задачи вне списка (пустые, внешние, уже удалённые) игнорируются.
+    :param tasks: задачи из state.json
+    :return: граф зависимостей
+    """
+    ids = {task['id'] for task in tasks}
+    return {
+        task['id']: {dep for dep in (task.get('dependencies') or []) if dep in ids and dep != task['id']}
+        for task in tasks
+    }
+
+
+def find_cycle(graph: Dict[str, Set[str]]) -> Optional[List[str]]:
+    """
+    Ищет цикл в графе (DFS с раскраской).
+    :param graph: граф зависимостей
+    :return: вершины цикла (первая повторена в конце) или None
+    """
+    white, grey, black = 0, 1, 2
+    color = {node: white for node in graph}
+    stack: List[str] = []
+
+    def visit(node: str) -> Optional[List[str]]:
+        color[node] = grey
+        stack.append(node)
+        for dep in sorted(graph[node]):
+            if color[dep] == grey:
+                return stack[stack.index(dep):] + [dep]
+            if color[dep] == white:
+                cycle = visit(dep)
+                if cycle:
+                    return cycle
+        stack.pop()
+        color[node] = black
+        return None
+
+    for node in sorted(graph):
+        if color[node] == white:
+            cycle = visit(node)
+            if cycle:
+                return cycle
+    return None
+
+
+class AgentScheduler:
+    """
+    Запускает задачи по готовности зависимостей:
+    - не более max_workers агентов одновременно;
+    - не более model_limits[model] (или default_model_limit) вызовов одной модели;
+    - среди готовых задач первой берётся задача с меньшим priority, затем по порядку в списке;
+    - задачи, зависящие от неуспешных, не запускаются и получают статус 'skipped';
+    - задачи, зависящие от выполняемых другим запуском ('in_progress' с живой арендой),
+      не запускаются и получают статус 'waiting' (в state остаются pending).
+    """
+
+    def __init__(self, run_task: Callable[[dict], str], model_of: Callable[[dict], str],
+                 max_workers: int = 4, model_limits: Optional[Dict[str, int]] = None,
+                 default_model_limit: int = 2) -> None:
+        """
+        :param run_task: выполняет задачу, возвращает итоговый статус ('done'|'failed'|'skipped')
+        :param model_of: возвращает модель, на которой работает агент задачи
+        :param max_workers: размер пула потоков
+        :param model_limits: лимит одновременных задач на модель
+        :param default_model_limit: лимит для моделей, не указанных в model_limits
+        """
+        self.run_task = run_task
+        self.model_of = model_of
+        self.max_workers = max_workers
+        self.model_limits = model_limits or {}
+        self.default_model_limit = default_model_limit
+
+    def run(self, tasks: List[dict]) -> Dict[str, str]:
+        """
+        Выполняет pending-задачи из списка. Задачи с другими статусами считаются уже
+        отработанными: 'done' удовлетворяет зависимость, 'in_progress' (задачу выполняет
+        другой запуск) откладывает зависимые, прочие — нет.
+        :param tasks: задачи (нужны id, dependencies, priority, status)
+        :return: id задачи -> итоговый статус
+        :raises CycleError: если в зависимостях есть цикл
+        """
+        graph = build_graph(tasks)
+        cycle = find_cycle(graph)
+        if cycle:
+            raise CycleError(cycle)
+        order = {task['id']: index for index, task in enumerate(tasks)}
+        by_id = {task['id']: task for task in tasks}
+        results: Dict[str, str] = {
+            task['id']: task.get('status', 'pending') for task in tasks if task.get('status', 'pending') != 'pending'
+        }
+        waiting = [task['id'] for task in tasks if task['id'] not in results]
+        running: Dict[Future, str] = {}
+        in_flight: Dict[str, int] = {}
+
+        def sort_key(task_id: str) -> tuple:
+            priority = by_id[task_id].get('priority')
+            return (priority if isinstance(priority, (int, float)) else float('inf'), order[task_id])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='agent') as pool:
+            while waiting or running:
+                # Задачи, у которых зависимость завершилась неуспешно, не запускаем
+                for task_id in list(waiting):
+                    deps = [results.get(dep) for dep in graph[task_id]]
+                    if any(dep in ('in_progress', 'waiting') for dep in deps):
+                        # Зависимость ещё выполняется в другом запуске — задачу не трогаем
+                        results[task_id] = 'waiting'
+                        waiting.remove(task_id)
+                    elif any(dep not in (None, 'done') for dep in deps):
+                        results[task_id] = 'skipped'
+                        waiting.remove(task_id)
+                ready = sorted((task_id for task_id in waiting if all(results.get(dep) == 'done' for dep in graph[task_id])),
+                               key=sort_key)
+                for task_id in ready:
+                    if len(running) >= self.max_workers:
+                        break
+                    model = self.model_of(by_id[task_id])
+                    if in_flight.get(model, 0) >= max(1, self.model_limits.get(model, self.default_model_limit)):
+                        continue
+                    in_flight[model] = in_flight.get(model, 0) + 1
+                    waiting.remove(task_id)
+                    running[pool.submit(self.run_task, by_id[task_id])] = task_id
+                if not running:
+                    # Остались только задачи, чьи зависимости уже не выполнятся
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_id = running.pop(future)
+                    model = self.model_of(by_id[task_id])
+                    in_flight[model] -= 1
+                    try:
+                        results[task_id] = future.result() or 'failed'
+                    except Exception as e:
+                        print(f"[Scheduler] Ошибка выполнения задачи {task_id}: {e}")
+                        results[task_id] = 'failed'
+        return results
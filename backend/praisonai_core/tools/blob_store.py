@@ -0,0 +1,120 @@
+# Контентно-адресуемое хранилище больших payload'ов отчётов
+# Большие отчёты (stdout RSpec/Brakeman) хранятся сжатыми в projects/<id>/blobs/<sha256[:2]>/<sha256>.gz,
+# а в state остаются только ссылка и краткое содержание.
+
+import os
+import gzip
+import hashlib
+import tempfile
+from typing import Any, Dict, Iterator, Optional
+
+from praisonai_core.tools import context_manager
+
+BLOBS_DIR = 'blobs'
+# Отчёты с content длиннее порога (в байтах UTF-8) выносятся в blob
+BLOB_THRESHOLD_BYTES = int(os.environ.get('APPBUILDER_BLOB_THRESHOLD_BYTES', str(16 * 1024)))
+# Длина краткого содержания, остающегося в state
+SUMMARY_CHARS = 500
+CHUNK_SIZE = 64 * 1024
+
+
+def _blob_path(project_id: str, sha256: str) -> str:
+    if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+        raise ValueError(f"Некорректный идентификатор blob: {sha256}")
+    return os.path.join(context_manager.get_project_path(project_id), BLOBS_DIR, sha256[:2], f"{sha256}.gz")
+
+
+def put_blob(project_id: str, data: bytes) -> Dict[str, Any]:
+    """
+    Сохраняет данные в хранилище проекта. Одинаковые данные хранятся один раз.
+    :param project_id: идентификатор проекта
+    :param data: содержимое
+    :return: ссылка {'sha256', 'size', 'encoding'}
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = _blob_path(project_id, sha256)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.blob.', suffix='.tmp', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return {'sha256': sha256, 'size': len(data), 'encoding': 'gzip'}
+
+
+def has_blob(project_id: str, sha256: str) -> bool:
+    return os.path.exists(_blob_path(project_id, sha256))
+
+
+def read_blob(project_id: str, sha256: str) -> bytes:
+    """
+    :return: распакованное содержимое blob
+    """
+    with gzip.open(_blob_path(project_id, sha256), 'rb') as f:
+        return f.read()
+
+
+def iter_blob(project_id: str, sha256: str, compressed: bool = False) -> Iterator[bytes]:
+    """
+    Потоково отдаёт содержимое blob кусками по CHUNK_SIZE.
+    :param project_id: идентификатор проекта
+    :param sha256: идентификатор blob
+    :param compressed: отдавать сжатые байты как есть (для Content-Encoding: gzip)
+    :return: итератор байтовых кусков
+    """
+    path = _blob_path(project_id, sha256)
+    opener = open if compressed else gzip.open
+    with opener(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def summarize(content: str) -> str:
+    """
+    Краткое содержание большого отчёта для state.
+    :param content: полный текст
+    :return: начало текста с пометкой о выносе в blob
+    """
+    if len(content) <= SUMMARY_CHARS:
+        return content
+    return content[:SUMMARY_CHARS] + f"\n… [сокращено, полный размер {len(content)} символов]"
+
+
+def externalize_report(project_id: str, report: dict) -> dict:
+    """
+    Выносит большой report['content'] в blob: в отчёте остаются content_ref и краткое содержание.
+    Отчёт изменяется на месте.
+    :param project_id: идентификатор проекта
+    :param report: отчёт
+    :return: тот же отчёт
+    """
+    content = report.get('content')
+    if not isinstance(content, str) or 'content_ref' in report:
+        return report
+    data = content.encode('utf-8')
+    if len(data) <= BLOB_THRESHOLD_BYTES:
+        return report
+    report['content_ref'] = put_blob(project_id, data)
+    report['content'] = summarize(content)
+    return report
+
+
+def report_content(project_id: str, report: dict) -> Optional[str]:
+    """
+    Полный текст отчёта: из blob, если он вынесен, иначе report['content'].
+    :param project_id: идентификатор проекта
+    :param report: отчёт
+    :return: текст отчёта
+    """
+    ref = report.get('content_ref')
+    if ref:
+        return read_blob(project_id, ref['sha256']).decode('utf-8')
+    return report.get('content')
@@ -1,20 +1,169 @@
-
 # Модуль анализа кода и безопасности
-import subprocess
+# Brakeman предустановлен в образе исполнителя (Dockerfile.ruby), гемы проекта для него не нужны.
+# Результаты кэшируются в <project>/.brakeman_cache по Merkle-дайджесту проверяемых файлов:
+# если Ruby-код не менялся с прошлого аудита, отчёт возвращается без запуска Brakeman.
+
 import os
-from typing import Optional
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from praisonai_core import tracing
+from praisonai_core.tools import runner
+
+BRAKEMAN_COMMAND = 'brakeman . --no-progress --no-exit-on-warn --format json'
+CACHE_DIR_NAME = '.brakeman_cache'
+INDEX_FILE = 'index.json'
+# Сколько последних результатов хранить
+CACHE_KEEP_RESULTS = int(os.environ.get('APPBUILDER_BRAKEMAN_CACHE_KEEP', '10'))
+# Что читает Brakeman: изменения фронтенда и документации дайджест не меняют
+AUDITED_DIRS = ('app', 'config', 'lib', 'db')
+AUDITED_ROOT_FILES = ('Gemfile', 'Gemfile.lock', 'config.ru', 'Rakefile')
+AUDITED_EXTENSIONS = ('.rb', '.erb', '.haml', '.slim', '.rake', '.yml', '.ru')
 
-def run_brakeman(project_path: str) -> Optional[str]:
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+@tracing.traced('run_brakeman')
+def run_brakeman(project_path: str, use_cache: bool = True) -> Optional[str]:
     """
-    Запускает Brakeman для аудита безопасности Rails-проекта через Docker.
-    Возвращает stdout (отчёт) или None при ошибке.
+    Запускает Brakeman для аудита безопасности Rails-проекта (по умолчанию через Docker).
+    Если проверяемые файлы не менялись с прошлого успешного аудита, возвращает его результат.
+    :param project_path: путь к проекту
+    :param use_cache: использовать кэш результатов
+    :return: stdout (JSON-отчёт) или None при ошибке
     """
+    if not use_cache:
+        return _run(project_path)
+    with _lock_for(project_path):
+        cache_dir = os.path.join(project_path, CACHE_DIR_NAME)
+        digest = tree_digest(project_path, cache_dir)
+        cached = _load_result(cache_dir, digest)
+        if cached is not None:
+            print(f"[code_analyzer] Brakeman: код не менялся ({digest[:12]}), результат из кэша")
+            return cached
+        output = _run(project_path)
+        if output is not None:
+            _store_result(cache_dir, digest, output)
+        return output
+
+
+def _run(project_path: str) -> Optional[str]:
     try:
-        docker_cmd = [
-            'docker', 'run', '--rm', '-v', f'{project_path}:/app', '-w', '/app', 'ruby:3.2',
-            'bash', '-c', 'gem install brakeman && brakeman /app --no-progress --format json'
-        ]
-        result = subprocess.run(docker_cmd, capture_output=True, text=True, check=True)
-        return result.stdout
-    except Exception as e:
+        result = runner.get_executor().run(project_path, BRAKEMAN_COMMAND, bundle=False)
+    except Exception:
         return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _lock_for(project_path: str) -> threading.Lock:
+    # Параллельные аудиты одного проекта не запускают Brakeman дважды
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(project_path), threading.Lock())
+
+
+def _audited_files(project_path: str) -> List[str]:
+    paths = [name for name in AUDITED_ROOT_FILES if os.path.isfile(os.path.join(project_path, name))]
+    for top in AUDITED_DIRS:
+        for root, dirs, files in os.walk(os.path.join(project_path, top)):
+            dirs.sort()
+            paths.extend(os.path.relpath(os.path.join(root, name), project_path).replace(os.sep, '/')
+                         for name in sorted(files) if name.endswith(AUDITED_EXTENSIONS))
+    return paths
+
+
+def tree_digest(project_path: str, cache_dir: Optional[str] = None) -> str:
+    """
+    Merkle-дайджест проверяемых файлов: хэш файла -> хэш каталога (имена и хэши детей) -> корень.
+    Хэши файлов с прежними mtime и размером берутся из индекса (cache_dir/index.json) без чтения.
+    В дайджест входит команда Brakeman: смена флагов инвалидирует кэш.
+    :param project_path: путь к проекту
+    :param cache_dir: папка кэша с индексом (None — без индекса)
+    :return: sha256 корня
+    """
+    index_path = os.path.join(cache_dir, INDEX_FILE) if cache_dir else None
+    index = _read_json(index_path) if index_path else {}
+    files: Dict[str, list] = {}
+    for path in _audited_files(project_path):
+        try:
+            stat = os.stat(os.path.join(project_path, path))
+        except OSError:
+            continue
+        known = index.get(path)
+        if isinstance(known, list) and known[1:] == [stat.st_mtime_ns, stat.st_size]:
+            files[path] = known
+            continue
+        with open(os.path.join(project_path, path), 'rb') as f:
+            files[path] = [hashlib.sha256(f.read()).hexdigest(), stat.st_mtime_ns, stat.st_size]
+    if index_path and files != index:
+        _write_json(index_path, files)
+    # Дерево каталогов: каталог -> {имя: хэш}
+    tree: Dict[str, Dict[str, str]] = {'': {}}
+    for path, (sha, _, _) in files.items():
+        parts = path.split('/')
+        for depth in range(1, len(parts)):
+            tree.setdefault('/'.join(parts[:depth]), {})
+        tree['/'.join(parts[:-1])][parts[-1]] = sha
+    for directory in sorted(tree, key=lambda d: d.count('/') if d else -1, reverse=True):
+        if not directory:
+            continue
+        parent, _, name = directory.rpartition('/')
+        tree[parent][name + '/'] = _node_hash(tree[directory])
+    return hashlib.sha256((BRAKEMAN_COMMAND + '\n' + _node_hash(tree[''])).encode('utf-8')).hexdigest()
+
+
+def _node_hash(children: Dict[str, str]) -> str:
+    return hashlib.sha256(''.join(f'{name}:{sha}\n' for name, sha in sorted(children.items())).encode('utf-8')).hexdigest()
+
+
+def _load_result(cache_dir: str, digest: str) -> Optional[str]:
+    entry = _read_json(os.path.join(cache_dir, f'{digest}.json'))
+    if entry.get('digest') != digest or not isinstance(entry.get('output'), str):
+        return None
+    return entry['output']
+
+
+def _store_result(cache_dir: str, digest: str, output: str) -> None:
+    _write_json(os.path.join(cache_dir, f'{digest}.json'),
+                {'digest': digest, 'created_at': time.time(), 'output': output})
+    results: List[Tuple[float, str]] = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.json') and name != INDEX_FILE and not name.startswith('.'):
+            path = os.path.join(cache_dir, name)
+            try:
+                results.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+    for _, path in sorted(results)[:-CACHE_KEEP_RESULTS or None]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_json(path: str, data: dict) -> None:
+    directory = os.path.dirname(path)
+    tmp_path = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp.', suffix='.json', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"[code_analyzer] Не удалось записать кэш Brakeman {path}: {e}")
@@ -23,10 +23,46 @@ def search_project_codebase(project_id: str, query: str) -> list[str]:
 
 import os
 import json
-from typing import Any, Dict
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+from praisonai_core import tracing
+from praisonai_core.tools import event_log, project_registry, pubsub
 
 BASE_PROJECTS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../projects'))
 
+# Режим хранения состояния: 'json' — state.json целиком (по умолчанию),
+# 'events' — append-only журнал events.jsonl со снапшотами (см. event_log),
+# 'sqlite' — общая база state.sqlite3 с индексами по задачам и отчётам (см. sqlite_store)
+STATE_BACKEND = os.environ.get('APPBUILDER_STATE_BACKEND', 'json')
+
+# Максимальное число проектов, чьё состояние держится в памяти (LRU)
+STATE_CACHE_MAX_PROJECTS = 64
+
+# project_id -> (сигнатура файла, состояние). Сигнатура: (путь, mtime_ns, size, inode)
+_state_cache: "OrderedDict[str, Tuple[tuple, Dict[str, Any]]]" = OrderedDict()
+_state_cache_lock = threading.Lock()
+
+# Пер-проектные блокировки для транзакций над состоянием
+_project_locks: Dict[str, threading.RLock] = {}
+_project_locks_guard = threading.Lock()
+# Активные транзакции текущего потока: project_id -> изменяемое состояние
+_txn_local = threading.local()
+# Проекты, для которых уже запущена фоновая компакция журнала
+_compactions_running: set = set()
+# Счётчики записей состояния процесса (бенчмарки): число write_state и записанные байты
+_write_counters = {'writes': 0, 'bytes': 0}
+_write_counters_lock = threading.Lock()
+
 
 def get_project_path(project_id: str) -> str:
     """
@@ -37,34 +73,414 @@ def get_project_path(project_id: str) -> str:
     return os.path.join(BASE_PROJECTS_PATH, project_id)
 
 
+def _copy_json(value: Any) -> Any:
+    """
+    Быстрая глубокая копия JSON-совместимых данных (без memo, в отличие от copy.deepcopy).
+    :param value: dict/list/скаляр
+    :return: независимая копия
+    """
+    if isinstance(value, dict):
+        return {k: _copy_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(v) for v in value]
+    return value
+
+
+def _state_signature(path: str) -> Optional[tuple]:
+    """
+    Возвращает сигнатуру файла состояния для инвалидации кэша.
+    :param path: путь к state.json
+    :return: (путь, mtime_ns, size, inode) или None, если файла нет
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _cache_get(project_id: str, signature: tuple) -> Optional[Dict[str, Any]]:
+    with _state_cache_lock:
+        entry = _state_cache.get(project_id)
+        if entry is None or entry[0] != signature:
+            return None
+        _state_cache.move_to_end(project_id)
+        return entry[1]
+
+
+def _cache_put(project_id: str, signature: Optional[tuple], state: Dict[str, Any]) -> None:
+    with _state_cache_lock:
+        if signature is None:
+            _state_cache.pop(project_id, None)
+            return
+        _state_cache[project_id] = (signature, state)
+        _state_cache.move_to_end(project_id)
+        while len(_state_cache) > STATE_CACHE_MAX_PROJECTS:
+            _state_cache.popitem(last=False)
+
+
+def _get_project_lock(project_id: str) -> threading.RLock:
+    with _project_locks_guard:
+        lock = _project_locks.get(project_id)
+        if lock is None:
+            lock = _project_locks[project_id] = threading.RLock()
+        return lock
+
+
+def invalidate_state_cache(project_id: Optional[str] = None) -> None:
+    """
+    Сбрасывает кэш состояния (для одного проекта или целиком).
+    :param project_id: идентификатор проекта или None для всех проектов
+    """
+    with _state_cache_lock:
+        if project_id is None:
+            _state_cache.clear()
+        else:
+            _state_cache.pop(project_id, None)
+
+
+class _JsonStateBackend:
+    """
+    Хранение состояния целиком в state.json (режим по умолчанию).
+    """
+    INCREMENTAL = False
+
+    @staticmethod
+    def signature(project_path: str) -> Optional[tuple]:
+        return _state_signature(os.path.join(project_path, 'state.json'))
+
+    @staticmethod
+    def load(project_path: str) -> Dict[str, Any]:
+        with open(os.path.join(project_path, 'state.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def save(project_path: str, state: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> int:
+        path = os.path.join(project_path, 'state.json')
+        fd, tmp_path = tempfile.mkstemp(prefix='.state.', suffix='.tmp', dir=project_path)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+                written = f.tell()
+            os.replace(tmp_path, path)
+            return written
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def _get_backend():
+    """
+    Возвращает хранилище состояния согласно STATE_BACKEND.
+    """
+    if STATE_BACKEND == 'events':
+        return event_log
+    if STATE_BACKEND == 'sqlite':
+        from praisonai_core.tools import sqlite_store
+        return sqlite_store
+    return _JsonStateBackend
+
+
+def _backend_signature(backend, project_path: str) -> Optional[tuple]:
+    signature = backend.signature(project_path)
+    if signature is None:
+        return None
+    return (STATE_BACKEND,) + signature
+
+
+def _load_cached(project_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает состояние из кэша или хранилища. Результат разделяется с кэшем — не изменять.
+    :param project_id: идентификатор проекта
+    :return: состояние или None, если проекта нет
+    """
+    backend = _get_backend()
+    project_path = get_project_path(project_id)
+    signature = _backend_signature(backend, project_path)
+    if signature is None:
+        return None
+    cached = _cache_get(project_id, signature)
+    if cached is not None:
+        return cached
+    state = backend.load(project_path)
+    if 'status' not in state:
+        state['status'] = 'init'
+    _cache_put(project_id, signature, state)
+    return state
+
+
+def has_state(project_id: str) -> bool:
+    """
+    Есть ли у проекта сохранённое состояние (в текущем хранилище STATE_BACKEND).
+    :param project_id: идентификатор проекта
+    """
+    return _backend_signature(_get_backend(), get_project_path(project_id)) is not None
+
+
+def get_state_version(project_id: str) -> str:
+    """
+    Дешёвая версия состояния проекта (по сигнатуре хранилища, без чтения state):
+    меняется при каждой записи. Используется как ETag.
+    :param project_id: идентификатор проекта
+    :return: короткий хэш версии
+    """
+    signature = _backend_signature(_get_backend(), get_project_path(project_id))
+    return hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:16]
+
+
 def read_state(project_id: str) -> Dict[str, Any]:
     """
-    Читает state.json проекта.
+    Читает состояние проекта (state.json или журнал событий, см. STATE_BACKEND).
+    Повторные чтения обслуживаются из in-process кэша, пока файлы хранилища
+    не изменились. Вызывающий получает собственную копию.
     :param project_id: идентификатор проекта
     :return: словарь состояния
     """
-    path = os.path.join(get_project_path(project_id), 'state.json')
-    if not os.path.exists(path):
+    state = _load_cached(project_id)
+    if state is None:
         # Возвращаем дефолтное состояние, чтобы избежать KeyError
         return {'status': 'init'}
-    with open(path, 'r', encoding='utf-8') as f:
-        state = json.load(f)
-    if 'status' not in state:
-        state['status'] = 'init'
-    return state
+    return _copy_json(state)
 
 
 def write_state(project_id: str, state: Dict[str, Any]) -> None:
     """
-    Записывает state.json проекта.
+    Записывает состояние проекта и обновляет кэш (write-through).
+    В режиме 'json' state.json перезаписывается атомарно (временный файл + rename),
+    в режиме 'events' в журнал дописывается только дельта.
     :param project_id: идентификатор проекта
     :param state: новое состояние
     """
-    path = os.path.join(get_project_path(project_id), 'state.json')
+    # Одиночные записи вне спанов (запросы API) учитываются только в метриках, не в таймлайне
+    with tracing.span('write_state', project_id if tracing.in_span() else None):
+        _write_state(project_id, state)
+
+
+def _write_state(project_id: str, state: Dict[str, Any]) -> None:
+    backend = _get_backend()
+    project_path = get_project_path(project_id)
     # Гарантируем, что директория существует
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.makedirs(project_path, exist_ok=True)
+    with _get_project_lock(project_id):
+        notify = pubsub.has_subscribers(project_id)
+        previous = _load_cached(project_id) if backend.INCREMENTAL or notify else None
+        # Спаны проекта (tracing) сохраняются вместе с состоянием
+        tracing.attach_timeline(project_id, state)
+        written = backend.save(project_path, state, previous if backend.INCREMENTAL else None)
+        with _write_counters_lock:
+            _write_counters['writes'] += 1
+            _write_counters['bytes'] += written or 0
+        cached = _copy_json(state)
+        if 'status' not in cached:
+            cached['status'] = 'init'
+        _cache_put(project_id, _backend_signature(backend, project_path), cached)
+        if notify:
+            _publish_changes(project_id, previous, cached)
+        try:
+            project_registry.record_project(BASE_PROJECTS_PATH, project_id, cached)
+        except Exception as e:
+            # Реестр — вторичный индекс: его сбой не должен ломать запись состояния
+            print(f"[context_manager] Ошибка обновления реестра проектов {project_id}: {e}")
+        if hasattr(backend, 'needs_compaction') and backend.needs_compaction(project_path):
+            _schedule_compaction(project_id)
+
+
+def write_stats(reset: bool = False) -> Dict[str, int]:
+    """
+    Счётчики записей состояния в этом процессе.
+    bytes — записанные байты для хранилищ 'json' и 'events' ('sqlite' их не сообщает).
+    :param reset: обнулить счётчики после чтения
+    :return: {'writes': ..., 'bytes': ...}
+    """
+    with _write_counters_lock:
+        stats = dict(_write_counters)
+        if reset:
+            _write_counters.update(writes=0, bytes=0)
+    return stats
+
+
+def _publish_changes(project_id: str, previous: Optional[Dict[str, Any]], state: Dict[str, Any]) -> None:
+    """
+    Публикует дельту состояния подписчикам проекта (SSE /events).
+    """
+    if previous is None:
+        ops = [{'op': 'set', 'path': [], 'value': state}]
+    else:
+        ops = event_log.diff_state(previous, state)
+    if ops:
+        pubsub.publish(project_id, {
+            'type': 'state_changed',
+            'version': get_state_version(project_id),
+            'ops': _copy_json(ops),
+        })
+
+
+def compact_state_log(project_id: str) -> None:
+    """
+    Сворачивает журнал событий проекта в снапшот (только для режима 'events').
+    :param project_id: идентификатор проекта
+    """
+    backend = _get_backend()
+    if not hasattr(backend, 'compact'):
+        return
+    project_path = get_project_path(project_id)
+    with _get_project_lock(project_id), _interprocess_lock(project_id):
+        state = _load_cached(project_id)
+        if state is None:
+            return
+        backend.compact(project_path, state)
+        _cache_put(project_id, _backend_signature(backend, project_path), state)
+
+
+def _schedule_compaction(project_id: str) -> None:
+    with _project_locks_guard:
+        if project_id in _compactions_running:
+            return
+        _compactions_running.add(project_id)
+
+    def run() -> None:
+        try:
+            compact_state_log(project_id)
+        except Exception as e:
+            print(f"[context_manager] Ошибка компакции журнала {project_id}: {e}")
+        finally:
+            with _project_locks_guard:
+                _compactions_running.discard(project_id)
+
+    threading.Thread(target=run, name=f"state-compaction-{project_id}", daemon=True).start()
+
+
+@contextmanager
+def _interprocess_lock(project_id: str) -> Iterator[None]:
+    """
+    Блокировка на уровне файловой системы (несколько воркеров uvicorn).
+    :param project_id: идентификатор проекта
+    """
+    if fcntl is None:
+        yield
+        return
+    project_path = get_project_path(project_id)
+    os.makedirs(project_path, exist_ok=True)
+    with open(os.path.join(project_path, '.state.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def state_transaction(project_id: str) -> Iterator[Dict[str, Any]]:
+    """
+    Транзакция над состоянием проекта: берёт пер-проектную блокировку, отдаёт изменяемое
+    состояние и одним атомарным write_state фиксирует все изменения при выходе.
+    При исключении изменения отбрасываются. Вложенные транзакции того же потока
+    работают с тем же состоянием, фиксация происходит во внешней.
+
+        with context_manager.state_transaction(project_id) as state:
+            state['status'] = 'in_progress'
+            state.setdefault('reports', []).append(report)
+
+    :param project_id: идентификатор проекта
+    :return: изменяемый словарь состояния
+    """
+    active = getattr(_txn_local, 'states', None)
+    if active is None:
+        active = _txn_local.states = {}
+    if project_id in active:
+        yield active[project_id]
+        return
+    with _get_project_lock(project_id), _interprocess_lock(project_id):
+        state = read_state(project_id)
+        active[project_id] = state
+        try:
+            yield state
+        finally:
+            active.pop(project_id, None)
+        write_state(project_id, state)
+
+
+def flush_timeline(project_id: str) -> None:
+    """
+    Сохраняет в state спаны (tracing), завершившиеся после последней записи состояния,
+    например внешний спан задания. Вызывается по окончании фоновой операции.
+    :param project_id: идентификатор проекта
+    """
+    if not os.path.isdir(get_project_path(project_id)):
+        return
+    try:
+        with state_transaction(project_id):
+            pass
+    except Exception as e:
+        print(f"[context_manager] Ошибка сохранения таймлайна {project_id}: {e}")
+
+
+def read_status(project_id: str) -> str:
+    """
+    Возвращает статус проекта (в режиме 'sqlite' — без загрузки задач и отчётов).
+    :param project_id: идентификатор проекта
+    :return: статус
+    """
+    backend = _get_backend()
+    if hasattr(backend, 'read_status'):
+        status = backend.read_status(get_project_path(project_id))
+        if status is not None:
+            return status
+    state = _load_cached(project_id)
+    return state.get('status', 'init') if state is not None else 'init'
+
+
+def _query(project_id: str, key: str, filters: Dict[str, Any], limit: Optional[int],
+           cursor: Optional[int]) -> Tuple[List[dict], Optional[int]]:
+    backend = _get_backend()
+    backend_query = getattr(backend, f'query_{key}', None)
+    if backend_query is not None:
+        result = backend_query(get_project_path(project_id), filters, limit, cursor)
+        if result is not None:
+            return result
+    # Хранилища без индексов: фильтрация закэшированного состояния
+    state = _load_cached(project_id) or {}
+    items = []
+    next_cursor = None
+    for position, item in enumerate(state.get(key, [])):
+        if cursor is not None and position < cursor:
+            continue
+        if any(value is not None and item.get(field) != value for field, value in filters.items()):
+            continue
+        if limit is not None and len(items) == limit:
+            next_cursor = position
+            break
+        items.append(_copy_json(item))
+    return items, next_cursor
+
+
+def query_tasks(project_id: str, status: Optional[str] = None, assigned_to: Optional[str] = None,
+                limit: Optional[int] = None, cursor: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+    """
+    Выборка задач по статусу и исполнителю с пагинацией.
+    :param project_id: идентификатор проекта
+    :param status: фильтр по статусу
+    :param assigned_to: фильтр по исполнителю
+    :param limit: максимум задач на странице (None — все)
+    :param cursor: позиция, с которой начинать (next_cursor предыдущей страницы)
+    :return: (задачи, курсор следующей страницы или None)
+    """
+    return _query(project_id, 'tasks', {'status': status, 'assigned_to': assigned_to}, limit, cursor)
+
+
+def query_reports(project_id: str, report_type: Optional[str] = None, severity: Optional[str] = None,
+                  limit: Optional[int] = None, cursor: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+    """
+    Выборка отчётов по типу и severity с пагинацией.
+    :param project_id: идентификатор проекта
+    :param report_type: фильтр по типу отчёта
+    :param severity: фильтр по severity
+    :param limit: максимум отчётов на странице (None — все)
+    :param cursor: позиция, с которой начинать (next_cursor предыдущей страницы)
+    :return: (отчёты, курсор следующей страницы или None)
+    """
+    return _query(project_id, 'reports', {'type': report_type, 'severity': severity}, limit, cursor)
 
 
 def read_specification(project_id: str) -> str:
@@ -108,7 +524,6 @@ def add_task(project_id: str, task: dict) -> None:
     :param project_id: идентификатор проекта
     :param task: словарь с описанием задачи
     """
-    state = read_state(project_id)
     subtasks = task.get('subtasks', [])
     if task.get('type') in ('feature', 'bugfix'):
         subtasks.append({
@@ -126,8 +541,8 @@ def add_task(project_id: str, task: dict) -> None:
             'assigned_to': 'security_auditor'
         })
         task['subtasks'] = subtasks
-    state.setdefault('tasks', []).append(task)
-    write_state(project_id, state)
+    with state_transaction(project_id) as state:
+        state.setdefault('tasks', []).append(task)
 
 def update_task_status(project_id: str, task_id: str, status: str) -> None:
     """
@@ -136,37 +551,38 @@ def update_task_status(project_id: str, task_id: str, status: str) -> None:
     :param task_id: идентификатор задачи
     :param status: новый статус
     """
-    state = read_state(project_id)
-    for task in state.get('tasks', []):
-        if task['id'] == task_id:
-            task['status'] = status
-    write_state(project_id, state)
+    with state_transaction(project_id) as state:
+        for task in state.get('tasks', []):
+            if task['id'] == task_id:
+                task['status'] = status
 
 def add_report(project_id: str, report: dict) -> None:
     """
-    Добавляет отчёт в проект.
+    Добавляет отчёт в проект. Большой content выносится в blob-хранилище (см. blob_store),
+    в state остаются ссылка content_ref и краткое содержание.
     :param project_id: идентификатор проекта
     :param report: словарь с отчётом
     """
-    state = read_state(project_id)
-    state.setdefault('reports', []).append(report)
-    write_state(project_id, state)
+    from praisonai_core.tools import blob_store
+    blob_store.externalize_report(project_id, report)
+    with state_transaction(project_id) as state:
+        state.setdefault('reports', []).append(report)
 
 def increment_iteration_count(project_id: str) -> None:
     """
     Увеличивает счётчик итераций проекта.
     :param project_id: идентификатор проекта
     """
-    state = read_state(project_id)
-    state['iteration_count'] = state.get('iteration_count', 0) + 1
-    write_state(project_id, state)
+    with state_transaction(project_id) as state:
+        state['iteration_count'] = state.get('iteration_count', 0) + 1
 
 def add_llm_cost(project_id: str, cost: float) -> None:
     """
-    Добавляет стоимость LLM к проекту.
+    Добавляет стоимость LLM к проекту: запись в журнале costs.jsonl (см. cost_ledger),
+    current_llm_cost в state — копия итога журнала.
     :param project_id: идентификатор проекта
     :param cost: добавляемая стоимость
     """
-    state = read_state(project_id)
-    state['current_llm_cost'] = state.get('current_llm_cost', 0.0) + cost
-    write_state(project_id, state)
+    from praisonai_core.tools import cost_ledger
+    with state_transaction(project_id) as state:
+        state['current_llm_cost'] = cost_ledger.record(project_id, cost)
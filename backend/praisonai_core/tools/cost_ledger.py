@@ -0,0 +1,272 @@
+# Журнал стоимости LLM проекта (costs.jsonl)
+# Append-only записи reserve/commit/release. Перед вызовом LLM резервируется оценка
+# стоимости: проверка лимита и резерв — одна атомарная операция под блокировкой проекта
+# (потоки и воркеры uvicorn), поэтому параллельные агенты не превышают бюджет.
+# Журнал проекта, созданного до его появления, начинается записью seed с накопленной
+# state['current_llm_cost'], чтобы бюджет и история не обнулились.
+
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+LEDGER_FILE = 'costs.jsonl'
+LOCK_FILE = '.costs.lock'
+
+# Лимит стоимости проекта по умолчанию ($); переопределяется state['llm_cost_limit']
+DEFAULT_COST_LIMIT = float(os.environ.get('APPBUILDER_LLM_COST_LIMIT', '10.0'))
+# Оценка стоимости вызова, пока по модели нет фактических данных
+MODEL_COST_ESTIMATES = {'gemini-pro': 0.05, 'gemini-flash': 0.01}
+DEFAULT_COST_ESTIMATE = 0.02
+# Резерв, не зафиксированный за это время (упавший воркер), перестаёт занимать бюджет
+RESERVATION_TTL_SECONDS = 600
+
+
+class BudgetExceeded(Exception):
+    """
+    Резерв превысил бы лимит стоимости проекта.
+    """
+
+    def __init__(self, project_id: str, limit: float, committed: float, reserved: float, estimate: float) -> None:
+        super().__init__(f"LLM cost limit reached for {project_id}: "
+                         f"{committed:.4f} + {reserved:.4f} reserved + {estimate:.4f} > {limit}")
+        self.limit = limit
+        self.committed = committed
+        self.reserved = reserved
+        self.estimate = estimate
+
+
+class _Totals:
+    # Агрегаты журнала, дочитываемые инкрементально с позиции offset
+    __slots__ = ('offset', 'committed', 'tokens', 'calls', 'by_agent', 'by_model', 'open')
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.committed = 0.0
+        self.tokens = 0
+        self.calls = 0
+        self.by_agent: Dict[str, Dict[str, float]] = {}
+        self.by_model: Dict[str, Dict[str, float]] = {}
+        self.open: Dict[str, Dict[str, Any]] = {}
+
+    def apply(self, entry: Dict[str, Any]) -> None:
+        kind = entry.get('type')
+        if kind == 'reserve':
+            self.open[entry['id']] = entry
+        elif kind == 'release':
+            self.open.pop(entry.get('id'), None)
+        elif kind == 'seed':
+            # Стоимость, накопленная до появления журнала (без разбивки по вызовам)
+            self.committed += float(entry.get('cost') or 0.0)
+        elif kind == 'commit':
+            self.open.pop(entry.get('id'), None)
+            cost, tokens = float(entry.get('cost') or 0.0), int(entry.get('tokens') or 0)
+            self.committed += cost
+            self.tokens += tokens
+            self.calls += 1
+            for bucket, key in ((self.by_agent, entry.get('agent') or 'unknown'),
+                                (self.by_model, entry.get('model') or 'unknown')):
+                agg = bucket.setdefault(key, {'cost': 0.0, 'tokens': 0, 'calls': 0})
+                agg['cost'] += cost
+                agg['tokens'] += tokens
+                agg['calls'] += 1
+
+    def reserved(self, now: float) -> float:
+        return sum(float(e.get('estimate') or 0.0) for e in self.open.values()
+                   if now - e.get('ts', now) <= RESERVATION_TTL_SECONDS)
+
+
+_totals: Dict[str, _Totals] = {}
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _project_path(project_id: str) -> str:
+    from praisonai_core.tools import context_manager
+    return context_manager.get_project_path(project_id)
+
+
+@contextmanager
+def _locked(project_id: str) -> Iterator[_Totals]:
+    """
+    Блокировка журнала (поток + файл) и актуальные агрегаты: дочитывает записи,
+    добавленные другими процессами.
+    """
+    project_path = _project_path(project_id)
+    ledger_path = os.path.join(project_path, LEDGER_FILE)
+    with _locks_guard:
+        lock = _locks.setdefault(ledger_path, threading.Lock())
+    with lock:
+        os.makedirs(project_path, exist_ok=True)
+        with open(os.path.join(project_path, LOCK_FILE), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                totals = _totals.get(ledger_path)
+                exists = os.path.exists(ledger_path)
+                size = os.path.getsize(ledger_path) if exists else 0
+                if totals is None or size < totals.offset:
+                    totals = _totals[ledger_path] = _Totals()
+                if not exists:
+                    _seed(project_id, totals)
+                if size > totals.offset:
+                    with open(ledger_path, 'rb') as f:
+                        f.seek(totals.offset)
+                        for line in f:
+                            if not line.endswith(b'\n'):
+                                break
+                            totals.offset += len(line)
+                            try:
+                                totals.apply(json.loads(line))
+                            except ValueError:
+                                continue
+                    if totals.offset < size:
+                        _truncate_torn_tail(ledger_path, totals.offset, size)
+                yield totals
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _truncate_torn_tail(ledger_path: str, offset: int, size: int) -> None:
+    # Недописанная последняя строка (сбой во время записи) отрезается под блокировкой:
+    # иначе следующая запись склеится с ней и потеряется, а offset разойдётся с файлом
+    print(f"[cost_ledger] Отрезана недописанная строка журнала {ledger_path} ({size - offset} байт)")
+    with open(ledger_path, 'rb+') as f:
+        f.truncate(offset)
+
+
+def _append(project_id: str, totals: _Totals, entry: Dict[str, Any]) -> None:
+    line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+    with open(os.path.join(_project_path(project_id), LEDGER_FILE), 'ab') as f:
+        f.write(line)
+    totals.offset += len(line)
+    totals.apply(entry)
+
+
+def _seed(project_id: str, totals: _Totals) -> None:
+    # Новый журнал существующего проекта: переносим стоимость из state.
+    # read_state не берёт блокировку состояния, поэтому порядок блокировок
+    # (состояние -> журнал в Dispatcher) не нарушается
+    from praisonai_core.tools import context_manager
+    try:
+        cost = float(context_manager.read_state(project_id).get('current_llm_cost') or 0.0)
+    except (TypeError, ValueError):
+        cost = 0.0
+    if cost > 0:
+        print(f"[cost_ledger] Журнал {project_id} начат с накопленной стоимости {cost:.4f}")
+        _append(project_id, totals, {'type': 'seed', 'id': 'seed', 'cost': round(cost, 6), 'ts': time.time()})
+
+
+def estimate_cost(project_id: str, model: str) -> float:
+    """
+    Оценка стоимости вызова: средняя фактическая по модели, иначе MODEL_COST_ESTIMATES.
+    """
+    with _locked(project_id) as totals:
+        return _estimate(totals, model)
+
+
+def _estimate(totals: _Totals, model: str) -> float:
+    agg = totals.by_model.get(model)
+    if agg and agg['calls']:
+        return agg['cost'] / agg['calls']
+    return MODEL_COST_ESTIMATES.get(model, DEFAULT_COST_ESTIMATE)
+
+
+def reserve(project_id: str, agent: str, model: str, estimate: Optional[float] = None,
+            limit: Optional[float] = None) -> str:
+    """
+    Атомарно проверяет бюджет и резервирует оценку стоимости вызова.
+    :param project_id: идентификатор проекта
+    :param agent: агент
+    :param model: модель
+    :param estimate: оценка стоимости (по умолчанию estimate_cost)
+    :param limit: лимит проекта (по умолчанию DEFAULT_COST_LIMIT)
+    :return: id резерва для commit/release
+    :raises BudgetExceeded: если резерв превысил бы лимит
+    """
+    limit = DEFAULT_COST_LIMIT if limit is None else float(limit)
+    now = time.time()
+    with _locked(project_id) as totals:
+        if estimate is None:
+            estimate = _estimate(totals, model)
+        reserved = totals.reserved(now)
+        if totals.committed + reserved + estimate > limit:
+            raise BudgetExceeded(project_id, limit, totals.committed, reserved, estimate)
+        reservation_id = uuid.uuid4().hex
+        _append(project_id, totals, {'type': 'reserve', 'id': reservation_id, 'agent': agent, 'model': model,
+                                     'estimate': round(estimate, 6), 'ts': now})
+    return reservation_id
+
+
+def commit(project_id: str, reservation_id: str, cost: float, tokens: int = 0,
+           agent: Optional[str] = None, model: Optional[str] = None) -> float:
+    """
+    Фиксирует фактическую стоимость вызова вместо резерва.
+    :param reservation_id: id из reserve
+    :param cost: фактическая стоимость
+    :param tokens: число токенов (если API его сообщает)
+    :return: итоговая зафиксированная стоимость проекта
+    """
+    with _locked(project_id) as totals:
+        reservation = totals.open.get(reservation_id, {})
+        _append(project_id, totals, {
+            'type': 'commit', 'id': reservation_id,
+            'agent': agent or reservation.get('agent'), 'model': model or reservation.get('model'),
+            'tokens': int(tokens or 0), 'cost': round(float(cost), 6), 'ts': time.time(),
+        })
+        return totals.committed
+
+
+def record(project_id: str, cost: float, tokens: int = 0, agent: Optional[str] = None,
+           model: Optional[str] = None) -> float:
+    """
+    Фиксирует стоимость вызова, сделанного без резерва.
+    :return: итоговая зафиксированная стоимость проекта
+    """
+    return commit(project_id, uuid.uuid4().hex, cost, tokens=tokens, agent=agent, model=model)
+
+
+def release(project_id: str, reservation_id: str) -> None:
+    """
+    Снимает резерв неудавшегося вызова.
+    """
+    with _locked(project_id) as totals:
+        if reservation_id in totals.open:
+            _append(project_id, totals, {'type': 'release', 'id': reservation_id, 'ts': time.time()})
+
+
+def total_cost(project_id: str) -> float:
+    """
+    :return: зафиксированная стоимость проекта
+    """
+    with _locked(project_id) as totals:
+        return totals.committed
+
+
+def summary(project_id: str, limit: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Сводка для /projects/{id}/costs.
+    :return: limit, committed, reserved, remaining, tokens, calls, by_agent, by_model
+    """
+    limit = DEFAULT_COST_LIMIT if limit is None else float(limit)
+    with _locked(project_id) as totals:
+        reserved = totals.reserved(time.time())
+        return {
+            'limit': limit,
+            'committed': round(totals.committed, 6),
+            'reserved': round(reserved, 6),
+            'remaining': round(max(0.0, limit - totals.committed - reserved), 6),
+            'tokens': totals.tokens,
+            'calls': totals.calls,
+            'by_agent': {k: dict(v, cost=round(v['cost'], 6)) for k, v in totals.by_agent.items()},
+            'by_model': {k: dict(v, cost=round(v['cost'], 6)) for k, v in totals.by_model.items()},
+        }
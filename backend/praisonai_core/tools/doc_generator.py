@@ -20,6 +20,9 @@ import json
 from typing import Any
 from praisonai_core.tools import context_manager
 
+# Сколько упавших примеров / предупреждений отчёта перечислять в документации
+DOC_REPORT_ITEMS = 5
+
 def generate_docs(project_id: str, context: str) -> str:
     """
     Генерирует структурированную документацию по проекту.
@@ -55,7 +58,7 @@ def generate_docs(project_id: str, context: str) -> str:
     doc += "### Project\n"
     doc += "- id: str\n- core_mandate: str\n- status: str\n- iteration_count: int\n- current_llm_cost: float\n- tasks: list\n- reports: list\n\n"
     doc += "### Task\n- id: str\n- agent: str\n- description: str\n- status: str\n- priority: int\n- dependencies: list\n- assigned_to: str\n- artifacts_produced: list\n- subtasks: list\n\n"
-    doc += "### Report\n- type: str\n- severity: str\n- content: str\n- created_at: str\n- related_task: str\n\n"
+    doc += "### Report\n- type: str\n- severity: str\n- content: str\n- summary: str\n- details: dict (итоги RSpec/Brakeman)\n- created_at: str\n- related_task: str\n\n"
 
     doc += "## Текущие задачи\n"
     for t in state.get('tasks', []):
@@ -67,7 +70,14 @@ def generate_docs(project_id: str, context: str) -> str:
 
     doc += "## Последние отчёты\n"
     for r in state.get('reports', []):
-        doc += f"- [{r.get('type')}] {r.get('content')} (severity: {r.get('severity')}, created_at: {r.get('created_at')})\n"
+        # Для отчётов RSpec/Brakeman — итоги из компактной записи, а не весь вывод
+        text = r.get('summary') or r.get('content')
+        doc += f"- [{r.get('type')}] {text} (severity: {r.get('severity')}, created_at: {r.get('created_at')})\n"
+        details = r.get('details') or {}
+        for failure in (details.get('failures') or [])[:DOC_REPORT_ITEMS]:
+            doc += f"    - {failure.get('spec')}:{failure.get('line')} {failure.get('description')}\n"
+        for warning in (details.get('warnings') or [])[:DOC_REPORT_ITEMS]:
+            doc += f"    - [{warning.get('confidence')}] {warning.get('type')} {warning.get('file')}:{warning.get('line')}\n"
     doc += "\n"
 
     doc += "## API-эндпоинты\n"
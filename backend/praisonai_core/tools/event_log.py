@@ -0,0 +1,273 @@
+# Журнал событий (append-only) для Live Project Context
+# Каждая запись state сохраняется как дельта в events.jsonl, полное состояние
+# периодически сворачивается в snapshot.json (компакция).
+
+import os
+import json
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+EVENTS_FILE = 'events.jsonl'
+SNAPSHOT_FILE = 'snapshot.json'
+# Исходный state.json используется как нулевой снапшот, пока компакция не выполнялась
+BOOTSTRAP_FILE = 'state.json'
+
+# Хранилище пишет дельты: context_manager передаёт в save предыдущее состояние
+INCREMENTAL = True
+
+# Число событий после снапшота, после которого запускается компакция
+COMPACT_THRESHOLD = int(os.environ.get('APPBUILDER_EVENT_LOG_COMPACT_THRESHOLD', '200'))
+
+# path к events.jsonl -> (размер файла, последний seq, событий после снапшота)
+_log_info: Dict[str, Tuple[int, int, int]] = {}
+_log_info_lock = threading.Lock()
+
+
+# --- Дельты состояния ---
+
+def diff_state(old: Any, new: Any, path: Optional[list] = None) -> List[Dict[str, Any]]:
+    """
+    Вычисляет список операций, превращающих old в new.
+    Добавление в конец списка (новый отчёт, новая задача) кодируется как append,
+    поэтому размер дельты пропорционален изменению, а не всему состоянию.
+    :param old: предыдущее состояние
+    :param new: новое состояние
+    :param path: путь к текущему узлу (для рекурсии)
+    :return: список операций set/del/append
+    """
+    path = path or []
+    if type(old) is not type(new):
+        return [{'op': 'set', 'path': path, 'value': new}]
+    if isinstance(new, dict):
+        ops: List[Dict[str, Any]] = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'del', 'path': path + [key]})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({'op': 'set', 'path': path + [key], 'value': value})
+            else:
+                ops.extend(diff_state(old[key], value, path + [key]))
+        return ops
+    if isinstance(new, list):
+        if len(new) >= len(old) and new[:len(old)] == old:
+            if len(new) == len(old):
+                return []
+            return [{'op': 'append', 'path': path, 'values': new[len(old):]}]
+        if len(new) == len(old):
+            ops = []
+            for index, (old_item, new_item) in enumerate(zip(old, new)):
+                ops.extend(diff_state(old_item, new_item, path + [index]))
+            return ops
+        return [{'op': 'set', 'path': path, 'value': new}]
+    if old != new:
+        return [{'op': 'set', 'path': path, 'value': new}]
+    return []
+
+
+def apply_ops(state: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Применяет операции diff_state к состоянию (на месте).
+    :param state: состояние
+    :param ops: операции
+    :return: новое состояние (может быть новым объектом при замене корня)
+    """
+    for op in ops:
+        path = op['path']
+        if not path:
+            if op['op'] == 'set':
+                state = op['value']
+            elif op['op'] == 'append':
+                state.extend(op['values'])
+            continue
+        node = state
+        for key in path[:-1]:
+            node = node[key]
+        last = path[-1]
+        if op['op'] == 'set':
+            node[last] = op['value']
+        elif op['op'] == 'del':
+            del node[last]
+        elif op['op'] == 'append':
+            node[last].extend(op['values'])
+    return state
+
+
+# --- Файлы журнала ---
+
+def _stat_key(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def signature(project_path: str) -> Optional[tuple]:
+    """
+    Сигнатура хранилища для инвалидации кэша context_manager.
+    :param project_path: путь к папке проекта
+    :return: кортеж stat-ключей файлов или None, если состояния нет
+    """
+    parts = tuple(_stat_key(os.path.join(project_path, name))
+                  for name in (EVENTS_FILE, SNAPSHOT_FILE, BOOTSTRAP_FILE))
+    if all(part is None for part in parts):
+        return None
+    return (project_path,) + parts
+
+
+def _read_snapshot(project_path: str) -> Tuple[Dict[str, Any], int]:
+    snapshot_path = os.path.join(project_path, SNAPSHOT_FILE)
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('state', {}), int(data.get('seq', 0))
+    bootstrap_path = os.path.join(project_path, BOOTSTRAP_FILE)
+    if os.path.exists(bootstrap_path):
+        with open(bootstrap_path, 'r', encoding='utf-8') as f:
+            return json.load(f), 0
+    return {}, 0
+
+
+def load(project_path: str) -> Dict[str, Any]:
+    """
+    Восстанавливает состояние: последний снапшот + проигрывание хвоста журнала.
+    :param project_path: путь к папке проекта
+    :return: состояние проекта
+    """
+    state, snapshot_seq = _read_snapshot(project_path)
+    events_path = os.path.join(project_path, EVENTS_FILE)
+    last_seq = snapshot_seq
+    pending = 0
+    size = 0
+    if os.path.exists(events_path):
+        with open(events_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                size += len(line.encode('utf-8'))
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Недописанная последняя строка после сбоя — игнорируем
+                    continue
+                if event['seq'] <= snapshot_seq:
+                    continue
+                state = apply_ops(state, event['ops'])
+                last_seq = event['seq']
+                pending += 1
+    with _log_info_lock:
+        _log_info[events_path] = (size, last_seq, pending)
+    return state
+
+
+def _current_log_info(project_path: str) -> Tuple[int, int, int]:
+    events_path = os.path.join(project_path, EVENTS_FILE)
+    size = os.path.getsize(events_path) if os.path.exists(events_path) else 0
+    with _log_info_lock:
+        info = _log_info.get(events_path)
+    if info is None or info[0] != size:
+        # Журнал изменён другим процессом — пересчитываем по файлу
+        load(project_path)
+        with _log_info_lock:
+            info = _log_info[events_path]
+    return info
+
+
+def save(project_path: str, state: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> int:
+    """
+    Дописывает в events.jsonl дельту между previous и state.
+    :param project_path: путь к папке проекта
+    :param state: новое состояние
+    :param previous: текущее сохранённое состояние (None — записать состояние целиком)
+    :return: число записанных байт
+    """
+    if previous is None:
+        ops = [{'op': 'set', 'path': [], 'value': state}]
+    else:
+        ops = diff_state(previous, state)
+    if not ops:
+        return 0
+    os.makedirs(project_path, exist_ok=True)
+    events_path = os.path.join(project_path, EVENTS_FILE)
+    _, last_seq, pending = _current_log_info(project_path)
+    event = {'seq': last_seq + 1, 'ts': datetime.utcnow().isoformat() + "Z", 'ops': ops}
+    line = json.dumps(event, ensure_ascii=False) + "\n"
+    _truncate_torn_tail(events_path)
+    with open(events_path, 'a', encoding='utf-8') as f:
+        f.write(line)
+    with _log_info_lock:
+        _log_info[events_path] = (os.path.getsize(events_path), last_seq + 1, pending + 1)
+    return len(line.encode('utf-8'))
+
+
+def _truncate_torn_tail(events_path: str) -> None:
+    # Недописанная последняя строка (сбой во время записи) отрезается: иначе следующее
+    # событие склеится с ней, load отбросит склейку как невалидный JSON, и все
+    # последующие дельты применятся к неверному состоянию
+    if not os.path.exists(events_path):
+        return
+    with open(events_path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b'\n':
+            return
+        # Ищем конец последней целой строки, читая с конца блоками
+        position = end
+        keep = 0
+        while position > 0:
+            start = max(0, position - 64 * 1024)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                keep = start + newline + 1
+                break
+            position = start
+        print(f"[event_log] Отрезана недописанная строка журнала {events_path} ({end - keep} байт)")
+        f.truncate(keep)
+
+
+def needs_compaction(project_path: str) -> bool:
+    """
+    Проверяет, накопилось ли после снапшота COMPACT_THRESHOLD событий.
+    :param project_path: путь к папке проекта
+    :return: True, если пора сворачивать журнал
+    """
+    with _log_info_lock:
+        info = _log_info.get(os.path.join(project_path, EVENTS_FILE))
+    return info is not None and info[2] >= COMPACT_THRESHOLD
+
+
+def compact(project_path: str, state: Dict[str, Any]) -> None:
+    """
+    Сворачивает журнал: пишет snapshot.json с текущим seq и очищает events.jsonl.
+    Вызывать под блокировкой проекта. Порядок операций безопасен при сбое:
+    события с seq <= seq снапшота при чтении пропускаются.
+    :param project_path: путь к папке проекта
+    :param state: актуальное состояние
+    """
+    events_path = os.path.join(project_path, EVENTS_FILE)
+    _, last_seq, _ = _current_log_info(project_path)
+    _atomic_write_json(os.path.join(project_path, SNAPSHOT_FILE), {'seq': last_seq, 'state': state})
+    fd, tmp_path = tempfile.mkstemp(prefix='.events.', suffix='.tmp', dir=project_path)
+    os.close(fd)
+    os.replace(tmp_path, events_path)
+    with _log_info_lock:
+        _log_info[events_path] = (0, last_seq, 0)
+
+
+def _atomic_write_json(path: str, data: Any) -> None:
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot.', suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -14,6 +14,10 @@ def auto_export_docs_to_plane(project_id: str, plane_api_token: str, page_id: st
 # MCP-агент для выгрузки документации в Plane.so
 import requests
 
+from praisonai_core import tracing
+
+
+@tracing.traced('export_docs_to_plane')
 def export_docs_to_plane(project_id: str, docs: str, plane_api_token: str, page_id: str = None) -> str:
     """
     Выгружает документацию (docs) в Plane.so через API.
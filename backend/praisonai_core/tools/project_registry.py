@@ -0,0 +1,212 @@
+# Реестр проектов: компактный индекс сводок всех проектов в registry.sqlite3
+# Обновляется init_project и context_manager.write_state, позволяет листать
+# тысячи проектов без открытия каждого state.json.
+
+import os
+import json
+import base64
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+DB_FILE = 'registry.sqlite3'
+
+# Допустимые поля сортировки GET /projects
+SORT_FIELDS = ('updated_at', 'created_at', 'current_llm_cost', 'iteration_count', 'status', 'id')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'init',
+    iteration_count INTEGER NOT NULL DEFAULT 0,
+    current_llm_cost REAL NOT NULL DEFAULT 0,
+    task_count INTEGER NOT NULL DEFAULT 0,
+    report_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_registry_status ON projects (status, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_registry_updated_at ON projects (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_registry_created_at ON projects (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_registry_cost ON projects (current_llm_cost, id);
+CREATE INDEX IF NOT EXISTS idx_registry_iterations ON projects (iteration_count, id);
+"""
+
+# Если сводка не изменилась, updated_at обновляется не чаще, чем раз в столько секунд
+TOUCH_INTERVAL_SECONDS = 5.0
+
+_local = threading.local()
+
+
+def _connect(base_path: str) -> sqlite3.Connection:
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    db_path = os.path.join(base_path, DB_FILE)
+    conn = connections.get(db_path)
+    if conn is None:
+        os.makedirs(base_path, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        connections[db_path] = conn
+    return conn
+
+
+def close_connections() -> None:
+    """
+    Закрывает соединения текущего потока (тесты, смена папки проектов).
+    """
+    for conn in getattr(_local, 'connections', {}).values():
+        conn.close()
+    _local.connections = {}
+
+
+def summarize_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Сводка проекта для реестра.
+    :param state: состояние проекта
+    :return: status, iteration_count, current_llm_cost, task_count, report_count
+    """
+    tasks = state.get('tasks')
+    reports = state.get('reports')
+    return {
+        'status': state.get('status') or 'init',
+        'iteration_count': int(state.get('iteration_count') or 0),
+        'current_llm_cost': float(state.get('current_llm_cost') or 0.0),
+        'task_count': len(tasks) if isinstance(tasks, list) else 0,
+        'report_count': len(reports) if isinstance(reports, list) else 0,
+    }
+
+
+def record_project(base_path: str, project_id: str, state: Dict[str, Any],
+                   created_at: Optional[str] = None) -> None:
+    """
+    Добавляет или обновляет сводку проекта в реестре.
+    :param base_path: папка проектов
+    :param project_id: идентификатор проекта
+    :param state: текущее состояние
+    :param created_at: время создания (для новых проектов; по умолчанию — сейчас)
+    """
+    values = tuple(summarize_state(state).values())
+    now = datetime.utcnow()
+    # Строка не переписывается, если сводка в реестре совпадает и updated_at свежий.
+    # Сравнение — с сохранённой строкой, а не с памятью процесса: другие воркеры
+    # могли изменить её между нашими записями
+    touch_before = (now - timedelta(seconds=TOUCH_INTERVAL_SECONDS)).isoformat() + "Z"
+    now_text = now.isoformat() + "Z"
+    _connect(base_path).execute(
+        'INSERT INTO projects (id, status, iteration_count, current_llm_cost, task_count, report_count, created_at, updated_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT(id) DO UPDATE SET status = excluded.status, iteration_count = excluded.iteration_count, '
+        'current_llm_cost = excluded.current_llm_cost, task_count = excluded.task_count, '
+        'report_count = excluded.report_count, updated_at = excluded.updated_at '
+        'WHERE status IS NOT excluded.status OR iteration_count IS NOT excluded.iteration_count '
+        'OR current_llm_cost IS NOT excluded.current_llm_cost OR task_count IS NOT excluded.task_count '
+        'OR report_count IS NOT excluded.report_count OR updated_at < ?',
+        (project_id,) + values + (created_at or now_text, now_text, touch_before))
+
+
+def _encode_cursor(row: Dict[str, Any], sort: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([row[sort], row['id']]).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except ValueError as e:
+        raise ValueError(f"Некорректный курсор: {cursor}") from e
+    if not isinstance(value, list) or len(value) != 2:
+        raise ValueError(f"Некорректный курсор: {cursor}")
+    return value
+
+
+def list_projects(base_path: str, status: Optional[str] = None, sort: str = 'updated_at',
+                  order: str = 'desc', limit: int = 50,
+                  cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Страница проектов из реестра: фильтр по статусу, сортировка и keyset-пагинация,
+    поэтому стоимость запроса зависит от размера страницы, а не от числа проектов.
+    :param base_path: папка проектов
+    :param status: фильтр по статусу
+    :param sort: поле сортировки (SORT_FIELDS)
+    :param order: asc или desc
+    :param limit: размер страницы
+    :param cursor: курсор next_cursor предыдущей страницы
+    :return: (сводки проектов, курсор следующей страницы или None)
+    """
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Недопустимое поле сортировки: {sort}")
+    if order not in ('asc', 'desc'):
+        raise ValueError(f"Недопустимый порядок сортировки: {order}")
+    clauses, params = [], []
+    if status is not None:
+        clauses.append('status = ?')
+        params.append(status)
+    if cursor:
+        value, last_id = _decode_cursor(cursor)
+        clauses.append(f"({sort}, id) {'<' if order == 'desc' else '>'} (?, ?)")
+        params.extend([value, last_id])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    direction = 'DESC' if order == 'desc' else 'ASC'
+    conn = _connect(base_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(
+            f'SELECT * FROM projects {where} ORDER BY {sort} {direction}, id {direction} LIMIT ?',
+            params + [limit + 1]).fetchall()
+    finally:
+        conn.row_factory = None
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = _encode_cursor(items[-1], sort) if len(rows) > limit else None
+    return items, next_cursor
+
+
+def get_project(base_path: str, project_id: str) -> Optional[Dict[str, Any]]:
+    """
+    :return: сводка проекта или None
+    """
+    conn = _connect(base_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+    finally:
+        conn.row_factory = None
+    return dict(row) if row is not None else None
+
+
+def rebuild(base_path: str) -> int:
+    """
+    Заполняет реестр по существующим папкам проектов (первичная индексация).
+    :param base_path: папка проектов
+    :return: число проиндексированных проектов
+    """
+    from praisonai_core.tools import context_manager
+    count = 0
+    for project_id in sorted(os.listdir(base_path)):
+        project_path = os.path.join(base_path, project_id)
+        # Служебные папки (.jobs, .llm_cache, ...) и папки без состояния — не проекты
+        if project_id.startswith('.') or not os.path.isdir(project_path) \
+                or not context_manager.has_state(project_id):
+            continue
+        state = context_manager.read_state(project_id)
+        created_at = datetime.utcfromtimestamp(os.path.getctime(project_path)).isoformat() + "Z"
+        record_project(base_path, project_id, state, created_at=created_at)
+        count += 1
+    return count
+
+
+def main() -> None:
+    from praisonai_core.tools import context_manager
+    parser = argparse.ArgumentParser(description="Переиндексация реестра проектов")
+    parser.add_argument('--projects', default=context_manager.BASE_PROJECTS_PATH, help="папка проектов")
+    args = parser.parse_args()
+    context_manager.BASE_PROJECTS_PATH = args.projects
+    print(f"[project_registry] Проиндексировано проектов: {rebuild(args.projects)}")
+
+
+if __name__ == '__main__':
+    main()
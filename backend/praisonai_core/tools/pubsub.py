@@ -0,0 +1,131 @@
+# In-process pub/sub для изменений Live Project Context
+# context_manager публикует дельты состояния в топик проекта, SSE-эндпоинт /events
+# раздаёт их подписчикам. Очередь подписчика ограничена: при переполнении
+# отбрасываются самые старые события (drop-oldest), клиент получает сигнал resync.
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Размер очереди подписчика по умолчанию
+DEFAULT_QUEUE_SIZE = 256
+
+_subscribers: Dict[str, List["Subscription"]] = {}
+_subscribers_lock = threading.Lock()
+_topic_seq: Dict[str, int] = {}
+
+
+class Subscription:
+    """
+    Подписка на топик с ограниченной очередью (drop-oldest).
+    Читать можно из потока (get) или из asyncio (get_async).
+    """
+
+    def __init__(self, topic: str, maxsize: int = DEFAULT_QUEUE_SIZE) -> None:
+        self.topic = topic
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.closed = False
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def put(self, event: Dict[str, Any]) -> None:
+        with self._cond:
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(event)
+            self._cond.notify_all()
+            loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # Цикл событий уже закрыт — подписчик отключился
+                pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        :param timeout: ожидание в секундах
+        :return: событие или None по таймауту
+        """
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Асинхронное ожидание события без занятия потока.
+        :param timeout: ожидание в секундах
+        :return: событие или None по таймауту
+        """
+        with self._cond:
+            if self._queue:
+                return self._queue.popleft()
+            if self._wakeup is None:
+                self._loop = asyncio.get_running_loop()
+                self._wakeup = asyncio.Event()
+            self._wakeup.clear()
+            wakeup = self._wakeup
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._cond:
+            return self._queue.popleft() if self._queue else None
+
+    def close(self) -> None:
+        unsubscribe(self)
+
+
+def subscribe(topic: str, maxsize: int = DEFAULT_QUEUE_SIZE) -> Subscription:
+    """
+    Подписывает на топик (для состояния проекта — project_id).
+    :param topic: имя топика
+    :param maxsize: размер очереди подписчика
+    :return: подписка
+    """
+    subscription = Subscription(topic, maxsize)
+    with _subscribers_lock:
+        _subscribers.setdefault(topic, []).append(subscription)
+    return subscription
+
+
+def unsubscribe(subscription: Subscription) -> None:
+    with _subscribers_lock:
+        subscribers = _subscribers.get(subscription.topic, [])
+        if subscription in subscribers:
+            subscribers.remove(subscription)
+        if not subscribers:
+            _subscribers.pop(subscription.topic, None)
+    with subscription._cond:
+        subscription.closed = True
+        subscription._cond.notify_all()
+
+
+def has_subscribers(topic: str) -> bool:
+    """
+    Быстрая проверка перед вычислением дельты для публикации.
+    """
+    return bool(_subscribers.get(topic))
+
+
+def publish(topic: str, event: Dict[str, Any]) -> int:
+    """
+    Рассылает событие подписчикам топика, добавляя монотонный seq.
+    :param topic: имя топика
+    :param event: событие
+    :return: число получателей
+    """
+    with _subscribers_lock:
+        seq = _topic_seq.get(topic, 0) + 1
+        _topic_seq[topic] = seq
+        subscribers = list(_subscribers.get(topic, []))
+    event = dict(event, seq=seq)
+    for subscription in subscribers:
+        subscription.put(event)
+    return len(subscribers)
@@ -0,0 +1,244 @@
+# Разбор JSON-выводов RSpec и Brakeman в компактные отчёты
+# Вместо полного stdout (мегабайты JSON с бэктрейсами) в state хранится запись
+# с итогами, упавшими примерами (файл, строка, сообщение) и предупреждениями
+# (тип, достоверность, файл, строка). По ней считается severity, её читают
+# планировщик исправлений, перепроверка и генератор документации.
+
+import re
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Сколько упавших примеров / предупреждений хранить в записи подробно
+MAX_ITEMS = 50
+# Длина сообщения об ошибке в записи
+MESSAGE_CHARS = 300
+# Сколько строк бэктрейса просматривать в поисках исходника проекта
+BACKTRACE_LINES = 20
+
+# Пути исходников проекта в бэктрейсах и тексте отчётов
+SOURCE_PATH_RE = re.compile(r'(?<![\w/.-])((?:app|lib|config|db|spec)/[\w/.-]+\.(?:rb|erb|rake|js|ts|yml))(?::\d+)?')
+# Ключи JSON-отчётов rspec (examples, summary) и brakeman (warnings, scan_info)
+REPORT_KEYS = ('examples', 'summary', 'warnings', 'scan_info')
+# Сколько позиций '{' в выводе пробовать как начало отчёта
+MAX_JSON_CANDIDATES = 200
+# Порядок достоверности предупреждений Brakeman (confidence: High/Medium/Weak)
+CONFIDENCE_ORDER = ('high', 'medium', 'weak')
+
+
+def load_json(output: Optional[str], keys: Tuple[str, ...] = REPORT_KEYS) -> Optional[dict]:
+    """
+    JSON-объект отчёта из вывода инструмента: вывод rspec/brakeman может предваряться
+    логом bundle install и предупреждениями Ruby (в том числе с '{') и сопровождаться
+    текстом после JSON. Перебираются позиции '{', берётся первый объект с ключом из keys.
+    :param output: stdout
+    :param keys: ключи, по которым узнаётся объект отчёта
+    :return: словарь или None, если JSON не найден
+    """
+    text = output or ''
+    decoder = json.JSONDecoder()
+    start = text.find('{')
+    attempts = 0
+    while start >= 0 and attempts < MAX_JSON_CANDIDATES:
+        attempts += 1
+        try:
+            data, end = decoder.raw_decode(text, start)
+        except ValueError:
+            start = text.find('{', start + 1)
+            continue
+        if isinstance(data, dict) and any(key in data for key in keys):
+            return data
+        # Посторонний объект (hash inspect в логе) — ищем после него
+        start = text.find('{', end)
+    return None
+
+
+def strip_path(path: str) -> str:
+    """
+    ./spec/x_spec.rb и /app/spec/x_spec.rb (путь в контейнере) -> spec/x_spec.rb
+    """
+    path = (path or '').strip()
+    for prefix in ('./', '/app/'):
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+    return path
+
+
+def _clip(text: Any) -> str:
+    text = ' '.join(str(text or '').split())
+    return text if len(text) <= MESSAGE_CHARS else text[:MESSAGE_CHARS - 1] + '…'
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_rspec(output: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Компактная запись по выводу rspec --format json.
+    :param output: stdout rspec
+    :return: {'tool': 'rspec', 'totals', 'failed_specs', 'files', 'failures', 'errors'} или None
+    """
+    data = load_json(output)
+    if data is None or not isinstance(data.get('examples'), list):
+        return None
+    return _rspec_record(data)
+
+
+def _rspec_record(data: dict) -> Dict[str, Any]:
+    summary = data.get('summary') or {}
+    failures: List[Dict[str, Any]] = []
+    failed_specs = set()
+    files = set()
+    failed_count = 0
+    for example in data['examples']:
+        if not isinstance(example, dict) or example.get('status') != 'failed':
+            continue
+        failed_count += 1
+        spec = strip_path(example.get('file_path', ''))
+        failed_specs.add(spec)
+        exception = example.get('exception') or {}
+        sources = []
+        for line in (exception.get('backtrace') or [])[:BACKTRACE_LINES]:
+            match = SOURCE_PATH_RE.search(strip_path(str(line)))
+            if match and not match.group(1).startswith('spec/') and match.group(1) not in sources:
+                sources.append(match.group(1))
+        files.update(sources)
+        if len(failures) < MAX_ITEMS:
+            failures.append({
+                'spec': spec,
+                'line': example.get('line_number'),
+                'description': _clip(example.get('full_description') or example.get('description')),
+                'exception': exception.get('class'),
+                'message': _clip(exception.get('message')),
+                'files': sources,
+            })
+    totals = {
+        'examples': _int(summary.get('example_count')) or len(data['examples']),
+        'failures': max(_int(summary.get('failure_count')), failed_count),
+        'pending': _int(summary.get('pending_count')),
+        'errors_outside_of_examples': _int(summary.get('errors_outside_of_examples_count')),
+    }
+    errors = [_clip(m) for m in data.get('messages') or [] if m][:MAX_ITEMS] \
+        if totals['errors_outside_of_examples'] else []
+    return {'tool': 'rspec', 'totals': totals, 'failed_specs': sorted(failed_specs), 'files': sorted(files),
+            'failures': failures, 'errors': errors}
+
+
+def parse_brakeman(output: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Компактная запись по выводу brakeman --format json.
+    :param output: stdout brakeman
+    :return: {'tool': 'brakeman', 'totals', 'files', 'warnings', 'errors'} или None
+    """
+    data = load_json(output)
+    if data is None or not isinstance(data.get('warnings'), list):
+        return None
+    return _brakeman_record(data)
+
+
+def _brakeman_record(data: dict) -> Dict[str, Any]:
+    totals = {'warnings': 0, 'high': 0, 'medium': 0, 'weak': 0, 'errors': len(data.get('errors') or [])}
+    warnings: List[Dict[str, Any]] = []
+    files = set()
+    for warning in data['warnings']:
+        if not isinstance(warning, dict):
+            continue
+        confidence = str(warning.get('confidence') or '').lower()
+        if confidence not in CONFIDENCE_ORDER:
+            confidence = 'weak'
+        totals['warnings'] += 1
+        totals[confidence] += 1
+        path = strip_path(warning.get('file', ''))
+        if path:
+            files.add(path)
+        warnings.append({
+            'type': warning.get('warning_type'),
+            'confidence': confidence,
+            'file': path,
+            'line': warning.get('line'),
+            'message': _clip(warning.get('message')),
+        })
+    # Подробно — самые достоверные
+    warnings.sort(key=lambda w: CONFIDENCE_ORDER.index(w['confidence']))
+    errors = [_clip(e.get('error') if isinstance(e, dict) else e) for e in data.get('errors') or []][:MAX_ITEMS]
+    return {'tool': 'brakeman', 'totals': totals, 'files': sorted(files), 'warnings': warnings[:MAX_ITEMS],
+            'errors': errors}
+
+
+def parse_report(output: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Запись по выводу RSpec или Brakeman (формат определяется по содержимому).
+    :return: компактная запись или None, если вывод не разобран
+    """
+    data = load_json(output)
+    if data is None:
+        return None
+    if isinstance(data.get('examples'), list):
+        return _rspec_record(data)
+    if isinstance(data.get('warnings'), list):
+        return _brakeman_record(data)
+    return None
+
+
+def severity(record: Optional[Dict[str, Any]]) -> str:
+    """
+    Severity отчёта по итогам записи: упавшие примеры и предупреждения высокой
+    достоверности — high, средней или ошибки разбора Brakeman — medium.
+    Неразобранный вывод (инструмент не отработал) — medium.
+    """
+    if record is None:
+        return 'medium'
+    totals = record.get('totals') or {}
+    if record.get('tool') == 'rspec':
+        return 'high' if totals.get('failures') or totals.get('errors_outside_of_examples') else 'low'
+    if totals.get('high'):
+        return 'high'
+    if totals.get('medium') or totals.get('errors'):
+        return 'medium'
+    return 'low'
+
+
+def summary_line(record: Dict[str, Any]) -> str:
+    """
+    Итоги одной строкой: '12 examples, 2 failures' / '3 warnings (high: 1, medium: 2, weak: 0)'.
+    """
+    totals = record.get('totals') or {}
+    if record.get('tool') == 'rspec':
+        line = f"{totals.get('examples', 0)} examples, {totals.get('failures', 0)} failures"
+        if totals.get('pending'):
+            line += f", {totals['pending']} pending"
+        if totals.get('errors_outside_of_examples'):
+            line += f", {totals['errors_outside_of_examples']} errors occurred outside of examples"
+        return line
+    line = (f"{totals.get('warnings', 0)} warnings (high: {totals.get('high', 0)}, "
+            f"medium: {totals.get('medium', 0)}, weak: {totals.get('weak', 0)})")
+    if totals.get('errors'):
+        line += f", {totals['errors']} errors"
+    return line
+
+
+def describe(record: Dict[str, Any], limit: int = 10) -> str:
+    """
+    Краткий текст отчёта: итоги и первые limit упавших примеров / предупреждений.
+    Используется как content отчёта и в описании задач на исправление.
+    """
+    lines = [summary_line(record)]
+    if record.get('tool') == 'rspec':
+        items, total = record.get('failures') or [], (record.get('totals') or {}).get('failures', 0)
+        for failure in items[:limit]:
+            location = f"{failure['spec']}:{failure['line']}" if failure.get('line') else failure['spec']
+            message = f": {failure['message']}" if failure.get('message') else ''
+            lines.append(f"- {location} {failure['description']}{message}")
+    else:
+        items, total = record.get('warnings') or [], (record.get('totals') or {}).get('warnings', 0)
+        for warning in items[:limit]:
+            location = f"{warning['file']}:{warning['line']}" if warning.get('line') else warning['file']
+            lines.append(f"- [{warning['confidence']}] {warning['type']} {location}: {warning['message']}")
+    shown = min(len(items), limit)
+    if total > shown:
+        lines.append(f"… и ещё {total - shown}")
+    lines.extend(f"- {error}" for error in (record.get('errors') or [])[:limit])
+    return '\n'.join(lines)
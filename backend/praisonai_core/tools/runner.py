@@ -0,0 +1,198 @@
+# Исполнители команд Ruby-проекта для testing_runner и code_analyzer
+# DockerExecutor — подготовленный образ (Dockerfile.ruby: bundler и brakeman уже установлены),
+# гемы в именованном томе, ключ которого — хэш Gemfile.lock: пока зависимости не менялись,
+# bundle install не выполняется. В режиме warm команды выполняются через docker exec
+# в долгоживущем контейнере проекта, а не в новом контейнере на каждый запуск.
+# LocalExecutor — тот же сценарий обычным подпроцессом (машины без Docker).
+
+import os
+import atexit
+import hashlib
+import tempfile
+import threading
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+# Исполнитель по умолчанию: 'docker' или 'local'
+RUNNER_BACKEND = os.environ.get('APPBUILDER_RUNNER', 'docker')
+# Держать долгоживущий контейнер проекта и выполнять команды через docker exec
+RUNNER_WARM = os.environ.get('APPBUILDER_RUNNER_WARM', '0') == '1'
+# Ограничение времени одной команды (сек)
+RUNNER_TIMEOUT_SECONDS = float(os.environ.get('APPBUILDER_RUNNER_TIMEOUT', '1800'))
+DOCKERFILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../Dockerfile.ruby'))
+IMAGE_NAME = 'appbuilder-ruby-runner'
+BUNDLE_VOLUME_PREFIX = 'appbuilder-bundle-'
+WARM_CONTAINER_PREFIX = 'appbuilder-runner-'
+# Каталог гемов LocalExecutor (по подкаталогу на хэш Gemfile.lock)
+LOCAL_BUNDLE_ROOT = os.environ.get('APPBUILDER_BUNDLE_CACHE',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'appbuilder', 'bundle'))
+# Установка гемов только если их ещё нет в кэше
+BUNDLE_PREPARE = 'bundle check >/dev/null 2>&1 || bundle install'
+
+
+def lockfile_digest(project_path: str) -> str:
+    """
+    Ключ кэша гемов: хэш Gemfile.lock (или Gemfile, если lock-файла ещё нет).
+    :param project_path: путь к проекту
+    :return: первые 16 символов sha256 или 'nolock'
+    """
+    for name in ('Gemfile.lock', 'Gemfile'):
+        path = os.path.join(project_path, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()[:16]
+    return 'nolock'
+
+
+def _script(command: str, bundle: bool) -> str:
+    return f'{BUNDLE_PREPARE} && {command}' if bundle else command
+
+
+class LocalExecutor:
+    """
+    Выполняет команды в папке проекта обычным подпроцессом (Ruby установлен на машине).
+    Гемы ставятся в LOCAL_BUNDLE_ROOT/<хэш Gemfile.lock>.
+    """
+
+    def __init__(self, bundle_root: str = LOCAL_BUNDLE_ROOT, timeout: float = RUNNER_TIMEOUT_SECONDS) -> None:
+        self.bundle_root = bundle_root
+        self.timeout = timeout
+
+    def run(self, project_path: str, command: str, bundle: bool = True) -> subprocess.CompletedProcess:
+        """
+        :param project_path: путь к проекту (рабочая папка команды)
+        :param command: команда bash
+        :param bundle: предварительно установить гемы (bundle check || bundle install)
+        :return: результат процесса (stdout, stderr, returncode)
+        """
+        env = dict(os.environ, BUNDLE_PATH=os.path.join(self.bundle_root, lockfile_digest(project_path)))
+        return subprocess.run(['bash', '-c', _script(command, bundle)], cwd=project_path, env=env,
+                              capture_output=True, text=True, timeout=self.timeout)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class DockerExecutor:
+    """
+    Выполняет команды в подготовленном образе (собирается из Dockerfile.ruby один раз,
+    тег — хэш Dockerfile). Проект монтируется в /app, том гемов — в /bundle.
+    """
+
+    def __init__(self, warm: bool = RUNNER_WARM, dockerfile: str = DOCKERFILE_PATH,
+                 timeout: float = RUNNER_TIMEOUT_SECONDS) -> None:
+        """
+        :param warm: выполнять команды в долгоживущем контейнере проекта (docker exec)
+        :param dockerfile: Dockerfile образа исполнителя
+        :param timeout: ограничение времени команды (сек)
+        """
+        self.warm = warm
+        self.dockerfile = dockerfile
+        self.timeout = timeout
+        self._image: Optional[str] = None
+        self._lock = threading.Lock()
+        # путь проекта -> (имя контейнера, том гемов)
+        self._containers: Dict[str, Tuple[str, str]] = {}
+
+    def _docker(self, args: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        return subprocess.run(['docker'] + args, capture_output=True, text=True, timeout=timeout or self.timeout)
+
+    def image(self) -> str:
+        """
+        Тег подготовленного образа; собирает образ, если его ещё нет.
+        :raises RuntimeError: сборка не удалась
+        """
+        with self._lock:
+            if self._image is not None:
+                return self._image
+            with open(self.dockerfile, 'rb') as f:
+                tag = f"{IMAGE_NAME}:{hashlib.sha256(f.read()).hexdigest()[:12]}"
+            if self._docker(['image', 'inspect', tag], timeout=60).returncode != 0:
+                print(f"[Runner] Сборка образа {tag} из {self.dockerfile}")
+                # Пустой контекст сборки: код проекта монтируется при запуске, а не копируется в образ
+                with tempfile.TemporaryDirectory() as context:
+                    built = self._docker(['build', '-t', tag, '-f', self.dockerfile, context])
+                if built.returncode != 0:
+                    raise RuntimeError(f"docker build {tag} failed: {built.stderr[-2000:]}")
+            self._image = tag
+            return tag
+
+    def run(self, project_path: str, command: str, bundle: bool = True) -> subprocess.CompletedProcess:
+        """
+        :param project_path: путь к проекту (монтируется в /app)
+        :param command: команда bash
+        :param bundle: предварительно установить гемы (bundle check || bundle install)
+        :return: результат процесса (stdout, stderr, returncode)
+        """
+        project_path = os.path.abspath(project_path)
+        image = self.image()
+        volume = BUNDLE_VOLUME_PREFIX + lockfile_digest(project_path)
+        script = _script(command, bundle)
+        if self.warm:
+            container = self._warm_container(project_path, image, volume)
+            return self._docker(['exec', '-w', '/app', container, 'bash', '-c', script])
+        return self._docker(['run', '--rm', '-v', f'{project_path}:/app', '-v', f'{volume}:/bundle',
+                             '-w', '/app', image, 'bash', '-c', script])
+
+    def _warm_container(self, project_path: str, image: str, volume: str) -> str:
+        # Контейнер пересоздаётся, если он остановлен или изменился Gemfile.lock (другой том)
+        name = WARM_CONTAINER_PREFIX + hashlib.sha256(project_path.encode('utf-8')).hexdigest()[:12]
+        with self._lock:
+            known = self._containers.get(project_path)
+            if known == (name, volume):
+                running = self._docker(['inspect', '-f', '{{.State.Running}}', name], timeout=30)
+                if running.returncode == 0 and running.stdout.strip() == 'true':
+                    return name
+            self._docker(['rm', '-f', name], timeout=60)
+            started = self._docker(['run', '-d', '--name', name, '-v', f'{project_path}:/app',
+                                    '-v', f'{volume}:/bundle', '-w', '/app', image, 'sleep', 'infinity'],
+                                   timeout=120)
+            if started.returncode != 0:
+                self._containers.pop(project_path, None)
+                raise RuntimeError(f"docker run {name} failed: {started.stderr[-2000:]}")
+            self._containers[project_path] = (name, volume)
+            return name
+
+    def stop_warm(self, project_path: str) -> None:
+        """
+        Удаляет долгоживущий контейнер проекта.
+        """
+        with self._lock:
+            known = self._containers.pop(os.path.abspath(project_path), None)
+        if known:
+            self._docker(['rm', '-f', known[0]], timeout=60)
+
+    def shutdown(self) -> None:
+        """
+        Удаляет все долгоживущие контейнеры исполнителя (при остановке процесса).
+        """
+        for project_path in list(self._containers):
+            try:
+                self.stop_warm(project_path)
+            except Exception as e:
+                print(f"[Runner] Ошибка остановки контейнера {project_path}: {e}")
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Общий исполнитель процесса согласно RUNNER_BACKEND.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = LocalExecutor() if RUNNER_BACKEND == 'local' else DockerExecutor()
+            atexit.register(_executor.shutdown)
+        return _executor
+
+
+def set_executor(executor) -> None:
+    """
+    Подменяет общий исполнитель (тесты, машины без Docker).
+    """
+    global _executor
+    with _executor_lock:
+        _executor = executor
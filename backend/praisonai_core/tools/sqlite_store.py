@@ -0,0 +1,360 @@
+# SQLite-хранилище Live Project Context
+# Одна база state.sqlite3 на папку проектов (WAL), таблицы projects/tasks/subtasks/reports
+# с индексами по полям фильтрации /status.
+
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+DB_FILE = 'state.sqlite3'
+# state.json проекта, ещё не перенесённого в базу, читается как есть
+BOOTSTRAP_FILE = 'state.json'
+
+# Хранилище пишет дельты: context_manager передаёт в save предыдущее состояние
+INCREMENTAL = True
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    status TEXT,
+    iteration_count INTEGER,
+    current_llm_cost REAL,
+    extra TEXT NOT NULL,
+    has_tasks INTEGER NOT NULL DEFAULT 0,
+    has_reports INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    project_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    id TEXT,
+    agent TEXT,
+    status TEXT,
+    assigned_to TEXT,
+    priority INTEGER,
+    has_subtasks INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    PRIMARY KEY (project_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (project_id, status, position);
+CREATE INDEX IF NOT EXISTS idx_tasks_assigned_to ON tasks (project_id, assigned_to, position);
+CREATE TABLE IF NOT EXISTS subtasks (
+    project_id TEXT NOT NULL,
+    task_position INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    id TEXT,
+    status TEXT,
+    type TEXT,
+    assigned_to TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (project_id, task_position, position)
+);
+CREATE TABLE IF NOT EXISTS reports (
+    project_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    type TEXT,
+    severity TEXT,
+    status TEXT,
+    created_at TEXT,
+    related_task TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (project_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_reports_type ON reports (project_id, type, position);
+CREATE INDEX IF NOT EXISTS idx_reports_severity ON reports (project_id, severity, position);
+"""
+
+_local = threading.local()
+
+
+def _split_path(project_path: str) -> Tuple[str, str]:
+    """
+    :param project_path: путь к папке проекта
+    :return: (путь к базе, project_id)
+    """
+    base_path, project_id = os.path.split(os.path.normpath(project_path))
+    return os.path.join(base_path, DB_FILE), project_id
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """
+    Возвращает соединение текущего потока с базой (создаёт схему при первом подключении).
+    :param db_path: путь к файлу базы
+    :return: соединение sqlite3
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        connections[db_path] = conn
+    return conn
+
+
+def close_connections() -> None:
+    """
+    Закрывает соединения текущего потока (тесты, смена папки проектов).
+    """
+    for conn in getattr(_local, 'connections', {}).values():
+        conn.close()
+    _local.connections = {}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+# --- Интерфейс хранилища для context_manager ---
+
+def signature(project_path: str) -> Optional[tuple]:
+    """
+    Сигнатура состояния для кэша context_manager: версия строки проекта в базе.
+    Для ещё не перенесённого проекта — stat его state.json.
+    :param project_path: путь к папке проекта
+    :return: сигнатура или None, если проекта нет
+    """
+    db_path, project_id = _split_path(project_path)
+    row = _connect(db_path).execute('SELECT version FROM projects WHERE id = ?', (project_id,)).fetchone()
+    if row is not None:
+        return (db_path, project_id, row[0])
+    bootstrap_path = os.path.join(project_path, BOOTSTRAP_FILE)
+    try:
+        st = os.stat(bootstrap_path)
+    except FileNotFoundError:
+        return None
+    return (bootstrap_path, st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def load(project_path: str) -> Dict[str, Any]:
+    """
+    Собирает состояние проекта из таблиц (или из state.json, если проект ещё не в базе).
+    :param project_path: путь к папке проекта
+    :return: состояние проекта
+    """
+    db_path, project_id = _split_path(project_path)
+    conn = _connect(db_path)
+    row = conn.execute('SELECT extra, has_tasks, has_reports FROM projects WHERE id = ?',
+                       (project_id,)).fetchone()
+    if row is None:
+        with open(os.path.join(project_path, BOOTSTRAP_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    state = json.loads(row[0])
+    if row[1]:
+        state['tasks'] = [task for _, task in _load_tasks(conn, project_id, 'position >= 0', ())]
+    if row[2]:
+        state['reports'] = [json.loads(data) for (data,) in conn.execute(
+            'SELECT data FROM reports WHERE project_id = ? ORDER BY position', (project_id,))]
+    return state
+
+
+def _load_tasks(conn: sqlite3.Connection, project_id: str, where: str, params: tuple,
+                limit: int = -1) -> List[Tuple[int, dict]]:
+    """
+    :return: список (позиция, задача с подзадачами)
+    """
+    rows = conn.execute(
+        f'SELECT position, has_subtasks, data FROM tasks WHERE project_id = ? AND {where} ORDER BY position LIMIT ?',
+        (project_id,) + params + (limit,)).fetchall()
+    tasks = []
+    for position, has_subtasks, data in rows:
+        task = json.loads(data)
+        if has_subtasks:
+            task['subtasks'] = [json.loads(sub) for (sub,) in conn.execute(
+                'SELECT data FROM subtasks WHERE project_id = ? AND task_position = ? ORDER BY position',
+                (project_id, position))]
+        tasks.append((position, task))
+    return tasks
+
+
+def _insert_task(conn: sqlite3.Connection, project_id: str, position: int, task: dict) -> None:
+    data = {k: v for k, v in task.items() if k != 'subtasks'}
+    conn.execute(
+        'INSERT OR REPLACE INTO tasks (project_id, position, id, agent, status, assigned_to, priority, has_subtasks, data) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (project_id, position, task.get('id'), task.get('agent'), task.get('status'), task.get('assigned_to'),
+         task.get('priority') if isinstance(task.get('priority'), int) else None,
+         1 if 'subtasks' in task else 0, _dumps(data)))
+    conn.execute('DELETE FROM subtasks WHERE project_id = ? AND task_position = ?', (project_id, position))
+    conn.executemany(
+        'INSERT INTO subtasks (project_id, task_position, position, id, status, type, assigned_to, data) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        [(project_id, position, i, sub.get('id'), sub.get('status'), sub.get('type'), sub.get('assigned_to'),
+          _dumps(sub)) for i, sub in enumerate(task.get('subtasks') or []) if isinstance(sub, dict)])
+
+
+def _insert_report(conn: sqlite3.Connection, project_id: str, position: int, report: dict) -> None:
+    conn.execute(
+        'INSERT OR REPLACE INTO reports (project_id, position, type, severity, status, created_at, related_task, data) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (project_id, position, report.get('type'), report.get('severity'), report.get('status'),
+         report.get('created_at'), report.get('related_task'), _dumps(report)))
+
+
+def _sync_list(conn: sqlite3.Connection, table: str, project_id: str, old: Optional[list], new: list,
+               insert) -> None:
+    """
+    Синхронизирует строки таблицы со списком: дописывает новые элементы,
+    обновляет изменённые, при укорочении/перестановке — переписывает список.
+    """
+    old = old if isinstance(old, list) else None
+    if old is None or len(new) < len(old):
+        conn.execute(f'DELETE FROM {table} WHERE project_id = ?', (project_id,))
+        if table == 'tasks':
+            conn.execute('DELETE FROM subtasks WHERE project_id = ?', (project_id,))
+        old = []
+    for position, item in enumerate(new):
+        if position < len(old) and old[position] == item:
+            continue
+        insert(conn, project_id, position, item)
+
+
+def save(project_path: str, state: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+    """
+    Записывает изменения состояния в базу одной транзакцией.
+    :param project_path: путь к папке проекта
+    :param state: новое состояние
+    :param previous: текущее сохранённое состояние (None — записать проект целиком)
+    """
+    db_path, project_id = _split_path(project_path)
+    conn = _connect(db_path)
+    in_db = conn.execute('SELECT 1 FROM projects WHERE id = ?', (project_id,)).fetchone() is not None
+    if not in_db:
+        # Проект переносится из state.json: строк в таблицах ещё нет
+        previous = None
+    previous = previous or {}
+    tasks = state.get('tasks') if isinstance(state.get('tasks'), list) else []
+    reports = state.get('reports') if isinstance(state.get('reports'), list) else []
+    extra = {k: v for k, v in state.items() if k not in ('tasks', 'reports')}
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(
+            'INSERT INTO projects (id, status, iteration_count, current_llm_cost, extra, has_tasks, has_reports, version, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?) '
+            'ON CONFLICT(id) DO UPDATE SET status = excluded.status, iteration_count = excluded.iteration_count, '
+            'current_llm_cost = excluded.current_llm_cost, extra = excluded.extra, has_tasks = excluded.has_tasks, '
+            'has_reports = excluded.has_reports, version = projects.version + 1, updated_at = excluded.updated_at',
+            (project_id, state.get('status'), state.get('iteration_count'), state.get('current_llm_cost'),
+             _dumps(extra), 1 if 'tasks' in state else 0, 1 if 'reports' in state else 0,
+             datetime.utcnow().isoformat() + "Z"))
+        _sync_list(conn, 'tasks', project_id, previous.get('tasks') if in_db else None, tasks, _insert_task)
+        _sync_list(conn, 'reports', project_id, previous.get('reports') if in_db else None, reports, _insert_report)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+# --- Индексные запросы для /status ---
+
+def query_tasks(project_path: str, filters: Dict[str, Any], limit: Optional[int],
+                cursor: Optional[int]) -> Optional[Tuple[List[dict], Optional[int]]]:
+    """
+    Выборка задач по индексам (status, assigned_to) с пагинацией по позиции.
+    :return: (задачи, курсор следующей страницы) или None, если проект не в базе
+    """
+    db_path, project_id = _split_path(project_path)
+    conn = _connect(db_path)
+    if conn.execute('SELECT 1 FROM projects WHERE id = ?', (project_id,)).fetchone() is None:
+        return None
+    where, params = _where(filters, cursor)
+    rows = _load_tasks(conn, project_id, where, params, (limit + 1) if limit is not None else -1)
+    return _page(rows, limit)
+
+
+def query_reports(project_path: str, filters: Dict[str, Any], limit: Optional[int],
+                  cursor: Optional[int]) -> Optional[Tuple[List[dict], Optional[int]]]:
+    """
+    Выборка отчётов по индексам (type, severity) с пагинацией по позиции.
+    :return: (отчёты, курсор следующей страницы) или None, если проект не в базе
+    """
+    db_path, project_id = _split_path(project_path)
+    conn = _connect(db_path)
+    if conn.execute('SELECT 1 FROM projects WHERE id = ?', (project_id,)).fetchone() is None:
+        return None
+    where, params = _where(filters, cursor)
+    rows = conn.execute(
+        f'SELECT position, data FROM reports WHERE project_id = ? AND {where} ORDER BY position LIMIT ?',
+        (project_id,) + params + ((limit + 1) if limit is not None else -1,)).fetchall()
+    return _page([(position, json.loads(data)) for position, data in rows], limit)
+
+
+def read_status(project_path: str) -> Optional[str]:
+    """
+    :return: статус проекта без загрузки задач и отчётов (None, если проект не в базе)
+    """
+    db_path, project_id = _split_path(project_path)
+    row = _connect(db_path).execute('SELECT status FROM projects WHERE id = ?', (project_id,)).fetchone()
+    if row is None:
+        return None
+    return row[0] or 'init'
+
+
+def _where(filters: Dict[str, Any], cursor: Optional[int]) -> Tuple[str, tuple]:
+    clauses = ['position >= ?']
+    params: list = [cursor or 0]
+    for column, value in filters.items():
+        if value is not None:
+            clauses.append(f'{column} = ?')
+            params.append(value)
+    return ' AND '.join(clauses), tuple(params)
+
+
+def _page(rows: List[Tuple[int, dict]], limit: Optional[int]) -> Tuple[List[dict], Optional[int]]:
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        next_cursor = rows[limit][0]
+        rows = rows[:limit]
+    return [item for _, item in rows], next_cursor
+
+
+# --- Миграция state.json -> SQLite ---
+
+def migrate_projects(base_path: str) -> List[str]:
+    """
+    Импортирует все проекты из папки (state.json или журнал событий) в state.sqlite3.
+    Уже перенесённые проекты пропускаются.
+    :param base_path: папка проектов
+    :return: список перенесённых project_id
+    """
+    from praisonai_core.tools import event_log
+    migrated = []
+    conn = _connect(os.path.join(base_path, DB_FILE))
+    for project_id in sorted(os.listdir(base_path)):
+        project_path = os.path.join(base_path, project_id)
+        if not os.path.isdir(project_path):
+            continue
+        if conn.execute('SELECT 1 FROM projects WHERE id = ?', (project_id,)).fetchone() is not None:
+            continue
+        if event_log.signature(project_path) is None:
+            continue
+        state = event_log.load(project_path)
+        if 'status' not in state:
+            state['status'] = 'init'
+        save(project_path, state, None)
+        migrated.append(project_id)
+    return migrated
+
+
+def main() -> None:
+    from praisonai_core.tools import context_manager
+    parser = argparse.ArgumentParser(description="Перенос state.json проектов в SQLite-хранилище")
+    parser.add_argument('--projects', default=context_manager.BASE_PROJECTS_PATH, help="папка проектов")
+    args = parser.parse_args()
+    migrated = migrate_projects(args.projects)
+    print(f"[sqlite_store] Перенесено проектов: {len(migrated)}")
+    for project_id in migrated:
+        print(f"  - {project_id}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,454 @@
 # Модуль запуска тестов
+# Команды выполняет исполнитель runner (Docker с кэшем гемов или локальный подпроцесс).
+# Полный прогон делится на шарды по спек-файлам: шарды сбалансированы по длительностям
+# прошлых прогонов (.spec_timings.json в папке проекта) и выполняются параллельно,
+# JSON-выводы rspec сливаются в один результат.
+# run_changed_tests запускает только спеки, затронутые изменениями с последнего прогона,
+# и спеки, упавшие в прошлый раз: манифест хэшей файлов и карта исходник -> спеки хранятся в .test_manifest.json.
 
-import subprocess
 import os
-from typing import Optional
+import json
+import time
+import heapq
+import shlex
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-def run_all_tests(project_path: str) -> Optional[str]:
+from praisonai_core import correction_planner, tracing
+from praisonai_core.tools import report_parsers, runner
+
+# Число параллельных шардов rspec; 1 (по умолчанию) — один процесс. Шардам нужны
+# отдельные тестовые базы: database.yml проекта должен использовать TEST_ENV_NUMBER
+SPEC_WORKERS = int(os.environ.get('APPBUILDER_SPEC_WORKERS', '1'))
+DATABASE_CONFIG = os.path.join('config', 'database.yml')
+# Создание и загрузка схемы тестовой базы шарда (TEST_ENV_NUMBER задаётся перед командой)
+SHARD_DB_SETUP = 'RAILS_ENV=test bundle exec rails db:create db:schema:load'
+
+TIMINGS_FILE = '.spec_timings.json'
+# Длительность спек-файла без истории прогонов (сек)
+DEFAULT_SPEC_SECONDS = 1.0
+
+MANIFEST_FILE = '.test_manifest.json'
+# Файлы, по которым строится манифест
+WATCHED_DIRS = ('app', 'lib', 'config', 'db', 'spec')
+WATCHED_ROOT_FILES = ('Gemfile', 'Gemfile.lock', '.rspec')
+WATCHED_EXTENSIONS = ('.rb', '.erb', '.rake', '.yml', '.js', '.ts', '.css', '.scss')
+# Изменения, влияющие на весь набор: после них — полный прогон
+GLOBAL_PREFIXES = ('Gemfile', '.rspec', 'config/', 'db/', 'spec/spec_helper.rb', 'spec/rails_helper.rb',
+                   'spec/support/', 'spec/factories/')
+# Полный прогон после стольких выборочных подряд или если полного не было дольше FULL_SWEEP_SECONDS
+FULL_SWEEP_RUNS = int(os.environ.get('APPBUILDER_TEST_FULL_SWEEP_RUNS', '10'))
+FULL_SWEEP_SECONDS = float(os.environ.get('APPBUILDER_TEST_FULL_SWEEP_SECONDS', str(6 * 3600)))
+
+
+@tracing.traced('run_all_tests')
+def run_all_tests(project_path: str, workers: Optional[int] = None) -> Optional[str]:
+    """
+    Запускает все тесты RSpec для Rails-проекта (по умолчанию через Docker).
+    Если спек-файлов больше одного и workers > 1, прогон делится на шарды.
+    :param project_path: путь к проекту
+    :param workers: число шардов (по умолчанию SPEC_WORKERS)
+    :return: JSON-вывод rspec (при шардах — объединённый) или None при ошибке запуска
+    """
+    workers = SPEC_WORKERS if workers is None else workers
+    specs = discover_specs(project_path)
+    if workers > 1 and len(specs) > 1:
+        return run_sharded(project_path, specs, workers)
+    try:
+        result = runner.get_executor().run(project_path, 'bundle exec rspec --format json')
+    except Exception:
+        return None
+    output = _rspec_output(result)
+    if output is not None:
+        record_timings(project_path, [output])
+    return output
+
+
+@tracing.traced('run_specs')
+def run_specs(project_path: str, specs: Optional[List[str]] = None) -> Optional[str]:
     """
-    Запускает все тесты RSpec для Rails-проекта через Docker.
-    Возвращает stdout (отчёт) или None при ошибке.
+    Запускает выбранные спеки RSpec (перепроверка в цикле исправлений).
+    Код возврата rspec при упавших примерах — 1, поэтому вывод возвращается в любом случае.
+    :param project_path: путь к проекту
+    :param specs: пути спеков относительно проекта (None — все спеки)
+    :return: JSON-вывод rspec или None, если запуск не удался
     """
+    spec_args = ' '.join(shlex.quote(spec) for spec in specs or [])
     try:
-        docker_cmd = [
-            'docker', 'run', '--rm', '-v', f'{project_path}:/app', '-w', '/app', 'ruby:3.2',
-            'bash', '-c', 'bundle install && bundle exec rspec --format json'
-        ]
-        result = subprocess.run(docker_cmd, capture_output=True, text=True, check=True)
+        result = runner.get_executor().run(project_path, f'bundle exec rspec --format json {spec_args}'.rstrip())
+    except Exception:
+        return None
+    return result.stdout or None
+
+
+def _rspec_output(result) -> Optional[str]:
+    # 0 — все примеры прошли, 1 — есть упавшие; иначе rspec не отработал (ошибка загрузки, bundle)
+    if result.returncode in (0, 1) and result.stdout:
         return result.stdout
-    except Exception as e:
+    return None
+
+
+def discover_specs(project_path: str) -> List[str]:
+    """
+    :return: спек-файлы проекта (spec/**/*_spec.rb) относительно папки проекта
+    """
+    found = []
+    spec_root = os.path.join(project_path, 'spec')
+    for root, dirs, files in os.walk(spec_root):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('_spec.rb'):
+                found.append(os.path.relpath(os.path.join(root, name), project_path).replace(os.sep, '/'))
+    return found
+
+
+def load_timings(project_path: str) -> Dict[str, float]:
+    """
+    :return: длительности спек-файлов последних прогонов (сек)
+    """
+    try:
+        with open(os.path.join(project_path, TIMINGS_FILE), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {k: float(v) for k, v in data.items() if isinstance(v, (int, float))} if isinstance(data, dict) else {}
+
+
+def record_timings(project_path: str, outputs: List[str]) -> None:
+    """
+    Обновляет длительности спек-файлов по JSON-выводам rspec (run_time примеров).
+    """
+    measured: Dict[str, float] = {}
+    for output in outputs:
+        data = report_parsers.load_json(output)
+        for example in (data or {}).get('examples') or []:
+            path = report_parsers.strip_path(example.get('file_path', ''))
+            if path:
+                measured[path] = measured.get(path, 0.0) + float(example.get('run_time') or 0.0)
+    if not measured:
+        return
+    timings = load_timings(project_path)
+    timings.update({k: round(v, 4) for k, v in measured.items()})
+    fd, tmp_path = tempfile.mkstemp(prefix='.spec_timings.', suffix='.tmp', dir=project_path)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(timings, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, os.path.join(project_path, TIMINGS_FILE))
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"[testing_runner] Не удалось сохранить {TIMINGS_FILE}: {e}")
+
+
+def plan_shards(specs: List[str], timings: Dict[str, float], workers: int) -> List[List[str]]:
+    """
+    Делит спек-файлы на шарды с близкой суммарной длительностью: самые долгие файлы
+    раздаются первыми в наименее загруженный шард. Файлы без истории получают
+    медианную длительность известных.
+    :return: непустые шарды (не больше workers)
+    """
+    known = sorted(timings[s] for s in specs if s in timings)
+    fallback = known[len(known) // 2] if known else DEFAULT_SPEC_SECONDS
+    ordered = sorted(specs, key=lambda s: (-timings.get(s, fallback), s))
+    heap = [(0.0, i, []) for i in range(max(1, min(workers, len(specs))))]
+    for spec in ordered:
+        load, index, shard = heapq.heappop(heap)
+        shard.append(spec)
+        heapq.heappush(heap, (load + timings.get(spec, fallback), index, shard))
+    return [shard for _, _, shard in sorted(heap, key=lambda item: item[1]) if shard]
+
+
+def run_sharded(project_path: str, specs: List[str], workers: int) -> Optional[str]:
+    """
+    Параллельный прогон шардов. Гемы ставятся один раз до запуска шардов; шарду i
+    передаётся TEST_ENV_NUMBER ('', '2', '3', ... как в parallel_tests), чтобы тестовые
+    базы шардов не пересекались. Базы шардов создаются и загружаются перед прогоном;
+    если database.yml не использует TEST_ENV_NUMBER или подготовка баз не удалась,
+    спеки запускаются одним процессом.
+    :return: объединённый JSON-вывод или None, если ни один шард не отработал
+    """
+    executor = runner.get_executor()
+    try:
+        if executor.run(project_path, 'true').returncode != 0:
+            return None
+    except Exception:
         return None
+    shards = plan_shards(specs, load_timings(project_path), workers)
+    if len(shards) > 1 and not prepare_shard_databases(project_path, len(shards)):
+        return run_specs(project_path, specs)
+
+    def run_shard(index: int) -> Optional[str]:
+        spec_args = ' '.join(shlex.quote(spec) for spec in shards[index])
+        try:
+            command = f'TEST_ENV_NUMBER={_env_number(index)} bundle exec rspec --format json {spec_args}'
+            result = executor.run(project_path, command, bundle=False)
+        except Exception:
+            return None
+        return _rspec_output(result)
+
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        outputs = list(pool.map(run_shard, range(len(shards))))
+    done = [output for output in outputs if output is not None]
+    if not done:
+        return None
+    record_timings(project_path, done)
+    return json.dumps(merge_results(outputs, shards), ensure_ascii=False)
+
+
+def _env_number(index: int) -> str:
+    return shlex.quote(str(index + 1) if index else '')
+
+
+def prepare_shard_databases(project_path: str, count: int) -> bool:
+    """
+    Создаёт и загружает схему тестовых баз count шардов (SHARD_DB_SETUP).
+    Проект без config/database.yml базы не использует.
+    :return: можно ли запускать шарды параллельно
+    """
+    config_path = os.path.join(project_path, DATABASE_CONFIG)
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = f.read()
+    except FileNotFoundError:
+        return True
+    except OSError as e:
+        print(f"[testing_runner] Не удалось прочитать {DATABASE_CONFIG}: {e}")
+        return False
+    if 'TEST_ENV_NUMBER' not in config:
+        print(f"[testing_runner] {DATABASE_CONFIG} не использует TEST_ENV_NUMBER — спеки без шардов")
+        return False
+    executor = runner.get_executor()
+    for index in range(count):
+        try:
+            command = f'TEST_ENV_NUMBER={_env_number(index)} {SHARD_DB_SETUP}'
+            result = executor.run(project_path, command, bundle=False)
+        except Exception as e:
+            result = None
+            print(f"[testing_runner] Ошибка подготовки базы шарда {index + 1}: {e}")
+        if result is None or result.returncode != 0:
+            print(f"[testing_runner] База шарда {index + 1} не подготовлена — спеки без шардов")
+            return False
+    return True
+
+
+def merge_results(outputs: List[Optional[str]], shards: Optional[List[List[str]]] = None) -> Dict[str, Any]:
+    """
+    Сливает JSON-выводы rspec шардов: примеры объединяются, счётчики суммируются,
+    duration — самый долгий шард. Шард без разбираемого вывода считается ошибкой вне примеров.
+    :param outputs: выводы шардов (None — шард не отработал)
+    :param shards: спек-файлы шардов (для сообщений об ошибках)
+    :return: результат в формате rspec --format json
+    """
+    examples: List[dict] = []
+    messages: List[str] = []
+    version = None
+    summary = {'duration': 0.0, 'example_count': 0, 'failure_count': 0, 'pending_count': 0,
+               'errors_outside_of_examples_count': 0}
+    for index, output in enumerate(outputs):
+        data = report_parsers.load_json(output)
+        if data is None:
+            summary['errors_outside_of_examples_count'] += 1
+            files = ', '.join(shards[index]) if shards else ''
+            messages.append(f"Shard {index + 1} produced no RSpec JSON output ({files})")
+            continue
+        version = version or data.get('version')
+        examples.extend(data.get('examples') or [])
+        messages.extend(data.get('messages') or [])
+        shard_summary = data.get('summary') or {}
+        summary['duration'] = max(summary['duration'], float(shard_summary.get('duration') or 0.0))
+        for key in ('example_count', 'failure_count', 'pending_count', 'errors_outside_of_examples_count'):
+            summary[key] += int(shard_summary.get(key) or 0)
+    summary_line = f"{summary['example_count']} examples, {summary['failure_count']} failures"
+    if summary['pending_count']:
+        summary_line += f", {summary['pending_count']} pending"
+    if summary['errors_outside_of_examples_count']:
+        summary_line += f", {summary['errors_outside_of_examples_count']} errors occurred outside of examples"
+    return {'version': version, 'messages': messages, 'examples': examples, 'summary': summary,
+            'summary_line': summary_line, 'shards': len(outputs)}
+
+
+# --- Выбор спеков по изменениям ---
+
+def load_manifest(project_path: str) -> Dict[str, Any]:
+    """
+    :return: манифест последнего прогона (files, map, failed, last_full_at, runs_since_full)
+    """
+    try:
+        with open(os.path.join(project_path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_manifest(project_path: str, manifest: Dict[str, Any]) -> None:
+    fd, tmp_path = tempfile.mkstemp(prefix='.test_manifest.', suffix='.tmp', dir=project_path)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, os.path.join(project_path, MANIFEST_FILE))
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"[testing_runner] Не удалось сохранить {MANIFEST_FILE}: {e}")
+
+
+def hash_files(project_path: str, previous: Optional[Dict[str, list]] = None) -> Dict[str, list]:
+    """
+    Хэши отслеживаемых файлов проекта. Файл с прежними mtime и размером не перечитывается.
+    :param previous: прежний манифест {путь: [sha256, mtime_ns, size]}
+    :return: {путь: [sha256, mtime_ns, size]}
+    """
+    previous = previous or {}
+    paths = [name for name in WATCHED_ROOT_FILES if os.path.isfile(os.path.join(project_path, name))]
+    for top in WATCHED_DIRS:
+        for root, dirs, files in os.walk(os.path.join(project_path, top)):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(WATCHED_EXTENSIONS):
+                    paths.append(os.path.relpath(os.path.join(root, name), project_path).replace(os.sep, '/'))
+    hashes = {}
+    for path in paths:
+        try:
+            stat = os.stat(os.path.join(project_path, path))
+        except OSError:
+            continue
+        known = previous.get(path)
+        if known and known[1:] == [stat.st_mtime_ns, stat.st_size]:
+            hashes[path] = known
+            continue
+        with open(os.path.join(project_path, path), 'rb') as f:
+            hashes[path] = [hashlib.sha256(f.read()).hexdigest(), stat.st_mtime_ns, stat.st_size]
+    return hashes
+
+
+def changed_files(old: Dict[str, list], new: Dict[str, list]) -> Set[str]:
+    """
+    :return: добавленные, изменённые и удалённые файлы
+    """
+    return {path for path in set(old) | set(new)
+            if (old.get(path) or [None])[0] != (new.get(path) or [None])[0]}
+
+
+def learn_spec_map(tasks: Iterable[dict], spec_map: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+    """
+    Дополняет карту исходник -> спеки по задачам: спеки, созданные той же задачей
+    (artifacts_produced), проверяют её исходники.
+    """
+    learned = {k: set(v) for k, v in (spec_map or {}).items()}
+    for task in tasks or []:
+        produced = [report_parsers.strip_path(p) for p in task.get('artifacts_produced') or [] if isinstance(p, str)]
+        specs = {p for p in produced if p.startswith('spec/') and p.endswith('_spec.rb')}
+        for path in produced:
+            if specs and path not in specs:
+                learned.setdefault(path, set()).update(specs)
+    return {k: sorted(v) for k, v in learned.items()}
+
+
+def specs_for_change(path: str, spec_map: Dict[str, List[str]], existing: Set[str]) -> Set[str]:
+    """
+    Спеки, затронутые изменением файла: сам спек, спеки из карты и по соглашениям Rails
+    (app/models/post.rb -> spec/models/post_spec.rb; контроллер и его views -> spec/requests/<ресурс>_spec.rb).
+    """
+    if path.startswith('spec/') and path.endswith('_spec.rb'):
+        return {path} & existing
+    candidates = set(spec_map.get(path, []))
+    convention = correction_planner.spec_for_source(path)
+    if convention:
+        candidates.add(convention)
+    resource = None
+    if path.startswith('app/controllers/') and path.endswith('_controller.rb'):
+        resource = path[len('app/controllers/'):-len('_controller.rb')]
+    elif path.startswith('app/views/'):
+        resource = os.path.dirname(path[len('app/views/'):])
+        candidates.add('spec/views/' + path[len('app/views/'):] + '_spec.rb')
+    if resource:
+        candidates.update({f'spec/requests/{resource}_spec.rb', f'spec/system/{resource}_spec.rb'})
+    return candidates & existing
+
+
+def select_specs(project_path: str, manifest: Dict[str, Any], hashes: Dict[str, list],
+                 spec_map: Dict[str, List[str]], full: bool = False) -> Tuple[Optional[List[str]], str]:
+    """
+    Решает, что запускать.
+    :return: (спеки, причина); None вместо списка — полный прогон
+    """
+    if full:
+        return None, 'forced'
+    if not manifest.get('files'):
+        return None, 'no_baseline'
+    if manifest.get('runs_since_full', 0) >= FULL_SWEEP_RUNS or \
+            time.time() - manifest.get('last_full_at', 0) > FULL_SWEEP_SECONDS:
+        return None, 'periodic_sweep'
+    existing = set(discover_specs(project_path))
+    selected = set(manifest.get('failed') or []) & existing
+    for path in sorted(changed_files(manifest['files'], hashes)):
+        if path.startswith(GLOBAL_PREFIXES):
+            return None, f'global_change:{path}'
+        specs = specs_for_change(path, spec_map, existing)
+        if not specs and not path.startswith('spec/'):
+            # Изменение без известных спеков — надёжнее прогнать всё
+            return None, f'unmapped_change:{path}'
+        selected |= specs
+    return sorted(selected), 'changed'
+
+
+def _failed_from(output: Optional[str]) -> Optional[Set[str]]:
+    record = report_parsers.parse_rspec(output)
+    if record is None:
+        return None
+    failed = set(record['failed_specs'])
+    if record['totals']['errors_outside_of_examples']:
+        failed.add('')
+    return failed
+
+
+@tracing.traced('run_changed_tests')
+def run_changed_tests(project_path: str, tasks: Optional[List[dict]] = None, full: bool = False,
+                      workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Прогон RSpec только по спекам, затронутым изменениями с последнего прогона
+    (зелёного или с известным списком упавших спеков), и спекам, упавшим в прошлый раз.
+    Полный прогон — принудительно (full), без манифеста,
+    при изменении общих файлов (Gemfile, config/, db/, spec/support/...), изменении без
+    известных спеков и периодически (FULL_SWEEP_RUNS, FULL_SWEEP_SECONDS).
+    Манифест хэшей не обновляется, если rspec не отработал или упал вне примеров.
+    :param project_path: путь к проекту
+    :param tasks: задачи проекта (artifacts_produced для карты исходник -> спеки)
+    :param full: принудительный полный прогон
+    :param workers: число шардов (по умолчанию SPEC_WORKERS)
+    :return: {'output': JSON rspec или None (в режиме 'skipped' — всегда None),
+              'mode': 'full'|'selective'|'skipped', 'reason', 'specs'}
+    """
+    manifest = load_manifest(project_path)
+    hashes = hash_files(project_path, manifest.get('files'))
+    spec_map = learn_spec_map(tasks or [], manifest.get('map'))
+    specs, reason = select_specs(project_path, manifest, hashes, spec_map, full)
+    if specs is None:
+        mode = 'full'
+        output = run_all_tests(project_path, workers)
+    elif not specs:
+        # С последнего прогона ничего не менялось и упавших спеков нет: rspec не запускался,
+        # вывода нет — что считать результатом, решает вызывающий
+        mode = 'skipped'
+        output = None
+    else:
+        mode = 'selective'
+        workers = SPEC_WORKERS if workers is None else workers
+        output = run_sharded(project_path, specs, workers) if workers > 1 and len(specs) > 1 \
+            else run_specs(project_path, specs)
+    failed = _failed_from(output)
+    print(f"[testing_runner] Прогон {mode} ({reason}), спеков: {len(specs) if specs is not None else 'все'}")
+    if failed is not None and '' not in failed and mode != 'skipped':
+        # Результат известен для каждого спека: новая точка отсчёта изменений.
+        # Не запускавшиеся спеки сохраняют прежний статус (их файлы не менялись)
+        previous_failed = set() if mode == 'full' else set(manifest.get('failed') or []) - set(specs)
+        updated = dict(manifest, files=hashes, map=spec_map, failed=sorted(previous_failed | failed))
+        if mode == 'full':
+            updated.update(last_full_at=time.time(), runs_since_full=0)
+        else:
+            updated['runs_since_full'] = updated.get('runs_since_full', 0) + 1
+        _save_manifest(project_path, updated)
+    return {'output': output, 'mode': mode, 'reason': reason, 'specs': specs}
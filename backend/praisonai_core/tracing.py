@@ -0,0 +1,256 @@
+# Трассировка: спаны с длительностью, таймлайн проекта и гистограммы процесса
+# Спан — именованный замер (run_agent, llm_call, write_state, run_all_tests, ...).
+# Каждый спан попадает в гистограмму процесса (GET /metrics, формат Prometheus)
+# и, если известен проект, в ограниченный таймлайн проекта, который write_state
+# сохраняет в state['timeline']. Вложенные спаны наследуют проект и ссылаются на родителя.
+
+import os
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Сколько спанов хранить в таймлайне проекта
+TIMELINE_MAX_SPANS = int(os.environ.get('APPBUILDER_TRACE_TIMELINE_SPANS', '200'))
+# Для скольких проектов держать таймлайны в памяти процесса
+TIMELINE_MAX_PROJECTS = 256
+# Метки спана, попадающие в метрики (остальные — только в таймлайн)
+METRIC_LABELS = ('agent', 'model', 'kind')
+# Границы корзин гистограммы длительности (сек)
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Профили cProfile: папка проекта и сколько последних файлов хранить
+PROFILES_DIR_NAME = '.profiles'
+PROFILES_KEEP = 20
+PROFILE_TOP_FUNCTIONS = 20
+
+# (id спана, проект) текущего контекста — родитель вложенных спанов
+_current: contextvars.ContextVar[Optional[Tuple[str, Optional[str]]]] = contextvars.ContextVar(
+    'appbuilder_span', default=None)
+
+
+class _Timeline:
+    __slots__ = ('spans', 'seeded')
+
+    def __init__(self) -> None:
+        self.spans: List[Dict[str, Any]] = []
+        # Дополнен ли таймлайн спанами, сохранёнными в state другим процессом
+        self.seeded = False
+
+    def add(self, span: Dict[str, Any]) -> None:
+        self.spans.append(span)
+        if len(self.spans) > TIMELINE_MAX_SPANS:
+            # Обрезаем сразу половину: между обрезками список в state только растёт,
+            # и журнал событий пишет дельту append, а не весь таймлайн
+            del self.spans[:len(self.spans) - TIMELINE_MAX_SPANS // 2]
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count', 'errors')
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(HISTOGRAM_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool) -> None:
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.total += seconds
+        self.count += 1
+        if error:
+            self.errors += 1
+
+
+_lock = threading.Lock()
+_timelines: "OrderedDict[str, _Timeline]" = OrderedDict()
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _Histogram] = {}
+
+
+def _record(name: str, project_id: Optional[str], span: Dict[str, Any], error: bool) -> None:
+    metric_labels = tuple((k, str(span['labels'][k])) for k in METRIC_LABELS if span['labels'].get(k))
+    with _lock:
+        histogram = _histograms.get((name, metric_labels))
+        if histogram is None:
+            histogram = _histograms[(name, metric_labels)] = _Histogram()
+        histogram.observe(span['duration'], error)
+        if project_id:
+            timeline = _timelines.get(project_id)
+            if timeline is None:
+                timeline = _timelines[project_id] = _Timeline()
+                while len(_timelines) > TIMELINE_MAX_PROJECTS:
+                    _timelines.popitem(last=False)
+            else:
+                _timelines.move_to_end(project_id)
+            timeline.add(span)
+
+
+@contextmanager
+def span(name: str, project_id: Optional[str] = None, **labels: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Замеряет длительность блока.
+
+        with tracing.span('llm_call', project_id, agent='uiux', model='gemini-pro') as s:
+            s['labels']['cache'] = 'miss'
+
+    :param name: имя спана (метрика appbuilder_span_duration_seconds{span=name})
+    :param project_id: проект (по умолчанию — проект внешнего спана)
+    :param labels: метки; agent/model/kind попадают в метрики
+    :return: запись спана (labels можно дополнить внутри блока)
+    """
+    parent = _current.get()
+    if project_id is None and parent is not None:
+        project_id = parent[1]
+    record = {
+        'id': uuid.uuid4().hex[:12],
+        'parent': parent[0] if parent else None,
+        'name': name,
+        'started_at': round(time.time(), 3),
+        'duration': 0.0,
+        'status': 'ok',
+        'labels': {k: v for k, v in labels.items() if v is not None},
+    }
+    token = _current.set((record['id'], project_id))
+    started = time.perf_counter()
+    error = False
+    try:
+        yield record
+    except BaseException:
+        error = True
+        record['status'] = 'error'
+        raise
+    finally:
+        _current.reset(token)
+        record['duration'] = round(time.perf_counter() - started, 6)
+        _record(name, project_id, record, error)
+
+
+def in_span() -> bool:
+    """
+    :return: выполняется ли код внутри спана (в этом потоке)
+    """
+    return _current.get() is not None
+
+
+def traced(name: str, **labels: Any) -> Callable:
+    """
+    Декоратор: вызов функции — спан name в проекте внешнего спана.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def attach_timeline(project_id: str, state: Dict[str, Any]) -> None:
+    """
+    Записывает таймлайн проекта в state['timeline'] перед сохранением состояния.
+    Спаны, уже сохранённые другим процессом, при первой записи дополняются спанами этого процесса.
+    :param project_id: идентификатор проекта
+    :param state: сохраняемое состояние (изменяется на месте)
+    """
+    with _lock:
+        timeline = _timelines.get(project_id)
+        if timeline is None:
+            return
+        if not timeline.seeded:
+            timeline.seeded = True
+            known = {s.get('id') for s in timeline.spans}
+            saved = [s for s in state.get('timeline') or [] if isinstance(s, dict) and s.get('id') not in known]
+            timeline.spans[:0] = saved[-TIMELINE_MAX_SPANS:]
+            del timeline.spans[:max(0, len(timeline.spans) - TIMELINE_MAX_SPANS)]
+        state['timeline'] = list(timeline.spans)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def render_prometheus() -> str:
+    """
+    Гистограммы спанов процесса в текстовом формате Prometheus (GET /metrics).
+    """
+    with _lock:
+        items = sorted((key, list(h.counts), h.total, h.count, h.errors) for key, h in _histograms.items())
+    lines = [
+        '# HELP appbuilder_span_duration_seconds Длительность спанов (агенты, вызовы LLM, запись состояния, Docker)',
+        '# TYPE appbuilder_span_duration_seconds histogram',
+    ]
+    errors = [
+        '# HELP appbuilder_span_errors_total Спаны, завершившиеся исключением',
+        '# TYPE appbuilder_span_errors_total counter',
+    ]
+    for (name, labels), counts, total, count, error_count in items:
+        base = [('span', name)] + list(labels)
+        cumulative = 0
+        for bound, bucket in zip(HISTOGRAM_BUCKETS, counts):
+            cumulative += bucket
+            lines.append(f'appbuilder_span_duration_seconds_bucket{_format_labels(base + [("le", repr(bound))])} {cumulative}')
+        lines.append(f'appbuilder_span_duration_seconds_bucket{_format_labels(base + [("le", "+Inf")])} {count}')
+        lines.append(f'appbuilder_span_duration_seconds_sum{_format_labels(base)} {total:.6f}')
+        lines.append(f'appbuilder_span_duration_seconds_count{_format_labels(base)} {count}')
+        errors.append(f'appbuilder_span_errors_total{_format_labels(base)} {error_count}')
+    return '\n'.join(lines + errors) + '\n'
+
+
+def reset() -> None:
+    """
+    Очищает гистограммы и таймлайны процесса (тесты).
+    """
+    with _lock:
+        _histograms.clear()
+        _timelines.clear()
+
+
+@contextmanager
+def profiled(project_path: str, label: str) -> Iterator[Dict[str, Any]]:
+    """
+    Профилирует блок cProfile (только текущий поток: агенты, запущенные планировщиком
+    в других потоках, видны как ожидание). Профиль сохраняется в <project>/.profiles/*.prof,
+    хранятся PROFILES_KEEP последних.
+    :param project_path: путь к проекту
+    :param label: префикс имени файла (тип задания)
+    :return: словарь, который после выхода из блока содержит path и top (самые затратные функции)
+    """
+    capture: Dict[str, Any] = {}
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield capture
+    finally:
+        profiler.disable()
+        directory = os.path.join(project_path, PROFILES_DIR_NAME)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{label}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}.prof")
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler)
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+        capture['path'] = path
+        capture['top'] = [
+            {'function': f"{os.path.basename(filename)}:{line}({func})", 'calls': calls,
+             'total_seconds': round(total, 6), 'cumulative_seconds': round(cumulative, 6)}
+            for (filename, line, func), (_, calls, total, cumulative, _) in top
+        ]
+        profiles = sorted((os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.prof')),
+                          key=os.path.getmtime)
+        for old in profiles[:-PROFILES_KEEP]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
@@ -0,0 +1,87 @@
+# Локальный stub LLM API для тестов: отвечает заранее заданной последовательностью ответов
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LLMStubServer:
+    """
+    HTTP-сервер на 127.0.0.1 со сценарием ответов.
+    Элемент сценария: (status, body_dict, headers). Последний элемент повторяется.
+    Если body — список, ответ отдаётся потоком NDJSON (событие на строку, пауза chunk_delay).
+    Запрос с "batch" получает {"results": [...]} (или 400, если batch_support=False).
+    """
+
+    def __init__(self, script=None, delay: float = 0.0, chunk_delay: float = 0.0, batch_support: bool = True):
+        self.script = list(script or [(200, {"result": "ok", "usage": {"cost": 0.01}}, {})])
+        self.delay = delay
+        self.chunk_delay = chunk_delay
+        self.batch_support = batch_support
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                with stub._lock:
+                    stub.requests.append({"path": self.path, "payload": payload})
+                    index = min(len(stub.requests), len(stub.script)) - 1
+                    status, body, headers = stub.script[index]
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    if isinstance(body, list):
+                        # Потоковый ответ: NDJSON, по строке на событие
+                        self.send_response(status)
+                        self.send_header('Content-Type', 'application/x-ndjson')
+                        self.send_header('Connection', 'close')
+                        self.end_headers()
+                        for event in body:
+                            self.wfile.write(json.dumps(event).encode('utf-8') + b'\n')
+                            self.wfile.flush()
+                            if stub.chunk_delay:
+                                time.sleep(stub.chunk_delay)
+                        self.close_connection = True
+                        return
+                    if isinstance(payload.get('batch'), list) and status == 200:
+                        if not stub.batch_support:
+                            status, body = 400, {"error": "batch is not supported"}
+                        else:
+                            # Пакетный запрос: по ответу сценария на каждый элемент
+                            body = {"results": [dict(body, id=item.get('id')) for item in payload['batch']]}
+                    data = json.dumps(body).encode('utf-8')
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/generate"
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
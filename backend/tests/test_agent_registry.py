@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from praisonai_core import agent_registry
+
+VALID = """
+agents:
+  lead-qa:
+    role: >
+      Ты - 'lead-qa'.
+    model: "gemini-flash"
+    tools: [testing_runner.run_all_tests]
+"""
+
+
+class TestAgentRegistry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "agents.yaml")
+        self.write(VALID, mtime=1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, text, mtime):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_bundled_agents_yaml_is_valid(self):
+        registry = agent_registry.AgentRegistry()
+        config = registry.get("backend-dev")
+        self.assertEqual(config.model, "gemini-pro")
+        self.assertIn("auto_fixer.auto_fix_code", config.tools)
+
+    def test_configs_are_immutable(self):
+        config = agent_registry.AgentRegistry(self.path).get("lead-qa")
+        self.assertEqual(config.role, "Ты - 'lead-qa'.")
+        with self.assertRaises(AttributeError):
+            config.model = "gemini-pro"
+
+    def test_unknown_model_and_tool_are_reported_together(self):
+        self.write(VALID.replace("gemini-flash", "gpt-x").replace("run_all_tests", "run_everything"), mtime=1000)
+        with self.assertRaises(agent_registry.AgentConfigError) as ctx:
+            agent_registry.AgentRegistry(self.path)
+        self.assertEqual(len(ctx.exception.problems), 2)
+
+    def test_reloads_only_on_mtime_change(self):
+        registry = agent_registry.AgentRegistry(self.path)
+        with patch.object(agent_registry, "RELOAD_CHECK_INTERVAL", 0):
+            with patch("yaml.safe_load", wraps=agent_registry.yaml.safe_load) as load:
+                registry.get("lead-qa")
+                self.assertEqual(load.call_count, 0)
+                self.write(VALID.replace("gemini-flash", "gemini-pro"), mtime=2000)
+                self.assertEqual(registry.get("lead-qa").model, "gemini-pro")
+                self.assertEqual(load.call_count, 1)
+
+    def test_broken_edit_keeps_previous_version(self):
+        registry = agent_registry.AgentRegistry(self.path)
+        self.write(VALID.replace("gemini-flash", "unknown"), mtime=2000)
+        with patch.object(agent_registry, "RELOAD_CHECK_INTERVAL", 0):
+            self.assertEqual(registry.get("lead-qa").model, "gemini-flash")
+
+
+if __name__ == "__main__":
+    unittest.main()
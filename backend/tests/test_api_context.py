@@ -0,0 +1,48 @@
+import unittest
+from fastapi.testclient import TestClient
+from praisonai_core.tools import context_manager
+import main
+import os
+import tempfile
+import shutil
+
+
+class TestContextEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_api_project"
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, self.project_id), exist_ok=True)
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+        context_manager.write_state(self.project_id, {
+            "status": "in_progress",
+            "tasks": [{"id": "t1", "status": "pending", "description": "x" * 2000}],
+            "reports": [],
+        })
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        shutil.rmtree(self.temp_dir)
+
+    def test_etag_and_not_modified(self):
+        url = f"/projects/{self.project_id}/context"
+        response = self.client.get(url)
+        etag = response.headers["etag"]
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": etag}).status_code, 304)
+        context_manager.add_report(self.project_id, {"type": "user_feedback"})
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+
+    def test_fields_projection(self):
+        response = self.client.get(f"/projects/{self.project_id}/context?fields=status,tasks.status")
+        self.assertEqual(response.json(), {"status": "in_progress", "tasks": [{"status": "pending"}]})
+
+    def test_large_response_is_gzipped(self):
+        response = self.client.get(f"/projects/{self.project_id}/status", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers.get("content-encoding"), "gzip")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from praisonai_core.tools import context_manager, blob_store
+import os
+import tempfile
+import shutil
+
+
+class TestBlobStore(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_blob_project"
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, self.project_id), exist_ok=True)
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+
+    def tearDown(self):
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        shutil.rmtree(self.temp_dir)
+
+    def test_large_report_is_externalized(self):
+        content = '{"examples": [' + ', '.join('{"status": "passed"}' for _ in range(5000)) + ']}'
+        context_manager.add_report(self.project_id, {"type": "qa_functional", "content": content})
+        report = context_manager.read_state(self.project_id)['reports'][0]
+        self.assertIn('content_ref', report)
+        self.assertLess(len(report['content']), 1000)
+        self.assertEqual(blob_store.report_content(self.project_id, report), content)
+        self.assertEqual(b''.join(blob_store.iter_blob(self.project_id, report['content_ref']['sha256'])),
+                         content.encode('utf-8'))
+
+    def test_small_report_stays_inline(self):
+        context_manager.add_report(self.project_id, {"type": "user_feedback", "content": "мало"})
+        report = context_manager.read_state(self.project_id)['reports'][0]
+        self.assertNotIn('content_ref', report)
+        self.assertEqual(report['content'], "мало")
+
+    def test_identical_payloads_are_deduplicated(self):
+        data = b"x" * (blob_store.BLOB_THRESHOLD_BYTES + 1)
+        ref1 = blob_store.put_blob(self.project_id, data)
+        ref2 = blob_store.put_blob(self.project_id, data)
+        self.assertEqual(ref1, ref2)
+        blobs_dir = os.path.join(self.temp_dir, self.project_id, blob_store.BLOBS_DIR)
+        files = [f for _, _, names in os.walk(blobs_dir) for f in names]
+        self.assertEqual(len(files), 1)
+
+    def test_content_endpoint_honours_if_none_match(self):
+        from fastapi.testclient import TestClient
+        import main
+        context_manager.write_state(self.project_id, {"status": "init", "reports": []})
+        context_manager.add_report(self.project_id, {"type": "qa_functional",
+                                                     "content": "x" * (blob_store.BLOB_THRESHOLD_BYTES + 1)})
+        client = TestClient(main.app)
+        url = f"/projects/{self.project_id}/reports/0/content"
+        first = client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["etag"]
+        again = client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+        self.assertEqual(client.get(url, headers={"If-None-Match": '"other"'}).status_code, 200)
+
+    def test_rejects_invalid_blob_id(self):
+        with self.assertRaises(ValueError):
+            blob_store.read_blob(self.project_id, "../state.json")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+from praisonai_core.tools import code_analyzer, runner
+
+
+class CountingExecutor:
+    def __init__(self):
+        self.runs = 0
+
+    def run(self, project_path, command, bundle=True):
+        self.runs += 1
+        return subprocess.CompletedProcess(command, 0, stdout=f'{{"warnings": [], "run": {self.runs}}}', stderr="")
+
+
+class TestBrakemanCache(unittest.TestCase):
+    def setUp(self):
+        self.project_path = tempfile.mkdtemp()
+        self.write("app/models/post.rb", "class Post; end\n")
+        self.write("app/controllers/posts_controller.rb", "class PostsController; end\n")
+        self.write("Gemfile", "gem 'rails'\n")
+        self.executor = CountingExecutor()
+        runner.set_executor(self.executor)
+
+    def tearDown(self):
+        runner.set_executor(None)
+        shutil.rmtree(self.project_path)
+
+    def write(self, path, content):
+        full = os.path.join(self.project_path, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+
+    def test_unchanged_tree_returns_cached_result(self):
+        first = code_analyzer.run_brakeman(self.project_path)
+        # Изменения фронтенда и документации не влияют на аудит
+        self.write("app/javascript/application.js", "console.log(1)\n")
+        self.write("README.md", "docs\n")
+        self.assertEqual(code_analyzer.run_brakeman(self.project_path), first)
+        self.assertEqual(self.executor.runs, 1)
+
+    def test_ruby_change_reruns_brakeman(self):
+        code_analyzer.run_brakeman(self.project_path)
+        self.write("app/models/post.rb", "class Post; def x; end; end\n")
+        self.assertIn('"run": 2', code_analyzer.run_brakeman(self.project_path))
+        self.assertFalse(code_analyzer.run_brakeman(self.project_path, use_cache=False) is None)
+        self.assertEqual(self.executor.runs, 3)
+
+    def test_digest_uses_mtime_fast_path(self):
+        cache_dir = os.path.join(self.project_path, code_analyzer.CACHE_DIR_NAME)
+        digest = code_analyzer.tree_digest(self.project_path, cache_dir)
+        real_open = open
+        opened = []
+
+        def tracking_open(path, *args, **kwargs):
+            opened.append(str(path))
+            return real_open(path, *args, **kwargs)
+
+        with patch("builtins.open", side_effect=tracking_open):
+            self.assertEqual(code_analyzer.tree_digest(self.project_path, cache_dir), digest)
+        # Прочитан только индекс, файлы проекта не перечитывались
+        self.assertEqual([os.path.basename(p) for p in opened], [code_analyzer.INDEX_FILE])
+
+    def test_retention_is_bounded(self):
+        with patch.object(code_analyzer, "CACHE_KEEP_RESULTS", 2):
+            for i in range(4):
+                self.write("app/models/post.rb", f"class Post; V = {i}; end\n")
+                code_analyzer.run_brakeman(self.project_path)
+        entries = [n for n in os.listdir(os.path.join(self.project_path, code_analyzer.CACHE_DIR_NAME))
+                   if n != code_analyzer.INDEX_FILE]
+        self.assertEqual(len(entries), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -33,6 +33,14 @@ class TestContextManager(unittest.TestCase):
     def tearDown(self):
         shutil.rmtree(self.temp_dir)
 
+    def test_write_stats_count_writes_and_bytes(self):
+        context_manager.write_stats(reset=True)
+        context_manager.add_report(self.project_id, {"type": "qa_functional"})
+        stats = context_manager.write_stats(reset=True)
+        self.assertEqual(stats["writes"], 1)
+        self.assertEqual(stats["bytes"], os.path.getsize(self.state_path))
+        self.assertEqual(context_manager.write_stats(), {"writes": 0, "bytes": 0})
+
     def test_read_write_state(self):
         state = context_manager.read_state(self.project_id)
         self.assertEqual(state['status'], 'init')
@@ -101,6 +109,70 @@ class TestContextManager(unittest.TestCase):
         finally:
             teardown_test_project(temp_dir)
 
+    def test_read_state_returns_independent_copy(self):
+        state = context_manager.read_state(self.project_id)
+        state['status'] = 'mutated'
+        state['tasks'].append({"id": "t-x"})
+        state2 = context_manager.read_state(self.project_id)
+        self.assertEqual(state2['status'], 'init')
+        self.assertEqual(state2['tasks'], [])
+
+    def test_read_state_invalidated_by_external_write(self):
+        context_manager.read_state(self.project_id)
+        import json
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump({"status": "external_change", "tasks": [1, 2, 3]}, f)
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(state['status'], 'external_change')
+
+    def test_state_cache_lru_cap(self):
+        old_cap = context_manager.STATE_CACHE_MAX_PROJECTS
+        context_manager.STATE_CACHE_MAX_PROJECTS = 2
+        try:
+            context_manager.invalidate_state_cache()
+            for pid in ("p1", "p2", "p3"):
+                context_manager.write_state(pid, {"status": pid})
+            self.assertNotIn("p1", context_manager._state_cache)
+            self.assertEqual(context_manager.read_state("p1")['status'], "p1")
+        finally:
+            context_manager.STATE_CACHE_MAX_PROJECTS = old_cap
+
+    def test_state_transaction_commits_once(self):
+        with context_manager.state_transaction(self.project_id) as state:
+            state['status'] = 'in_progress'
+            context_manager.add_report(self.project_id, {"type": "qa_functional"})
+            context_manager.increment_iteration_count(self.project_id)
+            # До выхода из транзакции на диск ничего не записано
+            self.assertEqual(context_manager.read_state(self.project_id)['status'], 'init')
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(state['status'], 'in_progress')
+        self.assertEqual(len(state['reports']), 1)
+        self.assertEqual(state['iteration_count'], 1)
+
+    def test_state_transaction_rollback_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with context_manager.state_transaction(self.project_id) as state:
+                state['status'] = 'broken'
+                raise RuntimeError("boom")
+        self.assertEqual(context_manager.read_state(self.project_id)['status'], 'init')
+
+    def test_concurrent_mutations_are_not_lost(self):
+        import threading
+
+        def worker():
+            for _ in range(10):
+                context_manager.increment_iteration_count(self.project_id)
+                context_manager.add_llm_cost(self.project_id, 0.5)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(state['iteration_count'], 40)
+        self.assertEqual(state['current_llm_cost'], 20.0)
+
 def setup_test_project():
     temp_dir = tempfile.mkdtemp()
     project_id = "test_project"
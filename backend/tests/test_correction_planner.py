@@ -0,0 +1,163 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from praisonai_core import correction_planner
+from praisonai_core.dispatcher import Dispatcher
+from praisonai_core.tools import context_manager, report_parsers
+
+
+def rspec_output(failed):
+    return "Bundle complete!\n" + json.dumps({
+        "examples": [{"file_path": f"./{spec}", "status": "failed",
+                      "exception": {"backtrace": [f"/app/{source}:12:in `create'"]}} for spec, source in failed],
+        "summary": {"failure_count": len(failed)},
+    })
+
+
+class TestCorrectionPlanner(unittest.TestCase):
+    def test_targets_from_rspec_json(self):
+        files, specs = correction_planner.report_targets(
+            {}, rspec_output([("spec/models/post_spec.rb", "app/models/post.rb")]))
+        self.assertEqual(files, {"app/models/post.rb"})
+        self.assertEqual(specs, {"spec/models/post_spec.rb"})
+
+    def test_targets_from_brakeman_json(self):
+        content = json.dumps({"warnings": [{"file": "app/controllers/posts_controller.rb", "warning_type": "SQL"}]})
+        self.assertEqual(correction_planner.report_targets({}, content),
+                         ({"app/controllers/posts_controller.rb"}, set()))
+
+    def test_targets_and_summary_from_compact_details(self):
+        details = report_parsers.parse_rspec(rspec_output([("spec/models/post_spec.rb", "app/models/post.rb")]))
+        report = {"type": "qa_functional", "content": "1 examples, 1 failures", "details": details}
+        self.assertEqual(correction_planner.report_targets(report, report["content"]),
+                         ({"app/models/post.rb"}, {"spec/models/post_spec.rb"}))
+        groups = correction_planner.plan_corrections([(0, report)], [], lambda r: r["content"])
+        self.assertIn("spec/models/post_spec.rb", groups[0].summaries[0])
+
+    def test_groups_by_artifact_owner_and_dedupes(self):
+        tasks = [{"agent": "frontend-dev", "artifacts_produced": ["app/views/posts/index.html.erb"]},
+                 {"agent": "backend-dev", "artifacts_produced": ["app/models/post.rb"]}]
+        reports = [
+            (0, {"type": "qa_functional", "content": rspec_output([("spec/models/post_spec.rb", "app/models/post.rb")])}),
+            (1, {"type": "qa_functional", "content": rspec_output([("spec/models/post_spec.rb", "app/models/post.rb")])}),
+            (2, {"type": "security_audit", "files": ["app/views/posts/index.html.erb"]}),
+        ]
+        groups = {g.agent: g for g in correction_planner.plan_corrections(reports, tasks, lambda r: r.get("content", ""))}
+        self.assertEqual(set(groups), {"backend-dev", "frontend-dev"})
+        self.assertEqual(groups["backend-dev"].report_refs, [0, 1])
+        self.assertEqual(groups["backend-dev"].specs, {"spec/models/post_spec.rb"})
+        self.assertFalse(groups["backend-dev"].full_run)
+        self.assertTrue(groups["frontend-dev"].audit)
+
+    def test_unattributed_report_needs_full_run(self):
+        groups = correction_planner.plan_corrections(
+            [(0, {"type": "qa_functional", "content": "Something broke"})], [], lambda r: r["content"])
+        self.assertEqual(groups[0].agent, correction_planner.DEFAULT_OWNER)
+        self.assertTrue(groups[0].full_run)
+
+    def test_group_verified(self):
+        group = correction_planner.CorrectionGroup(agent="backend-dev", specs={"spec/models/post_spec.rb"})
+        self.assertTrue(correction_planner.group_verified(group, {"spec/other_spec.rb"}, None))
+        self.assertFalse(correction_planner.group_verified(group, {"spec/models/post_spec.rb"}, None))
+        self.assertFalse(correction_planner.group_verified(group, None, None))
+
+    def test_load_error_is_not_verified(self):
+        # Исправление сломало загрузку: 0 примеров, но ошибка вне примеров
+        output = json.dumps({"examples": [], "messages": ["An error occurred while loading ./spec/models/post_spec.rb"],
+                             "summary": {"example_count": 0, "failure_count": 0,
+                                         "errors_outside_of_examples_count": 1}})
+        self.assertIsNone(correction_planner.failed_specs(output))
+        failed = correction_planner.failed_specs(output)
+        for group in (correction_planner.CorrectionGroup(agent="backend-dev", specs={"spec/models/post_spec.rb"}),
+                      correction_planner.CorrectionGroup(agent="backend-dev", full_run=True)):
+            self.assertFalse(correction_planner.group_verified(group, failed, None))
+
+
+class TestCorrectionCycle(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_correction_project"
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, self.project_id, "spec", "models"), exist_ok=True)
+        open(os.path.join(self.temp_dir, self.project_id, "spec", "models", "post_spec.rb"), "w").close()
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+        context_manager.write_state(self.project_id, {
+            "status": "tests_failed",
+            "tasks": [{"id": "task-backend-dev", "agent": "backend-dev", "status": "done",
+                       "artifacts_produced": ["app/models/post.rb"]}],
+            "reports": [{"type": "qa_functional", "severity": "high",
+                         "content": rspec_output([("spec/models/post_spec.rb", "app/models/post.rb")])}],
+        })
+
+    def tearDown(self):
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        shutil.rmtree(self.temp_dir)
+
+    def run_cycle(self, rspec_result):
+        agents, spec_runs = [], []
+
+        def fake_llm(prompt, model, tools, task):
+            agents.append(task["agent"])
+            return "done", ""
+
+        def fake_run_specs(project_path, specs):
+            spec_runs.append(specs)
+            return rspec_result
+
+        with patch.object(Dispatcher, "_call_llm_agent", side_effect=fake_llm), \
+                patch("praisonai_core.tools.testing_runner.run_specs", side_effect=fake_run_specs), \
+                patch("praisonai_core.tools.code_analyzer.run_brakeman") as brakeman:
+            result = Dispatcher(self.project_id).handle_correction_cycle()
+        self.assertFalse(brakeman.called)
+        return result, agents, spec_runs
+
+    def test_resolves_only_after_verification(self):
+        result, agents, spec_runs = self.run_cycle(rspec_output([]))
+        self.assertEqual(agents, ["backend-dev"])
+        self.assertEqual(spec_runs, [["spec/models/post_spec.rb"]])
+        self.assertEqual(result["resolved"], [0])
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(state["reports"][0]["status"], "resolved")
+        self.assertEqual(state["status"], "tests_passed")
+
+    def test_skipped_selection_forces_full_verification(self):
+        state = context_manager.read_state(self.project_id)
+        state["reports"] = [{"type": "qa_functional", "severity": "high", "content": "Something broke"}]
+        context_manager.write_state(self.project_id, state)
+        calls = []
+
+        def fake_run_changed(project_path, tasks, full=False):
+            calls.append(full)
+            if not full:
+                return {"output": None, "mode": "skipped", "reason": "changed", "specs": []}
+            return {"output": rspec_output([("spec/models/post_spec.rb", "app/models/post.rb")]),
+                    "mode": "full", "reason": "forced", "specs": None}
+
+        with patch.object(Dispatcher, "_call_llm_agent", return_value=("done", "")), \
+                patch("praisonai_core.tools.testing_runner.run_changed_tests", side_effect=fake_run_changed):
+            result = Dispatcher(self.project_id).handle_correction_cycle()
+        self.assertEqual(calls, [False, True])
+        self.assertEqual(result["resolved"], [])
+        self.assertEqual(context_manager.read_state(self.project_id)["reports"][0]["status"], "open")
+
+    def test_load_error_keeps_report_open(self):
+        output = json.dumps({"examples": [], "summary": {"errors_outside_of_examples_count": 1}})
+        result, _, _ = self.run_cycle(output)
+        self.assertEqual(result["resolved"], [])
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(state["reports"][0]["status"], "open")
+        self.assertEqual(state["status"], "tests_failed")
+
+    def test_failed_verification_keeps_report_open(self):
+        result, _, _ = self.run_cycle(rspec_output([("spec/models/post_spec.rb", "app/models/post.rb")]))
+        self.assertEqual(result["open"], [0])
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(state["reports"][0]["status"], "open")
+        self.assertEqual(state["status"], "tests_failed")
+
+
+if __name__ == "__main__":
+    unittest.main()
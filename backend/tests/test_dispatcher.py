@@ -0,0 +1,229 @@
+import unittest
+from unittest.mock import patch
+from praisonai_core.tools import context_manager
+from praisonai_core.dispatcher import Dispatcher
+from praisonai_core.llm_client import LLMClient, set_client
+from praisonai_core.tools import pubsub
+from tests.llm_stub import LLMStubServer
+import os
+import time
+import tempfile
+import shutil
+
+
+class TestDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_dispatcher_project"
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, self.project_id), exist_ok=True)
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+        context_manager.write_state(self.project_id, {"status": "init", "tasks": [], "reports": []})
+
+    def tearDown(self):
+        set_client(None)
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        shutil.rmtree(self.temp_dir)
+
+    def test_run_agent_marks_task_done(self):
+        dispatcher = Dispatcher(self.project_id)
+        with dispatcher.transaction():
+            dispatcher._generate_initial_tasks()
+        with patch.object(Dispatcher, '_call_llm_agent', return_value=('done', '')):
+            dispatcher.run_agent('lead-qa')
+        state = context_manager.read_state(self.project_id)
+        task = next(t for t in state['tasks'] if t['agent'] == 'lead-qa')
+        self.assertEqual(task['status'], 'done')
+        self.assertEqual(state['last_agent'], 'lead-qa')
+
+    def test_run_agent_keeps_concurrent_reports(self):
+        dispatcher = Dispatcher(self.project_id)
+        with dispatcher.transaction():
+            dispatcher._generate_initial_tasks()
+
+        def fake_llm(*args):
+            # Другой запрос добавляет отчёт, пока агент работает
+            context_manager.add_report(self.project_id, {"type": "user_feedback"})
+            return 'done', ''
+
+        with patch.object(Dispatcher, '_call_llm_agent', side_effect=fake_llm):
+            dispatcher.run_agent('lead-qa')
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(len(state['reports']), 1)
+
+    def test_state_is_not_shared_between_threads(self):
+        import threading
+        dispatcher = Dispatcher(self.project_id)
+        with dispatcher.transaction() as state:
+            state['llm_cost_limit'] = 5.0
+        entered, release = threading.Event(), threading.Event()
+
+        def worker():
+            with dispatcher.transaction() as state:
+                state.clear()
+                entered.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        try:
+            entered.wait(5)
+            # Транзакция другого потока не видна, пока не завершена
+            self.assertEqual(dispatcher.state.get('llm_cost_limit'), 5.0)
+        finally:
+            release.set()
+            thread.join()
+
+    def test_run_workflow_runs_all_stages(self):
+        dispatcher = Dispatcher(self.project_id)
+        with patch.object(Dispatcher, '_call_llm_agent', return_value=('done', '')), \
+                patch('praisonai_core.tools.mcp_plane_exporter.export_docs_to_plane', return_value=''):
+            dispatcher.run_workflow()
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(state['status'], 'completed')
+        self.assertEqual({t['status'] for t in state['tasks']}, {'done'})
+
+    def test_plane_export_skipped_without_token(self):
+        with patch.object(Dispatcher, '_call_llm_agent', return_value=('done', '')), \
+                patch('praisonai_core.dispatcher.PLANE_API_TOKEN', ''), \
+                patch('praisonai_core.tools.mcp_plane_exporter.export_docs_to_plane') as export:
+            Dispatcher(self.project_id).run_workflow()
+        self.assertFalse(export.called)
+        with patch.object(Dispatcher, '_call_llm_agent', return_value=('done', '')), \
+                patch('praisonai_core.dispatcher.PLANE_API_TOKEN', 'token'), \
+                patch('praisonai_core.tools.mcp_plane_exporter.export_docs_to_plane', return_value='') as export:
+            Dispatcher(self.project_id).run_workflow()
+        self.assertEqual(export.call_args[0][2], 'token')
+
+    def test_failed_stage_skips_dependents(self):
+        dispatcher = Dispatcher(self.project_id)
+
+        def fake_llm(prompt, model, tools, task):
+            return ('failed', '') if task['agent'] == 'backend-dev' else ('done', '')
+
+        with patch.object(Dispatcher, '_call_llm_agent', side_effect=fake_llm):
+            with dispatcher.transaction():
+                dispatcher._generate_initial_tasks()
+            results = dispatcher.run_scheduled_tasks()
+        self.assertEqual(results['task-backend-dev'], 'failed')
+        self.assertEqual(results['task-frontend-dev'], 'done')
+        self.assertEqual(results['task-lead-qa'], 'skipped')
+
+    def project_file(self, name):
+        return os.path.join(self.temp_dir, self.project_id, name)
+
+    def test_streamed_artifact_is_renamed_on_completion(self):
+        dispatcher = Dispatcher(self.project_id)
+        with dispatcher.transaction():
+            dispatcher._generate_initial_tasks()
+        events = [{"delta": "# DESIGN\n"}, {"delta": "Экраны"}, {"done": True, "usage": {"cost": 0.02}}]
+        subscription = pubsub.subscribe(self.project_id)
+        try:
+            with LLMStubServer([(200, events, {})]) as stub:
+                set_client(LLMClient(url=stub.url))
+                self.assertEqual(dispatcher.run_agent('uiux'), 'done')
+            types = []
+            while True:
+                event = subscription.get(timeout=0)
+                if event is None:
+                    break
+                types.append(event["type"])
+        finally:
+            subscription.close()
+        with open(self.project_file('DESIGN.md'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), "# DESIGN\nЭкраны")
+        self.assertFalse(os.path.exists(self.project_file('DESIGN.md.partial')))
+        self.assertIn('artifact_progress', types)
+        self.assertIn('artifact_completed', types)
+
+    def test_truncated_stream_keeps_partial_output(self):
+        dispatcher = Dispatcher(self.project_id)
+        with dispatcher.transaction():
+            dispatcher._generate_initial_tasks()
+        with LLMStubServer([(200, [{"delta": "## ADR-1: Devise"}], {})]) as stub:
+            set_client(LLMClient(url=stub.url))
+            self.assertEqual(dispatcher.run_agent('solution-architect'), 'failed')
+        with open(self.project_file('adr_log.md.partial'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), "## ADR-1: Devise")
+        self.assertFalse(os.path.exists(self.project_file('adr_log.md')))
+
+    def test_cost_limit_blocks_call_before_request(self):
+        with context_manager.state_transaction(self.project_id) as state:
+            state['llm_cost_limit'] = 0.0
+        dispatcher = Dispatcher(self.project_id)
+        with dispatcher.transaction():
+            dispatcher._generate_initial_tasks()
+        with LLMStubServer() as stub:
+            set_client(LLMClient(url=stub.url))
+            self.assertEqual(dispatcher.run_agent('lead-qa'), 'failed')
+        self.assertEqual(stub.requests, [])
+        self.assertEqual(context_manager.read_status(self.project_id), 'llm_cost_limit_exceeded')
+
+    def test_resume_skips_done_and_recovers_stale_tasks(self):
+        dispatcher = Dispatcher(self.project_id)
+        with dispatcher.transaction():
+            dispatcher._generate_initial_tasks()
+            dispatcher.state['tasks'].append({'id': 'fix-1', 'agent': 'auto-fixer', 'description': 'fix',
+                                              'status': 'done', 'dependencies': []})
+            for task in dispatcher.state['tasks']:
+                if task['agent'] in ('uiux', 'project-manager'):
+                    task['status'] = 'done'
+                elif task['agent'] == 'solution-architect':
+                    # Воркер упал посреди задачи: heartbeat давно не обновлялся
+                    task.update(status='in_progress', lease_owner='other-host:1', heartbeat_at=0)
+                elif task['agent'] == 'frontend-dev':
+                    task.update(status='in_progress', lease_owner='other-host:1', heartbeat_at=time.time())
+        calls = []
+
+        def fake_llm(prompt, model, tools, task):
+            calls.append(task['agent'])
+            return 'done', ''
+
+        with patch.object(Dispatcher, '_call_llm_agent', side_effect=fake_llm), \
+                patch('praisonai_core.tools.mcp_plane_exporter.export_docs_to_plane', return_value=''):
+            checkpoint = Dispatcher(self.project_id).resume_workflow()
+        self.assertEqual(checkpoint['recovered'], ['task-solution-architect'])
+        self.assertNotIn('uiux', calls)
+        self.assertNotIn('frontend-dev', calls)
+        self.assertIn('solution-architect', calls)
+        state = context_manager.read_state(self.project_id)
+        self.assertIn('fix-1', [t['id'] for t in state['tasks']])
+        # frontend-dev ещё занят живым воркером — проект не завершён
+        self.assertEqual(state['status'], 'in_progress')
+
+    def test_tasks_without_id_are_migrated(self):
+        context_manager.write_state(self.project_id, {"status": "in_progress", "reports": [], "tasks": [
+            {'agent': 'uiux', 'description': 'old', 'status': 'done'},
+            {'agent': 'backend-dev', 'description': 'old', 'status': 'pending'},
+        ]})
+        with patch.object(Dispatcher, '_call_llm_agent', return_value=('done', '')):
+            Dispatcher(self.project_id).run_workflow()
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(state['status'], 'completed')
+        ids = [t['id'] for t in state['tasks']]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(ids.count('task-uiux'), 1)
+        backend = next(t for t in state['tasks'] if t['id'] == 'task-backend-dev')
+        self.assertEqual((backend['description'], backend['dependencies']), ('old', ['task-database-architect']))
+
+    def test_heartbeat_extends_lease(self):
+        dispatcher = Dispatcher(self.project_id)
+        with dispatcher.transaction():
+            dispatcher._generate_initial_tasks()
+
+        def slow_llm(prompt, model, tools, task):
+            time.sleep(0.1)
+            state = context_manager.read_state(self.project_id)
+            return 'done', str(next(t for t in state['tasks'] if t['agent'] == 'lead-qa')['heartbeat_at'])
+
+        outputs = []
+        with patch.object(Dispatcher, 'HEARTBEAT_INTERVAL', 0.02), \
+                patch.object(Dispatcher, '_call_llm_agent', side_effect=slow_llm), \
+                patch.object(Dispatcher, '_handle_agent_output', side_effect=lambda a, t, o: outputs.append(o)):
+            started = time.time()
+            dispatcher.run_agent('lead-qa')
+        self.assertGreater(float(outputs[0]), started + 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
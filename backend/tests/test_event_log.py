@@ -0,0 +1,96 @@
+import unittest
+from praisonai_core.tools import context_manager, event_log
+import os
+import tempfile
+import shutil
+
+
+class TestEventLogDiff(unittest.TestCase):
+    def test_diff_and_apply_roundtrip(self):
+        old = {"status": "init", "tasks": [{"id": "t1", "status": "pending"}], "reports": [], "tmp": 1}
+        new = {"status": "in_progress", "tasks": [{"id": "t1", "status": "done"}],
+               "reports": [{"type": "qa_functional"}], "iteration_count": 1}
+        ops = event_log.diff_state(old, new)
+        self.assertIn({'op': 'append', 'path': ['reports'], 'values': [{"type": "qa_functional"}]}, ops)
+        self.assertIn({'op': 'set', 'path': ['tasks', 0, 'status'], 'value': 'done'}, ops)
+        self.assertEqual(event_log.apply_ops(context_manager._copy_json(old), ops), new)
+
+    def test_no_ops_for_equal_states(self):
+        state = {"status": "init", "tasks": [1, 2]}
+        self.assertEqual(event_log.diff_state(state, {"status": "init", "tasks": [1, 2]}), [])
+
+
+class TestEventLogBackend(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_event_project"
+        self.temp_dir = tempfile.mkdtemp()
+        self.project_path = os.path.join(self.temp_dir, self.project_id)
+        os.makedirs(self.project_path, exist_ok=True)
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        self.old_backend = context_manager.STATE_BACKEND
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+        context_manager.STATE_BACKEND = 'events'
+        with open(os.path.join(self.project_path, 'state.json'), 'w', encoding='utf-8') as f:
+            f.write('{"status": "init", "tasks": [], "reports": []}')
+
+    def tearDown(self):
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        context_manager.STATE_BACKEND = self.old_backend
+        shutil.rmtree(self.temp_dir)
+
+    def test_append_cost_is_proportional_to_report(self):
+        events_path = os.path.join(self.project_path, event_log.EVENTS_FILE)
+        for i in range(20):
+            context_manager.add_report(self.project_id, {"type": "qa_functional", "content": "x" * 1000})
+        size_before = os.path.getsize(events_path)
+        context_manager.add_report(self.project_id, {"type": "qa_functional", "content": "y" * 1000})
+        self.assertLess(os.path.getsize(events_path) - size_before, 1500)
+
+    def test_state_rebuilt_from_log_and_snapshot(self):
+        context_manager.add_report(self.project_id, {"type": "qa_functional"})
+        context_manager.update_task_status(self.project_id, "missing", "done")
+        context_manager.increment_iteration_count(self.project_id)
+        context_manager.compact_state_log(self.project_id)
+        self.assertTrue(os.path.exists(os.path.join(self.project_path, event_log.SNAPSHOT_FILE)))
+        context_manager.add_llm_cost(self.project_id, 1.5)
+        context_manager.invalidate_state_cache()
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(len(state['reports']), 1)
+        self.assertEqual(state['iteration_count'], 1)
+        self.assertEqual(state['current_llm_cost'], 1.5)
+
+    def test_save_after_torn_line_keeps_new_event(self):
+        events_path = os.path.join(self.project_path, event_log.EVENTS_FILE)
+        event_log.save(self.project_path, {"status": "init", "tasks": []}, None)
+        event_log.save(self.project_path, {"status": "in_progress", "tasks": []}, {"status": "init", "tasks": []})
+        # Сбой во время записи: последняя строка без перевода строки
+        with open(events_path, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 3, "ts": "2024-01-01T00:00:00Z", "ops": [{"op": "set", "pa')
+        previous = event_log.load(self.project_path)
+        self.assertEqual(previous, {"status": "in_progress", "tasks": []})
+        event_log.save(self.project_path, {"status": "completed", "tasks": [1]}, previous)
+        event_log.save(self.project_path, {"status": "completed", "tasks": [1, 2]}, {"status": "completed", "tasks": [1]})
+        self.assertEqual(event_log.load(self.project_path), {"status": "completed", "tasks": [1, 2]})
+        with open(events_path, 'rb') as f:
+            self.assertTrue(f.read().endswith(b'\n'))
+
+    def test_background_compaction_after_threshold(self):
+        old_threshold = event_log.COMPACT_THRESHOLD
+        event_log.COMPACT_THRESHOLD = 5
+        try:
+            for _ in range(5):
+                context_manager.increment_iteration_count(self.project_id)
+            import time
+            deadline = time.time() + 5
+            snapshot_path = os.path.join(self.project_path, event_log.SNAPSHOT_FILE)
+            while not os.path.exists(snapshot_path) and time.time() < deadline:
+                time.sleep(0.01)
+            context_manager.invalidate_state_cache()
+            self.assertEqual(context_manager.read_state(self.project_id)['iteration_count'], 5)
+            self.assertTrue(os.path.exists(snapshot_path))
+        finally:
+            event_log.COMPACT_THRESHOLD = old_threshold
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from praisonai_core import jobs
+from praisonai_core.tools import context_manager
+import main
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.queue = jobs.JobQueue(self.temp_dir, max_workers=2)
+
+    def tearDown(self):
+        self.queue.shutdown()
+        shutil.rmtree(self.temp_dir)
+
+    def test_submit_returns_immediately_and_records_result(self):
+        release = threading.Event()
+
+        def work(value):
+            release.wait(5)
+            return {"value": value}
+
+        job = self.queue.submit("run", work, 42, project_id="p1")
+        self.assertEqual(job["status"], "queued")
+        self.assertIn(self.queue.get(job["id"])["status"], ("queued", "running"))
+        release.set()
+        done = self.queue.wait(job["id"], timeout=5)
+        self.assertEqual(done["status"], "done")
+        self.assertEqual(done["result"], {"value": 42})
+        self.assertIsNotNone(done["duration_seconds"])
+        with open(os.path.join(self.temp_dir, f"{job['id']}.json"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["status"], "done")
+
+    def test_failed_job_keeps_error(self):
+        def work():
+            raise RuntimeError("docker недоступен")
+
+        job = self.queue.wait(self.queue.submit("run_tests", work)["id"], timeout=5)
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("docker недоступен", job["error"])
+
+    def test_completion_save_error_does_not_kill_worker(self):
+        job = self.queue.submit("run", lambda: {"ok": True})
+        self.queue.wait(job["id"], timeout=5)
+        real_save = self.queue._save
+
+        def failing_save(record):
+            if record["status"] in jobs.FINISHED_STATUSES:
+                raise OSError(28, "No space left on device")
+            real_save(record)
+
+        with patch.object(self.queue, "_save", side_effect=failing_save):
+            job = self.queue.wait(self.queue.submit("run", lambda: {"ok": True})["id"], timeout=5)
+            self.assertEqual(job["status"], "done")
+            self.assertIn(job["id"], self.queue._finished)
+            # Пул продолжает выполнять задания
+            self.assertEqual(self.queue.wait(self.queue.submit("run", lambda: 1)["id"], timeout=5)["status"], "done")
+        self.assertEqual([n for n in os.listdir(self.temp_dir) if n.endswith(".tmp")], [])
+
+    def test_pool_is_bounded(self):
+        lock = threading.Lock()
+        active, peak = [0], [0]
+        release = threading.Event()
+
+        def work():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            release.wait(5)
+            with lock:
+                active[0] -= 1
+
+        ids = [self.queue.submit("run", work)["id"] for _ in range(5)]
+        release.set()
+        for job_id in ids:
+            self.queue.wait(job_id, timeout=5)
+        self.assertEqual(peak[0], 2)
+
+    def test_unfinished_jobs_fail_after_restart(self):
+        with open(os.path.join(self.temp_dir, "abc123.json"), "w", encoding="utf-8") as f:
+            json.dump({"id": "abc123", "kind": "run", "status": "running"}, f)
+        restarted = jobs.JobQueue(self.temp_dir, max_workers=1)
+        try:
+            self.assertEqual(restarted.get("abc123")["status"], "failed")
+            self.assertIsNone(restarted.get("../state"))
+        finally:
+            restarted.shutdown()
+
+
+class TestJobEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_jobs_project"
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, self.project_id), exist_ok=True)
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+        context_manager.write_state(self.project_id, {"status": "in_progress", "tasks": [], "reports": []})
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        jobs.get_queue(self.temp_dir).shutdown()
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        shutil.rmtree(self.temp_dir)
+
+    def test_feedback_returns_job(self):
+        response = self.client.post(f"/projects/{self.project_id}/feedback", json={"feedback": "Добавить поле phone"})
+        job_id = response.json()["job_id"]
+        jobs.get_queue(self.temp_dir).wait(job_id, timeout=5)
+        job = self.client.get(f"/jobs/{job_id}").json()
+        self.assertEqual((job["kind"], job["status"], job["project_id"]), ("feedback", "done", self.project_id))
+        self.assertEqual(self.client.get("/jobs/missing").status_code, 404)
+
+    def test_run_unknown_project_is_404(self):
+        self.assertEqual(self.client.post("/projects/missing_project/run").status_code, 404)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "missing_project")))
+
+    def test_second_workflow_run_is_rejected(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_workflow(project_id):
+            started.set()
+            release.wait(5)
+            return {"status": "completed"}
+
+        with patch.object(main, "_run_workflow", slow_workflow):
+            first = self.client.post(f"/projects/{self.project_id}/run")
+            started.wait(5)
+            second = self.client.post(f"/projects/{self.project_id}/resume")
+            release.set()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 409)
+        self.assertIn(first.json()["job_id"], second.json()["detail"])
+        jobs.get_queue(self.temp_dir).wait(first.json()["job_id"], timeout=5)
+        self.assertEqual(self.client.post(f"/projects/{self.project_id}/resume").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
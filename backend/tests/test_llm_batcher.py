@@ -0,0 +1,50 @@
+import threading
+import unittest
+from praisonai_core.llm_batcher import LLMBatcher
+from praisonai_core.llm_client import LLMClient
+from tests.llm_stub import LLMStubServer
+
+OK = (200, {"result": "ok", "usage": {"cost": 0.01}}, {})
+
+
+class TestLLMBatcher(unittest.TestCase):
+    def run_parallel(self, batcher, count, model="gemini-flash"):
+        results = [None] * count
+
+        def call(i):
+            results[i] = batcher.generate(model, "role", f"task {i}")
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_concurrent_calls_share_one_request(self):
+        with LLMStubServer([OK]) as stub:
+            batcher = LLMBatcher(LLMClient(url=stub.url), window=0.2, max_batch=4)
+            results = self.run_parallel(batcher, 4)
+        self.assertEqual(len(stub.requests), 1)
+        self.assertEqual(len(stub.requests[0]["payload"]["batch"]), 4)
+        self.assertEqual(results, [{"result": "ok", "usage": {"cost": 0.01}}] * 4)
+        self.assertEqual(batcher.stats()["calls_per_request"], 4.0)
+
+    def test_falls_back_to_single_calls(self):
+        with LLMStubServer([OK], batch_support=False) as stub:
+            batcher = LLMBatcher(LLMClient(url=stub.url, max_retries=0), window=0.2, max_batch=3)
+            results = self.run_parallel(batcher, 3)
+        self.assertEqual([r["result"] for r in results], ["ok"] * 3)
+        self.assertEqual(len(stub.requests), 4)
+        self.assertEqual(batcher.stats()["fallbacks"], 3)
+
+    def test_other_models_are_not_batched(self):
+        with LLMStubServer([OK]) as stub:
+            batcher = LLMBatcher(LLMClient(url=stub.url), window=0.2)
+            self.run_parallel(batcher, 3, model="gemini-pro")
+        self.assertEqual(len(stub.requests), 3)
+        self.assertTrue(all("batch" not in r["payload"] for r in stub.requests))
+
+
+if __name__ == "__main__":
+    unittest.main()
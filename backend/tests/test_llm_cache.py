@@ -0,0 +1,147 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from praisonai_core import llm_cache
+from praisonai_core.dispatcher import Dispatcher
+from praisonai_core.llm_client import LLMClient, set_client
+from praisonai_core.tools import context_manager
+from tests.llm_stub import LLMStubServer
+import main
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_key_depends_on_all_parts(self):
+        base = llm_cache.make_key("gemini-pro", "role", "task", "ctx")
+        self.assertEqual(base, llm_cache.make_key("gemini-pro", "role", "task", "ctx"))
+        self.assertNotEqual(base, llm_cache.make_key("gemini-flash", "role", "task", "ctx"))
+        self.assertNotEqual(base, llm_cache.make_key("gemini-pro", "role", "task", "ctx2"))
+
+    def test_disk_tier_survives_new_instance(self):
+        cache = llm_cache.LLMResponseCache(self.temp_dir)
+        cache.put("ab" * 32, {"result": "ok"})
+        self.assertEqual(cache.get("ab" * 32), {"result": "ok"})
+        fresh = llm_cache.LLMResponseCache(self.temp_dir)
+        self.assertEqual(fresh.get("ab" * 32), {"result": "ok"})
+        self.assertIsNone(fresh.get("cd" * 32))
+        stats = fresh.stats()
+        self.assertEqual((stats["disk_hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_ttl_expires_entries(self):
+        cache = llm_cache.LLMResponseCache(self.temp_dir, ttl_seconds=60)
+        cache.put("ab" * 32, {"result": "ok"})
+        cache._memory["ab" * 32]["created_at"] -= 120
+        path = cache._path("ab" * 32)
+        old = time.time() - 120
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"created_at": %f, "response": {"result": "ok"}}' % old)
+        self.assertIsNone(cache.get("ab" * 32))
+        self.assertFalse(os.path.exists(path))
+
+    def test_size_cap_evicts_oldest(self):
+        cache = llm_cache.LLMResponseCache(self.temp_dir, memory_max_entries=1, max_bytes=2000)
+        keys = [f"{i:02d}" * 32 for i in range(10)]
+        for i, key in enumerate(keys):
+            cache.put(key, {"result": "x" * 300})
+            os.utime(cache._path(key), (1000 + i, 1000 + i))
+        self.assertLessEqual(cache._scan_size(), 2000)
+        self.assertGreater(cache.stats()["evictions"], 0)
+        self.assertIsNotNone(cache.get(keys[-1]))
+        self.assertIsNone(llm_cache.LLMResponseCache(self.temp_dir).get(keys[0]))
+
+    def test_disk_write_error_keeps_memory_entry(self):
+        cache = llm_cache.LLMResponseCache(self.temp_dir)
+        with patch("praisonai_core.llm_cache.tempfile.mkstemp", side_effect=OSError(28, "No space left on device")):
+            cache.put("ab" * 32, {"result": "ok"})
+        self.assertEqual(cache.get("ab" * 32), {"result": "ok"})
+        self.assertIsNone(llm_cache.LLMResponseCache(self.temp_dir).get("ab" * 32))
+
+
+class TestDispatcherLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_llm_cache_project"
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, self.project_id), exist_ok=True)
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+        context_manager.write_state(self.project_id, {"status": "init", "tasks": [], "reports": []})
+
+    def tearDown(self):
+        set_client(None)
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        shutil.rmtree(self.temp_dir)
+
+    def call_twice(self):
+        dispatcher = Dispatcher(self.project_id)
+        task = {"description": "Запустить тесты"}
+        first = dispatcher._call_llm_agent("role", "gemini-flash", [], task)
+        second = dispatcher._call_llm_agent("role", "gemini-flash", [], task)
+        return first, second
+
+    def test_repeat_call_is_free(self):
+        with LLMStubServer([(200, {"result": "ok", "usage": {"cost": 0.5}}, {})]) as stub:
+            set_client(LLMClient(url=stub.url))
+            first, second = self.call_twice()
+        self.assertEqual(first, second)
+        self.assertEqual(len(stub.requests), 1)
+        state = context_manager.read_state(self.project_id)
+        self.assertAlmostEqual(state["current_llm_cost"], 0.5)
+        self.assertEqual(state["llm_cache"]["hits"], 1)
+        self.assertAlmostEqual(state["llm_cache"]["saved_cost"], 0.5)
+
+    def test_cache_write_error_keeps_cost(self):
+        cache_dir, mkstemp = llm_cache.get_cache().directory, tempfile.mkstemp
+
+        def failing_mkstemp(*args, **kwargs):
+            # Отказ записи только в папке кэша (state.json пишется как обычно)
+            if str(kwargs.get("dir", "")).startswith(cache_dir):
+                raise OSError(13, "Permission denied")
+            return mkstemp(*args, **kwargs)
+
+        with LLMStubServer([(200, {"result": "ok", "usage": {"cost": 0.5}}, {})]) as stub, \
+                patch("praisonai_core.llm_cache.tempfile.mkstemp", side_effect=failing_mkstemp):
+            set_client(LLMClient(url=stub.url))
+            result = Dispatcher(self.project_id)._call_llm_agent("role", "gemini-flash", [], {"description": "x"})
+        self.assertEqual(result, ("done", "ok"))
+        self.assertAlmostEqual(context_manager.read_state(self.project_id)["current_llm_cost"], 0.5)
+
+    def test_project_opt_out(self):
+        with context_manager.state_transaction(self.project_id) as state:
+            state["llm_cache_enabled"] = False
+        with LLMStubServer() as stub:
+            set_client(LLMClient(url=stub.url))
+            self.call_twice()
+        self.assertEqual(len(stub.requests), 2)
+        self.assertNotIn("llm_cache", context_manager.read_state(self.project_id))
+
+    def test_opt_out_endpoint(self):
+        client = TestClient(main.app)
+        response = client.put(f"/projects/{self.project_id}/llm_cache", json={"enabled": False})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(context_manager.read_state(self.project_id)["llm_cache_enabled"])
+        self.assertEqual(client.put("/projects/missing_project/llm_cache", json={"enabled": False}).status_code, 404)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "missing_project")))
+
+    def test_context_change_misses(self):
+        with LLMStubServer() as stub:
+            set_client(LLMClient(url=stub.url))
+            dispatcher = Dispatcher(self.project_id)
+            task = {"description": "Реализовать backend-логику"}
+            dispatcher._call_llm_agent("role", "gemini-pro", [], task)
+            with open(os.path.join(self.temp_dir, self.project_id, "specification.md"), "w", encoding="utf-8") as f:
+                f.write("# Новая спецификация")
+            dispatcher._call_llm_agent("role", "gemini-pro", [], task)
+        self.assertEqual(len(stub.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
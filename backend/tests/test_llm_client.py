@@ -0,0 +1,92 @@
+import unittest
+import threading
+from praisonai_core.llm_client import LLMClient, LLMError
+from tests.llm_stub import LLMStubServer
+
+OK = (200, {"result": "готово", "usage": {"cost": 0.02}}, {})
+
+
+class TestLLMClient(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+
+    def make_client(self, url, **kwargs):
+        return LLMClient(url=url, sleep=self.sleeps.append, **kwargs)
+
+    def test_retries_transient_errors(self):
+        with LLMStubServer([(503, {"error": "busy"}, {}), (500, {}, {}), OK]) as stub:
+            data = self.make_client(stub.url).generate("gemini-flash", "role", "task")
+        self.assertEqual(data["result"], "готово")
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertEqual(stub.requests[0]["payload"], {"model": "gemini-flash", "prompt": "role", "task": "task"})
+
+    def test_honours_retry_after(self):
+        with LLMStubServer([(429, {}, {"Retry-After": "3"}), OK]) as stub:
+            self.make_client(stub.url).generate("gemini-pro", "role", "task")
+        self.assertEqual(self.sleeps, [3.0])
+
+    def test_gives_up_after_max_retries(self):
+        with LLMStubServer([(503, {}, {})]) as stub:
+            with self.assertRaises(LLMError) as ctx:
+                self.make_client(stub.url, max_retries=2).generate("gemini-flash", "role", "task")
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(len(stub.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        with LLMStubServer([(400, {"error": "bad"}, {})]) as stub:
+            with self.assertRaises(LLMError):
+                self.make_client(stub.url).generate("gemini-flash", "role", "task")
+        self.assertEqual(len(stub.requests), 1)
+
+    def test_caps_in_flight_requests_per_model(self):
+        with LLMStubServer([OK], delay=0.05) as stub:
+            client = self.make_client(stub.url, max_in_flight={"gemini-pro": 2})
+            threads = [threading.Thread(target=client.generate, args=("gemini-pro", "r", str(i))) for i in range(6)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(len(stub.requests), 6)
+        self.assertLessEqual(stub.max_active, 2)
+
+    def test_slot_is_released_during_backoff(self):
+        free_during_sleep = []
+
+        def sleep(delay):
+            slot = client._slot("gemini-pro")
+            free_during_sleep.append(slot.acquire(blocking=False))
+            slot.release()
+
+        with LLMStubServer([(429, {}, {"Retry-After": "3"}), OK]) as stub:
+            client = LLMClient(url=stub.url, sleep=sleep, max_in_flight={"gemini-pro": 1})
+            client.generate("gemini-pro", "role", "task")
+        self.assertEqual(free_during_sleep, [True])
+
+    def test_stream_holds_slot_until_body_is_read(self):
+        events = [{"delta": "a"}, {"delta": "b"}, {"done": True, "usage": {}}]
+        with LLMStubServer([(200, events, {})]) as stub:
+            client = self.make_client(stub.url, max_in_flight={"gemini-flash": 1})
+            slot = client._slot("gemini-flash")
+            received = client.stream("gemini-flash", "role", "task")
+            self.assertEqual(next(received), events[0])
+            self.assertFalse(slot.acquire(blocking=False))
+            self.assertEqual(list(received), events[1:])
+            self.assertTrue(slot.acquire(blocking=False))
+            slot.release()
+
+    def test_stream_yields_ndjson_events(self):
+        events = [{"delta": "# Диз"}, {"delta": "айн"}, {"done": True, "usage": {"cost": 0.03}}]
+        with LLMStubServer([(200, events, {})]) as stub:
+            received = list(self.make_client(stub.url).stream("gemini-flash", "role", "task"))
+        self.assertEqual(received, events)
+        self.assertTrue(stub.requests[0]["payload"]["stream"])
+
+    def test_stream_falls_back_to_plain_json(self):
+        with LLMStubServer([OK]) as stub:
+            received = list(self.make_client(stub.url).stream("gemini-flash", "role", "task"))
+        self.assertEqual(received, [{"delta": "готово", "usage": {"cost": 0.02}, "done": True}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import unittest
+from praisonai_core.tools import context_manager, project_registry
+import tempfile
+import shutil
+
+
+class TestProjectRegistry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+
+    def tearDown(self):
+        project_registry.close_connections()
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        shutil.rmtree(self.temp_dir)
+
+    def test_write_state_updates_registry(self):
+        context_manager.write_state("p1", {"status": "init", "tasks": [], "reports": []})
+        context_manager.add_report("p1", {"type": "qa_functional"})
+        context_manager.add_llm_cost("p1", 1.25)
+        summary = project_registry.get_project(self.temp_dir, "p1")
+        self.assertEqual(summary["report_count"], 1)
+        self.assertEqual(summary["current_llm_cost"], 1.25)
+
+    def test_filter_sort_and_paginate(self):
+        for i in range(5):
+            context_manager.write_state(f"p{i}", {"status": "completed" if i % 2 else "in_progress",
+                                                  "current_llm_cost": float(i)})
+        page, cursor = project_registry.list_projects(self.temp_dir, sort="current_llm_cost", order="asc", limit=2)
+        self.assertEqual([p["id"] for p in page], ["p0", "p1"])
+        page, cursor = project_registry.list_projects(self.temp_dir, sort="current_llm_cost", order="asc",
+                                                      limit=2, cursor=cursor)
+        self.assertEqual([p["id"] for p in page], ["p2", "p3"])
+        page, cursor = project_registry.list_projects(self.temp_dir, status="completed", sort="id", order="desc")
+        self.assertEqual([p["id"] for p in page], ["p3", "p1"])
+        self.assertIsNone(cursor)
+
+    def test_rebuild_skips_service_dirs(self):
+        context_manager.write_state("p1", {"status": "completed"})
+        for name in (".jobs", ".llm_cache", "not_a_project"):
+            os.makedirs(os.path.join(self.temp_dir, name))
+        project_registry.close_connections()
+        os.remove(os.path.join(self.temp_dir, project_registry.DB_FILE))
+        self.assertEqual(project_registry.rebuild(self.temp_dir), 1)
+        page, _ = project_registry.list_projects(self.temp_dir)
+        self.assertEqual([p["id"] for p in page], ["p1"])
+
+    def test_write_after_other_worker_changed_row(self):
+        state = {"status": "in_progress", "tasks": []}
+        project_registry.record_project(self.temp_dir, "p1", state)
+        # Другой воркер записал другую сводку
+        other = sqlite3.connect(os.path.join(self.temp_dir, project_registry.DB_FILE))
+        other.execute("UPDATE projects SET status = 'completed' WHERE id = 'p1'")
+        other.commit()
+        other.close()
+        project_registry.record_project(self.temp_dir, "p1", state)
+        self.assertEqual(project_registry.get_project(self.temp_dir, "p1")["status"], "in_progress")
+
+    def test_rejects_unknown_sort_field(self):
+        with self.assertRaises(ValueError):
+            project_registry.list_projects(self.temp_dir, sort="core_mandate")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import asyncio
+from praisonai_core.tools import context_manager, pubsub
+import os
+import tempfile
+import shutil
+
+
+class TestPubSub(unittest.TestCase):
+    def test_drop_oldest_when_queue_is_full(self):
+        subscription = pubsub.subscribe("topic-drop", maxsize=2)
+        try:
+            for i in range(3):
+                pubsub.publish("topic-drop", {"type": "e", "n": i})
+            self.assertEqual(subscription.dropped, 1)
+            self.assertEqual(subscription.get(0)["n"], 1)
+            self.assertEqual(subscription.get(0)["n"], 2)
+            self.assertIsNone(subscription.get(0))
+        finally:
+            subscription.close()
+        self.assertFalse(pubsub.has_subscribers("topic-drop"))
+
+    def test_get_async_wakes_up_on_publish(self):
+        subscription = pubsub.subscribe("topic-async")
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, lambda: pubsub.publish("topic-async", {"type": "e"}))
+            return await subscription.get_async(timeout=2)
+
+        try:
+            self.assertEqual(asyncio.run(run())["type"], "e")
+        finally:
+            subscription.close()
+
+
+class TestStatePublishing(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_pubsub_project"
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, self.project_id), exist_ok=True)
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+        context_manager.write_state(self.project_id, {"status": "init", "tasks": [], "reports": []})
+
+    def tearDown(self):
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        shutil.rmtree(self.temp_dir)
+
+    def test_write_publishes_incremental_diff(self):
+        subscription = pubsub.subscribe(self.project_id)
+        try:
+            context_manager.add_report(self.project_id, {"type": "qa_functional"})
+            context_manager.add_llm_cost(self.project_id, 0.25)
+            first = subscription.get(1)
+            second = subscription.get(1)
+        finally:
+            subscription.close()
+        self.assertEqual(first["ops"], [{"op": "append", "path": ["reports"], "values": [{"type": "qa_functional"}]}])
+        self.assertEqual(second["ops"], [{"op": "set", "path": ["current_llm_cost"], "value": 0.25}])
+        self.assertEqual(second["version"], context_manager.get_state_version(self.project_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
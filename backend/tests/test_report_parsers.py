@@ -0,0 +1,93 @@
+import json
+import unittest
+from praisonai_core.tools import report_parsers
+
+
+def rspec_json(examples, **summary):
+    return "Bundle complete!\n" + json.dumps({"examples": examples, "summary": summary, "messages": []})
+
+
+def failed_example(spec, line, source, message="expected true, got false"):
+    return {"file_path": f"./{spec}", "line_number": line, "status": "failed",
+            "full_description": "Post is valid " + "x" * 1000,
+            "exception": {"class": "RSpec::Expectations::ExpectationNotMetError", "message": message,
+                          "backtrace": ["/usr/local/bundle/gems/rspec-core/lib/rspec.rb:1",
+                                        f"/app/{source}:12:in `create'", f"/app/{spec}:{line}"]}}
+
+
+def brakeman_json(*confidences, errors=()):
+    return json.dumps({"scan_info": {"rails_version": "7.1"}, "errors": list(errors), "warnings": [
+        {"warning_type": "SQL Injection", "confidence": c, "file": f"app/models/m{i}.rb", "line": i,
+         "message": "Possible SQL injection", "code": "where(params[:q])"} for i, c in enumerate(confidences)]})
+
+
+class TestRSpecParser(unittest.TestCase):
+    def test_compact_failures(self):
+        examples = [{"file_path": "./spec/models/post_spec.rb", "status": "passed"}] + \
+            [failed_example("spec/models/post_spec.rb", 7, "app/models/post.rb")]
+        record = report_parsers.parse_rspec(rspec_json(examples, example_count=2, failure_count=1))
+        self.assertEqual(record["totals"], {"examples": 2, "failures": 1, "pending": 0, "errors_outside_of_examples": 0})
+        self.assertEqual(record["failed_specs"], ["spec/models/post_spec.rb"])
+        self.assertEqual(record["files"], ["app/models/post.rb"])
+        failure = record["failures"][0]
+        self.assertEqual((failure["spec"], failure["line"], failure["files"]),
+                         ("spec/models/post_spec.rb", 7, ["app/models/post.rb"]))
+        self.assertLessEqual(len(failure["description"]), report_parsers.MESSAGE_CHARS)
+        self.assertNotIn("backtrace", json.dumps(record))
+        self.assertEqual(report_parsers.severity(record), "high")
+
+    def test_green_run_is_low_even_with_error_words(self):
+        examples = [{"file_path": "./spec/error_handler_spec.rb", "status": "passed",
+                     "full_description": "renders error and warning pages"}]
+        record = report_parsers.parse_rspec(rspec_json(examples, example_count=1, failure_count=0))
+        self.assertEqual(report_parsers.severity(record), "low")
+        self.assertEqual(report_parsers.summary_line(record), "1 examples, 0 failures")
+
+    def test_failures_list_is_bounded(self):
+        examples = [failed_example(f"spec/m{i}_spec.rb", i, "app/models/post.rb") for i in range(80)]
+        record = report_parsers.parse_rspec(rspec_json(examples))
+        self.assertEqual(record["totals"]["failures"], 80)
+        self.assertEqual(len(record["failures"]), report_parsers.MAX_ITEMS)
+        self.assertEqual(len(record["failed_specs"]), 80)
+        self.assertIn("… и ещё 77", report_parsers.describe(record, limit=3))
+
+    def test_preamble_with_braces_and_trailing_text(self):
+        output = ("Warning: deprecated option {:verbose=>true} in .rspec\n"
+                  "{\"gem\": \"rails\"}\n"
+                  + rspec_json([failed_example("spec/models/post_spec.rb", 7, "app/models/post.rb")],
+                               example_count=1, failure_count=1).split("\n", 1)[1]
+                  + "\nCoverage report generated in {coverage}\n")
+        record = report_parsers.parse_rspec(output)
+        self.assertEqual(record["failed_specs"], ["spec/models/post_spec.rb"])
+        self.assertEqual(report_parsers.parse_report("{:a=>1} " + brakeman_json("High") + " done")["tool"], "brakeman")
+
+    def test_unparsed_output(self):
+        self.assertIsNone(report_parsers.parse_rspec("bundler: command not found: rspec"))
+        self.assertEqual(report_parsers.severity(None), "medium")
+
+
+class TestBrakemanParser(unittest.TestCase):
+    def test_severity_from_confidence(self):
+        self.assertEqual(report_parsers.severity(report_parsers.parse_brakeman(brakeman_json())), "low")
+        self.assertEqual(report_parsers.severity(report_parsers.parse_brakeman(brakeman_json("Weak"))), "low")
+        self.assertEqual(report_parsers.severity(report_parsers.parse_brakeman(brakeman_json("Weak", "Medium"))),
+                         "medium")
+        record = report_parsers.parse_brakeman(brakeman_json("Weak", "High", "Medium"))
+        self.assertEqual(report_parsers.severity(record), "high")
+        self.assertEqual(record["totals"], {"warnings": 3, "high": 1, "medium": 1, "weak": 1, "errors": 0})
+        self.assertEqual([w["confidence"] for w in record["warnings"]], ["high", "medium", "weak"])
+        self.assertEqual(record["files"], ["app/models/m0.rb", "app/models/m1.rb", "app/models/m2.rb"])
+
+    def test_parse_errors_raise_severity(self):
+        record = report_parsers.parse_brakeman(brakeman_json(errors=[{"error": "parse error", "location": "x.rb"}]))
+        self.assertEqual(report_parsers.severity(record), "medium")
+        self.assertEqual(record["errors"], ["parse error"])
+
+    def test_parse_report_detects_tool(self):
+        self.assertEqual(report_parsers.parse_report(brakeman_json("High"))["tool"], "brakeman")
+        self.assertEqual(report_parsers.parse_report(rspec_json([]))["tool"], "rspec")
+        self.assertIsNone(report_parsers.parse_report("Something broke"))
+
+
+if __name__ == "__main__":
+    unittest.main()
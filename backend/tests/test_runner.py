@@ -0,0 +1,74 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+from praisonai_core.tools import runner
+
+
+def completed(args, returncode=0, stdout=""):
+    return subprocess.CompletedProcess(args, returncode, stdout=stdout, stderr="")
+
+
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        self.project_path = tempfile.mkdtemp()
+        with open(os.path.join(self.project_path, "Gemfile.lock"), "w") as f:
+            f.write("GEM\n  specs:\n    rails (7.1.0)\n")
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.project_path)
+
+    def fake_docker(self, inspect_ok=True):
+        def run(args, **kwargs):
+            self.calls.append(args)
+            if args[1:3] == ["image", "inspect"]:
+                return completed(args, 0 if inspect_ok else 1)
+            if args[1] == "inspect":
+                return completed(args, stdout="true\n")
+            return completed(args, stdout="{}")
+        return patch.object(runner.subprocess, "run", side_effect=run)
+
+    def test_image_is_built_once(self):
+        executor = runner.DockerExecutor()
+        with self.fake_docker(inspect_ok=False):
+            executor.run(self.project_path, "bundle exec rspec")
+            executor.run(self.project_path, "bundle exec rspec")
+        builds = [c for c in self.calls if c[1] == "build"]
+        self.assertEqual(len(builds), 1)
+        self.assertIn(runner.DOCKERFILE_PATH, builds[0])
+
+    def test_bundle_volume_follows_lockfile(self):
+        executor = runner.DockerExecutor()
+        with self.fake_docker():
+            executor.run(self.project_path, "bundle exec rspec")
+            with open(os.path.join(self.project_path, "Gemfile.lock"), "a") as f:
+                f.write("    devise (4.9.0)\n")
+            executor.run(self.project_path, "bundle exec rspec")
+        volumes = [c[c.index("-v", c.index("-v") + 1) + 1] for c in self.calls if c[1] == "run"]
+        self.assertEqual(len(volumes), 2)
+        self.assertNotEqual(volumes[0], volumes[1])
+        self.assertTrue(all(v.startswith(runner.BUNDLE_VOLUME_PREFIX) and v.endswith(":/bundle") for v in volumes))
+        self.assertIn(runner.BUNDLE_PREPARE, self.calls[-1][-1])
+
+    def test_warm_container_is_reused(self):
+        executor = runner.DockerExecutor(warm=True)
+        with self.fake_docker():
+            executor.run(self.project_path, "bundle exec rspec")
+            executor.run(self.project_path, "brakeman .", bundle=False)
+        self.assertEqual(len([c for c in self.calls if c[1] == "run"]), 1)
+        execs = [c for c in self.calls if c[1] == "exec"]
+        self.assertEqual(len(execs), 2)
+        self.assertEqual(execs[1][-1], "brakeman .")
+
+    def test_local_executor_runs_in_project(self):
+        executor = runner.LocalExecutor(bundle_root=os.path.join(self.project_path, ".bundle-cache"))
+        result = executor.run(self.project_path, "pwd", bundle=False)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(os.path.realpath(result.stdout.strip()), os.path.realpath(self.project_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
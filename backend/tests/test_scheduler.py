@@ -0,0 +1,77 @@
+import unittest
+import threading
+import time
+from praisonai_core.scheduler import AgentScheduler, CycleError, find_cycle, build_graph
+
+
+def make_task(task_id, deps=(), priority=1, model='m'):
+    return {'id': task_id, 'agent': task_id, 'status': 'pending', 'priority': priority,
+            'dependencies': list(deps), 'model': model}
+
+
+class TestAgentScheduler(unittest.TestCase):
+    def test_independent_tasks_overlap(self):
+        active = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def run_task(task):
+            with lock:
+                active['now'] += 1
+                active['max'] = max(active['max'], active['now'])
+            time.sleep(0.05)
+            with lock:
+                active['now'] -= 1
+            return 'done'
+
+        tasks = [make_task('arch'), make_task('backend', ['arch']), make_task('frontend', ['arch']),
+                 make_task('qa', ['backend', 'frontend'])]
+        results = AgentScheduler(run_task, lambda t: t['model'], max_workers=4, default_model_limit=4).run(tasks)
+        self.assertEqual(set(results.values()), {'done'})
+        self.assertEqual(active['max'], 2)
+
+    def test_dependency_order_and_priority(self):
+        order = []
+        tasks = [make_task('late', priority=5), make_task('early', priority=1), make_task('child', ['late'])]
+        AgentScheduler(lambda t: order.append(t['id']) or 'done', lambda t: t['model'],
+                       max_workers=1).run(tasks)
+        self.assertEqual(order, ['early', 'late', 'child'])
+
+    def test_model_concurrency_cap(self):
+        active = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def run_task(task):
+            with lock:
+                active['now'] += 1
+                active['max'] = max(active['max'], active['now'])
+            time.sleep(0.02)
+            with lock:
+                active['now'] -= 1
+            return 'done'
+
+        tasks = [make_task(f't{i}', model='pro') for i in range(4)]
+        AgentScheduler(run_task, lambda t: t['model'], max_workers=4, model_limits={'pro': 1}).run(tasks)
+        self.assertEqual(active['max'], 1)
+
+    def test_failed_dependency_skips_dependents(self):
+        tasks = [make_task('a'), make_task('b', ['a']), make_task('c')]
+        results = AgentScheduler(lambda t: 'failed' if t['id'] == 'a' else 'done',
+                                 lambda t: t['model']).run(tasks)
+        self.assertEqual(results, {'a': 'failed', 'b': 'skipped', 'c': 'done'})
+
+    def test_dependents_of_running_task_wait(self):
+        # Задачу 'a' выполняет другой запуск: зависимые не пропускаются
+        tasks = [dict(make_task('a'), status='in_progress'), make_task('b', ['a']), make_task('c', ['b']),
+                 make_task('d')]
+        results = AgentScheduler(lambda t: 'done', lambda t: t['model']).run(tasks)
+        self.assertEqual(results, {'a': 'in_progress', 'b': 'waiting', 'c': 'waiting', 'd': 'done'})
+
+    def test_cycle_is_detected(self):
+        tasks = [make_task('a', ['c']), make_task('b', ['a']), make_task('c', ['b'])]
+        self.assertIsNotNone(find_cycle(build_graph(tasks)))
+        with self.assertRaises(CycleError):
+            AgentScheduler(lambda t: 'done', lambda t: t['model']).run(tasks)
+
+
+if __name__ == "__main__":
+    unittest.main()
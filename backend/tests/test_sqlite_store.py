@@ -0,0 +1,74 @@
+import unittest
+from praisonai_core.tools import context_manager, sqlite_store
+import os
+import json
+import tempfile
+import shutil
+
+
+class TestSqliteStore(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_sqlite_project"
+        self.temp_dir = tempfile.mkdtemp()
+        self.project_path = os.path.join(self.temp_dir, self.project_id)
+        os.makedirs(self.project_path, exist_ok=True)
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        self.old_backend = context_manager.STATE_BACKEND
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+        context_manager.STATE_BACKEND = 'sqlite'
+        context_manager.invalidate_state_cache()
+        with open(os.path.join(self.project_path, 'state.json'), 'w', encoding='utf-8') as f:
+            json.dump({"status": "init", "tasks": [], "reports": []}, f)
+
+    def tearDown(self):
+        sqlite_store.close_connections()
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        context_manager.STATE_BACKEND = self.old_backend
+        context_manager.invalidate_state_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_roundtrip_through_tables(self):
+        context_manager.add_task(self.project_id, {"id": "t1", "type": "feature", "status": "pending",
+                                                   "assigned_to": "backend-dev"})
+        context_manager.add_report(self.project_id, {"type": "qa_functional", "severity": "high"})
+        context_manager.update_task_status(self.project_id, "t1", "done")
+        context_manager.invalidate_state_cache()
+        state = context_manager.read_state(self.project_id)
+        self.assertEqual(state['tasks'][0]['status'], 'done')
+        self.assertEqual(len(state['tasks'][0]['subtasks']), 2)
+        self.assertEqual(state['reports'], [{"type": "qa_functional", "severity": "high"}])
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, sqlite_store.DB_FILE)))
+
+    def test_filtered_queries_with_cursor(self):
+        with context_manager.state_transaction(self.project_id) as state:
+            for i in range(7):
+                state['reports'].append({"type": "security_audit" if i % 2 else "qa_functional",
+                                         "severity": "high", "n": i})
+        reports, cursor = context_manager.query_reports(self.project_id, report_type="security_audit", limit=2)
+        self.assertEqual([r['n'] for r in reports], [1, 3])
+        reports, cursor = context_manager.query_reports(self.project_id, report_type="security_audit",
+                                                        limit=2, cursor=cursor)
+        self.assertEqual([r['n'] for r in reports], [5])
+        self.assertIsNone(cursor)
+        self.assertEqual(context_manager.read_status(self.project_id), 'init')
+
+    def test_json_backend_queries_match(self):
+        context_manager.STATE_BACKEND = 'json'
+        for i in range(3):
+            context_manager.add_task(self.project_id, {"id": f"t{i}", "status": "pending" if i else "done"})
+        tasks, cursor = context_manager.query_tasks(self.project_id, status="pending", limit=1)
+        self.assertEqual([t['id'] for t in tasks], ["t1"])
+        self.assertEqual(cursor, 2)
+
+    def test_migrate_projects(self):
+        context_manager.STATE_BACKEND = 'json'
+        context_manager.add_report(self.project_id, {"type": "qa_functional"})
+        migrated = sqlite_store.migrate_projects(self.temp_dir)
+        self.assertEqual(migrated, [self.project_id])
+        self.assertEqual(sqlite_store.migrate_projects(self.temp_dir), [])
+        state = sqlite_store.load(self.project_path)
+        self.assertEqual(state['reports'], [{"type": "qa_functional"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from praisonai_core.tools import runner, testing_runner
+
+
+class FakeExecutor:
+    """
+    Исполнитель rspec: каждый спек-файл — один пример, spec/models/* падают.
+    """
+
+    def __init__(self):
+        self.commands = []
+        self.lock = threading.Lock()
+
+    def run(self, project_path, command, bundle=True):
+        with self.lock:
+            self.commands.append((command, bundle))
+        specs = [arg for arg in shlex.split(command) if arg.endswith("_spec.rb")] or \
+            testing_runner.discover_specs(project_path)
+        if "rspec" not in command:
+            return subprocess.CompletedProcess(command, 0, stdout="", stderr="")
+        examples = [{"file_path": f"./{spec}", "run_time": 0.5,
+                     "status": "failed" if spec.startswith("spec/models/") else "passed"} for spec in specs]
+        failures = sum(e["status"] == "failed" for e in examples)
+        output = json.dumps({"version": "3.12.0", "examples": examples,
+                             "summary": {"duration": 0.5 * len(specs), "example_count": len(specs),
+                                         "failure_count": failures, "pending_count": 0,
+                                         "errors_outside_of_examples_count": 0}})
+        return subprocess.CompletedProcess(command, 1 if failures else 0, stdout=output, stderr="")
+
+
+class TestTestingRunner(unittest.TestCase):
+    def setUp(self):
+        self.project_path = tempfile.mkdtemp()
+        for spec in ("spec/models/post_spec.rb", "spec/models/user_spec.rb",
+                     "spec/requests/posts_spec.rb", "spec/system/blog_spec.rb"):
+            os.makedirs(os.path.dirname(os.path.join(self.project_path, spec)), exist_ok=True)
+            open(os.path.join(self.project_path, spec), "w").close()
+        self.executor = FakeExecutor()
+        runner.set_executor(self.executor)
+
+    def tearDown(self):
+        runner.set_executor(None)
+        shutil.rmtree(self.project_path)
+
+    def test_plan_shards_balances_by_timings(self):
+        timings = {"a_spec.rb": 10.0, "b_spec.rb": 6.0, "c_spec.rb": 4.0, "d_spec.rb": 1.0}
+        shards = testing_runner.plan_shards(list(timings), timings, 2)
+        loads = sorted(sum(timings[s] for s in shard) for shard in shards)
+        self.assertEqual(loads, [10.0, 11.0])
+        self.assertEqual(len(testing_runner.plan_shards(["a_spec.rb"], {}, 8)), 1)
+
+    def test_sharded_run_merges_results(self):
+        output = testing_runner.run_all_tests(self.project_path, workers=2)
+        merged = json.loads(output)
+        self.assertEqual(merged["summary"]["example_count"], 4)
+        self.assertEqual(merged["summary"]["failure_count"], 2)
+        self.assertEqual(merged["shards"], 2)
+        self.assertEqual(merged["summary_line"], "4 examples, 2 failures")
+        # Гемы ставятся один раз, шарды запускаются без bundle install
+        self.assertEqual([bundle for _, bundle in self.executor.commands].count(True), 1)
+        shard_commands = [c for c, _ in self.executor.commands if "rspec" in c]
+        self.assertEqual(sorted(c.split()[0] for c in shard_commands), ["TEST_ENV_NUMBER=''", "TEST_ENV_NUMBER=2"])
+        timings = testing_runner.load_timings(self.project_path)
+        self.assertEqual(timings["spec/system/blog_spec.rb"], 0.5)
+
+    def write_database_config(self, content):
+        os.makedirs(os.path.join(self.project_path, "config"), exist_ok=True)
+        with open(os.path.join(self.project_path, "config", "database.yml"), "w") as f:
+            f.write(content)
+
+    def test_shard_databases_are_prepared(self):
+        self.write_database_config("test:\n  database: app_test<%= ENV['TEST_ENV_NUMBER'] %>\n")
+        testing_runner.run_all_tests(self.project_path, workers=2)
+        setup = [c for c, _ in self.executor.commands if "db:schema:load" in c]
+        self.assertEqual(sorted(c.split()[0] for c in setup), ["TEST_ENV_NUMBER=''", "TEST_ENV_NUMBER=2"])
+        self.assertEqual(len([c for c, _ in self.executor.commands if "rspec" in c]), 2)
+
+    def test_shared_test_database_runs_single_process(self):
+        self.write_database_config("test:\n  database: app_test\n")
+        output = testing_runner.run_all_tests(self.project_path, workers=2)
+        rspec = [c for c, _ in self.executor.commands if "rspec" in c]
+        self.assertEqual(len(rspec), 1)
+        self.assertNotIn("TEST_ENV_NUMBER", rspec[0])
+        self.assertEqual(json.loads(output)["summary"]["example_count"], 4)
+
+    def test_failed_database_setup_runs_single_process(self):
+        self.write_database_config("test:\n  database: app_test<%= ENV['TEST_ENV_NUMBER'] %>\n")
+        run = self.executor.run
+
+        def failing_setup(project_path, command, bundle=True):
+            if "db:create" in command:
+                return subprocess.CompletedProcess(command, 1, stdout="", stderr="could not connect")
+            return run(project_path, command, bundle)
+
+        self.executor.run = failing_setup
+        testing_runner.run_all_tests(self.project_path, workers=2)
+        self.assertEqual(len([c for c, _ in self.executor.commands if "rspec" in c]), 1)
+
+    def test_missing_shard_output_is_reported(self):
+        merged = testing_runner.merge_results([None, json.dumps({"examples": [], "summary": {"example_count": 0}})],
+                                              [["spec/a_spec.rb"], ["spec/b_spec.rb"]])
+        self.assertEqual(merged["summary"]["errors_outside_of_examples_count"], 1)
+        self.assertIn("spec/a_spec.rb", merged["messages"][0])
+
+    def test_single_worker_runs_whole_suite(self):
+        testing_runner.run_all_tests(self.project_path, workers=1)
+        self.assertEqual(self.executor.commands, [("bundle exec rspec --format json", True)])
+
+
+
+class TestChangedTests(unittest.TestCase):
+    SOURCES = {
+        "app/models/post.rb": "class Post; end\n",
+        "app/controllers/posts_controller.rb": "class PostsController; end\n",
+        "app/services/publisher.rb": "class Publisher; end\n",
+        "spec/models/post_spec.rb": "",
+        "spec/requests/posts_spec.rb": "",
+        "spec/services/publishing_spec.rb": "",
+    }
+
+    def setUp(self):
+        self.project_path = tempfile.mkdtemp()
+        for path, content in self.SOURCES.items():
+            self.write(path, content)
+        self.executor = FakeExecutor()
+        runner.set_executor(self.executor)
+        self.tasks = [{"agent": "backend-dev",
+                       "artifacts_produced": ["app/services/publisher.rb", "spec/services/publishing_spec.rb"]}]
+
+    def tearDown(self):
+        runner.set_executor(None)
+        shutil.rmtree(self.project_path)
+
+    def write(self, path, content):
+        full = os.path.join(self.project_path, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+
+    def run_changed(self, **kwargs):
+        self.executor.commands.clear()
+        return testing_runner.run_changed_tests(self.project_path, self.tasks, workers=1, **kwargs)
+
+    def test_first_run_is_full_then_only_changed_specs(self):
+        self.assertEqual(self.run_changed()["reason"], "no_baseline")
+        # spec/models/* падают в FakeExecutor — они перезапускаются и без изменений
+        self.assertEqual(self.run_changed()["specs"], ["spec/models/post_spec.rb"])
+        self.write("app/controllers/posts_controller.rb", "class PostsController; def index; end; end\n")
+        run = self.run_changed()
+        self.assertEqual(run["mode"], "selective")
+        self.assertEqual(run["specs"], ["spec/models/post_spec.rb", "spec/requests/posts_spec.rb"])
+        self.assertEqual(self.executor.commands,
+                         [("bundle exec rspec --format json spec/models/post_spec.rb spec/requests/posts_spec.rb", True)])
+
+    def test_mapping_learned_from_task_artifacts(self):
+        os.remove(os.path.join(self.project_path, "spec/models/post_spec.rb"))
+        self.run_changed()
+        skipped = self.run_changed()
+        self.assertEqual(skipped["mode"], "skipped")
+        self.assertIsNone(skipped["output"])
+        self.assertEqual(self.executor.commands, [])
+        self.write("app/services/publisher.rb", "class Publisher; def call; end; end\n")
+        self.tasks = []  # карта сохранена в манифесте
+        self.assertEqual(self.run_changed()["specs"], ["spec/services/publishing_spec.rb"])
+
+    def test_full_run_on_global_change_forced_and_periodic(self):
+        self.run_changed()
+        self.write("config/routes.rb", "Rails.application.routes.draw {}\n")
+        self.assertEqual(self.run_changed()["reason"], "global_change:config/routes.rb")
+        self.assertEqual(self.run_changed(full=True)["reason"], "forced")
+        with unittest.mock.patch.object(testing_runner, "FULL_SWEEP_RUNS", 1):
+            self.run_changed()
+            self.assertEqual(self.run_changed()["reason"], "periodic_sweep")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from praisonai_core import tracing
+from praisonai_core.dispatcher import Dispatcher
+from praisonai_core.tools import context_manager
+import main
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.project_id = "test_tracing_project"
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, self.project_id), exist_ok=True)
+        self.old_base = context_manager.BASE_PROJECTS_PATH
+        context_manager.BASE_PROJECTS_PATH = self.temp_dir
+        context_manager.write_state(self.project_id, {"status": "init", "tasks": [], "reports": []})
+        tracing.reset()
+
+    def tearDown(self):
+        tracing.reset()
+        context_manager.BASE_PROJECTS_PATH = self.old_base
+        shutil.rmtree(self.temp_dir)
+
+    def test_nested_spans_inherit_project(self):
+        with tracing.span("job", self.project_id, kind="run") as outer:
+            with tracing.span("run_all_tests") as inner:
+                pass
+        state = {}
+        tracing.attach_timeline(self.project_id, state)
+        self.assertEqual([s["name"] for s in state["timeline"]], ["run_all_tests", "job"])
+        self.assertEqual(inner["parent"], outer["id"])
+
+    def test_timeline_is_bounded(self):
+        with patch.object(tracing, "TIMELINE_MAX_SPANS", 10):
+            for _ in range(25):
+                with tracing.span("save_state", self.project_id):
+                    pass
+            state = {}
+            tracing.attach_timeline(self.project_id, state)
+        self.assertLessEqual(len(state["timeline"]), 10)
+
+    def test_errors_are_counted(self):
+        with self.assertRaises(ValueError):
+            with tracing.span("llm_call", agent="uiux"):
+                raise ValueError("boom")
+        text = tracing.render_prometheus()
+        self.assertIn('appbuilder_span_errors_total{span="llm_call",agent="uiux"} 1', text)
+        self.assertIn('appbuilder_span_duration_seconds_count{span="llm_call",agent="uiux"} 1', text)
+
+    def test_run_agent_timeline_in_state(self):
+        dispatcher = Dispatcher(self.project_id)
+        with dispatcher.transaction():
+            dispatcher._generate_initial_tasks()
+        with patch.object(Dispatcher, "_call_llm_agent", return_value=("done", "")):
+            dispatcher.run_agent("lead-qa")
+        context_manager.flush_timeline(self.project_id)
+        timeline = context_manager.read_state(self.project_id)["timeline"]
+        spans = {s["name"]: s for s in timeline}
+        self.assertEqual(spans["llm_call"]["labels"]["agent"], "lead-qa")
+        self.assertEqual(spans["llm_call"]["parent"], spans["run_agent"]["id"])
+        self.assertEqual(spans["run_agent"]["labels"]["result"], "done")
+        self.assertIn("write_state", spans)
+
+    def test_metrics_endpoint(self):
+        with tracing.span("run_agent", self.project_id, agent="uiux"):
+            pass
+        response = TestClient(main.app).get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn('appbuilder_span_duration_seconds_bucket{span="run_agent",agent="uiux",le="+Inf"} 1',
+                      response.text)
+
+    def test_profiled_saves_profile(self):
+        project_path = context_manager.get_project_path(self.project_id)
+        with tracing.profiled(project_path, "run") as capture:
+            sum(range(1000))
+        self.assertTrue(os.path.exists(capture["path"]))
+        self.assertTrue(capture["top"])
+
+
+if __name__ == "__main__":
+    unittest.main()